@@ -1,8 +1,11 @@
 """Parent Class for the Specify Network API services."""
+import datetime as DT
 from logging import INFO
 import os
+import threading
 from werkzeug.exceptions import BadRequest
 
+from flask_app.analyst.matrix_registry import MatrixRegistry
 from flask_app.common.base import _SpecifyNetworkService
 from flask_app.common.s2n_type import AnalystOutput, APIService
 
@@ -13,7 +16,7 @@ from sppy.aws.aws_tools import (
 from sppy.tools.s2n.constants import (Summaries, SUMMARY_TABLE_TYPES)
 from sppy.tools.s2n.sparse_matrix import SparseMatrix
 from sppy.tools.s2n.summary_matrix import SummaryMatrix
-from sppy.tools.util.utils import add_errinfo, get_traceback
+from sppy.tools.util.utils import add_errinfo, combine_errinfo, get_traceback
 from sppy.tools.util.logtools import Logger
 
 
@@ -87,7 +90,7 @@ class _AnalystService(_SpecifyNetworkService):
     @classmethod
     def _standardize_params(
             cls, summary_type=None, summary_key=None, rank_by=None, order=None,
-            limit=10):
+            limit=10, measure=None, data_date=None, diff_date=None):
         """Standardize query parameters to send to appropriate service.
 
         Args:
@@ -98,10 +101,16 @@ class _AnalystService(_SpecifyNetworkService):
             order: sort records "descending" or "ascending"
             limit: integer indicating how many ranked records to return, value must
                 be less than QUERY_LIMIT.
+            measure: measure of similarity to rank similar records by.
+            data_date: date of the source data to query, in YYYY_MM_DD or
+                YYYY-MM-DD format.  If None, the current data date.
+            diff_date: date of the source data to compare data_date to, in
+                YYYY_MM_DD or YYYY-MM-DD format.
 
         Raises:
             BadRequest: on invalid query parameters.
             BadRequest: on summary_type == rank_by for Rank service.
+            BadRequest: on data_date or diff_date not a valid date.
             BadRequest: on unknown exception parsing parameters.
 
         Returns:
@@ -113,7 +122,10 @@ class _AnalystService(_SpecifyNetworkService):
             "summary_key": summary_key,
             "rank_by": rank_by,
             "order": order,
-            "limit": limit
+            "limit": limit,
+            "measure": measure,
+            "data_date": data_date,
+            "diff_date": diff_date
         }
         try:
             usr_params, errinfo = cls._process_params(user_kwargs)
@@ -128,6 +140,13 @@ class _AnalystService(_SpecifyNetworkService):
                 f"URL arguments summary_type ({usr_params['summary_type']}) "
                 f"and rank_by ({usr_params['rank_by']}) may not be equal.")
 
+        # Data dates are standardized to the format used in data filenames
+        for key in ("data_date", "diff_date"):
+            if usr_params.get(key) is not None:
+                usr_params[key] = cls._standardize_datestr(usr_params[key])
+        if "data_date" in usr_params and usr_params["data_date"] is None:
+            usr_params["data_date"] = get_current_datadate_str()
+
         # errinfo["error"] indicates bad parameters, throws exception
         try:
             error_description = "; ".join(errinfo["error"])
@@ -137,38 +156,100 @@ class _AnalystService(_SpecifyNetworkService):
 
         return usr_params, errinfo
 
+    # ...............................................
+    @staticmethod
+    def _standardize_datestr(datestr):
+        """Convert a date string to YYYY_MM_DD format.
+
+        Args:
+            datestr (str): date in YYYY_MM_DD or YYYY-MM-DD format.
+
+        Returns:
+            str: date in YYYY_MM_DD format.
+
+        Raises:
+            BadRequest: on datestr not a valid date.
+        """
+        try:
+            dt = DT.datetime.strptime(datestr.replace("-", "_"), "%Y_%m_%d")
+        except ValueError:
+            raise BadRequest(
+                f"Date {datestr} is not a valid date in YYYY_MM_DD format")
+        return f"{dt.year}_{dt.month:02d}_{dt.day:02d}"
+
     # ...............................................
     @classmethod
     def _find_matrix_input_filenames(cls, table, input_path, download_path):
         do_retrieve = False
         basename = table["fname"]
         mtx_ext = table["matrix_extension"]
-        mtx_fname = f"{input_path}/{basename}{mtx_ext}"
-        meta_fname = f"{input_path}/{basename}.json"
-        zip_fname = f"{input_path}/{basename}.zip"
-        if not os.path.exists(mtx_fname) or not os.path.exists(meta_fname):
-            mtx_fname = f"{download_path}/{basename}{mtx_ext}"
-            meta_fname = f"{download_path}/{basename}.json"
-            zip_fname = f"{download_path}/{basename}.zip"
-            if not os.path.exists(mtx_fname) or not os.path.exists(meta_fname):
-                do_retrieve = True
+        for path in (input_path, download_path):
+            mtx_fname = f"{path}/{basename}{mtx_ext}"
+            meta_fname = f"{path}/{basename}.json"
+            zip_fname = f"{path}/{basename}.zip"
+            # Labels are in a binary file beside the JSON for some tables
+            fnames = [mtx_fname, meta_fname]
+            labels_fname = SparseMatrix.get_labels_filename(
+                meta_fname, table.get("labels_extension"))
+            if labels_fname is not None:
+                fnames.append(labels_fname)
+            if all([os.path.exists(fn) for fn in fnames]):
+                return do_retrieve, mtx_fname, meta_fname, zip_fname
+        do_retrieve = True
         return do_retrieve, mtx_fname, meta_fname, zip_fname
 
+    # ...............................................
+    @classmethod
+    def _find_memmap_input_filenames(
+            cls, table, input_path, download_path, do_download=True):
+        """Find or download the uncompressed, memory-mappable files of a matrix.
+
+        Args:
+            table (dict): metadata of the matrix table.
+            input_path (str): Read-only directory of input data.
+            download_path (str): writable directory for downloaded data.
+            do_download (bool): flag indicating whether to download files missing
+                from both directories.
+
+        Returns:
+            mtx_fnames (dict): absolute filenames of the CSR and CSC arrays, or None
+                if any file is neither in input_path nor available on S3.
+            meta_fname (str): absolute filename of the JSON metadata, or None.
+            errinfo (dict): warnings for files that could not be downloaded.
+        """
+        errinfo = {}
+        for path in (input_path, download_path):
+            mtx_fnames, meta_fname = SparseMatrix.get_memmap_filenames(
+                table["fname"], path)
+            fnames = list(mtx_fnames.values()) + [meta_fname]
+            labels_fname = SparseMatrix.get_labels_filename(
+                meta_fname, table.get("labels_extension"))
+            if labels_fname is not None:
+                fnames.append(labels_fname)
+            if all([os.path.exists(fn) for fn in fnames]):
+                return mtx_fnames, meta_fname, errinfo
+        if not do_download:
+            return None, None, errinfo
+        # Download missing files, next to the zip file on S3, to the writable path
+        for fname in fnames:
+            try:
+                download_from_s3(
+                    PROJ_BUCKET, SUMMARY_FOLDER, os.path.basename(fname),
+                    local_path=download_path, overwrite=False)
+            except Exception as e:
+                errinfo = add_errinfo(errinfo, "warning", str(e))
+                return None, None, errinfo
+        return mtx_fnames, meta_fname, errinfo
+
     # ...............................................
     @classmethod
     def _test_download(cls, filename):
         success = True
         msg = ""
-        # Test successful download
-        retries = 0
-        interval = 6
-        while not os.path.exists(filename) and retries < 10:
-            import time
-            time.sleep(6)
-            retries += 1
+        # download_from_s3 returns after the file is verified and renamed into place
         if not os.path.exists(filename):
             success = False
-            msg = f"Failed to access {filename} in {retries * interval} seconds"
+            msg = f"Failed to access {filename}"
         return success, msg
 
     # ...............................................
@@ -177,6 +258,7 @@ class _AnalystService(_SpecifyNetworkService):
         sparse_coo = None
         row_categ = None
         col_categ = None
+        meta_dict = {}
         table_type = None
         errinfo = {"info": [f"Download data {zip_basename} locally"]}
         # Download to local working directory if file does not exist
@@ -191,40 +273,224 @@ class _AnalystService(_SpecifyNetworkService):
             success, msg = cls._test_download(zip_filename)
             if success:
                 try:
-                    sparse_coo, row_categ, col_categ, table_type, _data_datestr = \
-                        SparseMatrix.uncompress_zipped_data(
-                            zip_filename, local_path=local_path, overwrite=False)
+                    (sparse_coo, row_categ, col_categ, meta_dict, table_type,
+                     _data_datestr) = SparseMatrix.uncompress_zipped_data(
+                        zip_filename, local_path=local_path, overwrite=False)
                 except Exception as e:
                     errinfo = add_errinfo(errinfo, "error", str(e))
             else:
                 errinfo = add_errinfo(errinfo, "error", [msg])
-        return sparse_coo, row_categ, col_categ, table_type, errinfo
+        return sparse_coo, row_categ, col_categ, meta_dict, table_type, errinfo
 
     # ...............................................
     @classmethod
-    def _init_sparse_matrix(cls):
+    def _init_sparse_matrix(cls, data_datestr=None, timeout=None):
+        if data_datestr is None:
+            data_datestr = get_current_datadate_str()
+        mtx_table_type = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
+        # Read data files only once per process, then share the resident matrix
+        sp_mtx, errinfo = MatrixRegistry.get_matrix(
+            mtx_table_type, data_datestr,
+            lambda: cls._load_resident_sparse_matrix(mtx_table_type, data_datestr),
+            timeout=timeout)
+        return sp_mtx, errinfo
+
+    # ...............................................
+    @classmethod
+    def preload(cls, data_datestr=None):
+        """Load the sparse matrix, its summaries and label lookups before requests.
+
+        Args:
+            data_datestr (str): date of the source data in YYYY_MM_DD format,
+                defaults to the current data date.
+
+        Returns:
+            errinfo (dict): errors/info from loading the matrix.
+
+        Note:
+            Called in the gunicorn master process with --preload, so that forked
+                workers share the loaded arrays copy-on-write instead of each reading
+                the data files.
+        """
+        # Block until loaded, there is no client waiting for a response
+        sp_mtx, errinfo = cls._init_sparse_matrix(
+            data_datestr, timeout=threading.TIMEOUT_MAX)
+        if sp_mtx is not None:
+            # Build summaries of datasets (down axis 0) and species (across axis 1)
+            for axis in (0, 1):
+                try:
+                    sp_mtx.get_summary_matrix(axis)
+                except Exception:
+                    errinfo = add_errinfo(errinfo, "error", get_traceback())
+        return errinfo
+
+    # ...............................................
+    @classmethod
+    def prefetch(cls, data_datestr=None):
+        """Start loading the sparse matrix in the background, without waiting.
+
+        Args:
+            data_datestr (str): date of the source data in YYYY_MM_DD format,
+                defaults to the current data date.
+        """
+        if data_datestr is None:
+            data_datestr = get_current_datadate_str()
+        mtx_table_type = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
+        MatrixRegistry.prefetch(
+            mtx_table_type, data_datestr,
+            lambda: cls._load_resident_sparse_matrix(mtx_table_type, data_datestr))
+
+    # ...............................................
+    @classmethod
+    def is_ready(cls, data_datestr=None):
+        """Return whether the sparse matrix for a data date is loaded.
+
+        Args:
+            data_datestr (str): date of the source data in YYYY_MM_DD format,
+                defaults to the current data date.
+
+        Returns:
+            bool: True if requests for the data date will not wait for a load.
+        """
+        if data_datestr is None:
+            data_datestr = get_current_datadate_str()
+        return MatrixRegistry.is_resident(
+            SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, data_datestr)
+
+    # ...............................................
+    @classmethod
+    def _load_resident_sparse_matrix(cls, mtx_table_type, data_datestr):
+        """Load a sparse matrix and build its label lookups, for the MatrixRegistry.
+
+        Args:
+            mtx_table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                the matrix.
+            data_datestr (str): date of the source data in YYYY_MM_DD format.
+
+        Returns:
+            sp_mtx (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix, or None if it
+                could not be loaded.
+            errinfo (dict): errors/info from loading the matrix.
+
+        Note:
+            Label hash tables are built before the matrix is registered, so they
+                count against the memory budget, and are shared by forked workers
+                instead of built on the first request of each worker.
+        """
+        sp_mtx, errinfo = cls._load_sparse_matrix(mtx_table_type, data_datestr)
+        if sp_mtx is not None:
+            try:
+                sp_mtx.warm_label_lookups()
+            except Exception:
+                errinfo = add_errinfo(errinfo, "error", get_traceback())
+        return sp_mtx, errinfo
+
+    # ...............................................
+    @classmethod
+    def _load_sparse_matrix(cls, mtx_table_type, data_datestr):
         errinfo = {}
         sp_mtx = None
-        data_datestr = get_current_datadate_str()
-        mtx_table_type = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
         table = Summaries.get_table(mtx_table_type, data_datestr)
-        # Look for uncompressed files in Read-only volume first
+        # A date saved only as a delta has no memory-mapped files on S3
+        is_delta = any([
+            os.path.exists(SparseMatrix.get_delta_filename(table["fname"], path))
+            for path in (INPUT_DATA_PATH, DOWNLOAD_PATH)])
+        # Prefer memory-mapped arrays, shared by all processes, in Read-only volume
+        # or downloaded to the working path
+        mmap_fnames, mmap_meta_fname, mmap_errinfo = cls._find_memmap_input_filenames(
+            table, INPUT_DATA_PATH, DOWNLOAD_PATH, do_download=not is_delta)
+        if mmap_fnames is not None:
+            try:
+                csr, csc, row_categ, col_categ, meta_dict = \
+                    SparseMatrix.read_memmap_data(mmap_fnames, mmap_meta_fname)
+            except Exception as e:
+                errinfo = add_errinfo(errinfo, "warning", str(e))
+            else:
+                sp_mtx = SparseMatrix(
+                    csr, mtx_table_type, data_datestr, row_categ, col_categ,
+                    axis_stats=meta_dict.get("axis_stats"), csc_array=csc)
+                return sp_mtx, errinfo
+
+        # Then look for uncompressed files in Read-only volume
         (do_retrieve,
          mtx_filename, meta_filename, zip_filename) = cls._find_matrix_input_filenames(
             table, INPUT_DATA_PATH, DOWNLOAD_PATH)
         if do_retrieve is False:
             # Read
-            sparse_coo, row_categ, col_categ = SparseMatrix.read_data(
+            sparse_coo, row_categ, col_categ, meta_dict = SparseMatrix.read_data(
                 mtx_filename, meta_filename)
         else:
             # or Download to working path and read
-            sparse_coo, row_categ, col_categ, _table_type, errinfo = \
-                cls._retrieve_sparse_matrix(
-                    os.path.basename(zip_filename), DOWNLOAD_PATH)
-        # Create
+            (sparse_coo, row_categ, col_categ, meta_dict, _table_type,
+             retrieve_errinfo) = cls._retrieve_sparse_matrix(
+                os.path.basename(zip_filename), DOWNLOAD_PATH)
+            errinfo = combine_errinfo(errinfo, retrieve_errinfo)
+        # Create, with statistics for all rows/columns if saved with the matrix
         if None not in (sparse_coo, row_categ, col_categ):
             sp_mtx = SparseMatrix(
-                sparse_coo, mtx_table_type, data_datestr, row_categ, col_categ)
+                sparse_coo, mtx_table_type, data_datestr, row_categ, col_categ,
+                axis_stats=meta_dict.get("axis_stats"))
+        # Or rebuild from the previous matrix and the delta saved for this date
+        else:
+            sp_mtx, delta_errinfo = cls._load_sparse_matrix_from_delta(
+                mtx_table_type, table)
+            if sp_mtx is None:
+                errinfo = combine_errinfo(errinfo, delta_errinfo)
+            else:
+                errinfo = delta_errinfo
+        # Missing memory-mapped files matter only if no other files were found
+        if sp_mtx is None:
+            errinfo = combine_errinfo(mmap_errinfo, errinfo)
+        return sp_mtx, errinfo
+
+    # ...............................................
+    @classmethod
+    def _load_sparse_matrix_from_delta(cls, mtx_table_type, table):
+        """Rebuild a matrix saved as a delta from the matrix for the previous date.
+
+        Args:
+            mtx_table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                the matrix.
+            table (dict): metadata of the matrix table.
+
+        Returns:
+            sp_mtx (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix, or None if
+                the delta or previous matrix could not be read.
+            errinfo (dict): errors/info from reading the delta and previous matrix.
+
+        Note:
+            The previous matrix may itself be rebuilt from a delta.  Matrices are
+                saved in full after at most MAX_DELTA_CHAIN_LENGTH deltas.
+            The previous matrix is taken from the MatrixRegistry, so a resident
+                matrix is not read again, and matrices loaded along the chain of
+                deltas stay resident for later requests and deltas.
+        """
+        delta_filename = SparseMatrix.get_delta_filename(
+            table["fname"], INPUT_DATA_PATH)
+        try:
+            if not os.path.exists(delta_filename):
+                delta_filename = download_from_s3(
+                    PROJ_BUCKET, SUMMARY_FOLDER, os.path.basename(delta_filename),
+                    local_path=DOWNLOAD_PATH, overwrite=False)
+            delta = SparseMatrix.read_delta_file(delta_filename)
+        except Exception as e:
+            return None, {"error": [str(e)]}
+
+        prev_datestr = delta["prev_datestr"]
+        # Called from a loader thread, which can wait for the previous matrix
+        prev_mtx, errinfo = MatrixRegistry.get_matrix(
+            mtx_table_type, prev_datestr,
+            lambda: cls._load_resident_sparse_matrix(mtx_table_type, prev_datestr),
+            timeout=threading.TIMEOUT_MAX)
+        if prev_mtx is None:
+            return None, errinfo
+        try:
+            sp_mtx = prev_mtx.apply_column_delta(delta)
+        except Exception as e:
+            return None, add_errinfo(errinfo, "error", str(e))
+        errinfo = add_errinfo(
+            errinfo, "info",
+            f"Rebuilt {table['fname']} from {delta['prev_datestr']} and delta")
         return sp_mtx, errinfo
 
     # ...............................................
@@ -258,15 +524,31 @@ class _AnalystService(_SpecifyNetworkService):
 
     # ...............................................
     @classmethod
-    def _init_summary_matrix(cls, summary_type):
-        errinfo = {}
-        summary_mtx = None
-        data_datestr = get_current_datadate_str()
+    def _init_summary_matrix(cls, summary_type, data_datestr=None):
+        if data_datestr is None:
+            data_datestr = get_current_datadate_str()
+        # Datasets are columns, summarized down axis 0, species are rows, across 1
+        axis = 0 if summary_type == "dataset" else 1
+        # Derive from the resident sparse matrix, without loading more files
+        sp_mtx, errinfo = cls._init_sparse_matrix(data_datestr)
+        if sp_mtx is not None:
+            return sp_mtx.get_summary_matrix(axis), errinfo
+
         if summary_type == "dataset":
             mtx_table_type = SUMMARY_TABLE_TYPES.DATASET_SPECIES_SUMMARY
         else:
             mtx_table_type = SUMMARY_TABLE_TYPES.SPECIES_DATASET_SUMMARY
+        # Otherwise read summary files only once per process, then share the matrix
+        summary_mtx, errors = MatrixRegistry.get_matrix(
+            mtx_table_type, data_datestr,
+            lambda: cls._load_summary_matrix(mtx_table_type, data_datestr))
+        return summary_mtx, combine_errinfo(errinfo, errors)
 
+    # ...............................................
+    @classmethod
+    def _load_summary_matrix(cls, mtx_table_type, data_datestr):
+        errinfo = {}
+        summary_mtx = None
         table = Summaries.get_table(mtx_table_type, data_datestr)
         # Look for uncompressed files in Read-only volume first
         (do_retrieve,
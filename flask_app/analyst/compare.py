@@ -1,6 +1,6 @@
 """Class for the Specify Network Name API service."""
 from http import HTTPStatus
-from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
 
 from flask_app.common.s2n_type import APIService, AnalystOutput
 from flask_app.analyst.base import _AnalystService
@@ -17,12 +17,13 @@ class CompareSvc(_AnalystService):
 
     # ...............................................
     @classmethod
-    def compare_measures(cls, summary_type=None, summary_key=None):
+    def compare_measures(cls, summary_type=None, summary_key=None, data_date=None):
         """Compare descriptive measurements for one identifier against all others.
 
         Args:
             summary_type: data dimension for summary, ("species" or "dataset")
             summary_key: unique identifier for the data dimension being examined.
+            data_date: date of the source data, defaults to the current data date.
 
         Returns:
             full_output (flask_app.common.s2n_type.AnalystOutput): including a
@@ -34,7 +35,8 @@ class CompareSvc(_AnalystService):
         stat_dict = {}
         try:
             good_params, errinfo = cls._standardize_params(
-                summary_type=summary_type, summary_key=summary_key)
+                summary_type=summary_type, summary_key=summary_key,
+                data_date=data_date)
         except BadRequest as e:
             errinfo = {"error": [e.description]}
         except Exception:
@@ -46,7 +48,11 @@ class CompareSvc(_AnalystService):
                 if good_params["summary_key"] is not None:
                     try:
                         stat_dict, errors = cls._get_comparative_measures(
-                            good_params["summary_type"], good_params["summary_key"])
+                            good_params["summary_type"], good_params["summary_key"],
+                            data_date=good_params["data_date"])
+                    except ServiceUnavailable:
+                        # Matrix is still loading, respond 503 with Retry-After
+                        raise
                     except Exception:
                         errors = {"error": [get_traceback()]}
                 else:
@@ -66,9 +72,9 @@ class CompareSvc(_AnalystService):
 
 # ...............................................
     @classmethod
-    def _get_comparative_measures(cls, summary_type, summary_key):
+    def _get_comparative_measures(cls, summary_type, summary_key, data_date=None):
         out_dict = {}
-        spnet_mtx, errinfo = cls._init_sparse_matrix()
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
         if spnet_mtx is not None:
             one_stat_dict = None
             all_stat_dict = None
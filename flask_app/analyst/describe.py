@@ -1,6 +1,6 @@
 """Class for the Specify Network Name API service."""
 from http import HTTPStatus
-from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
 
 from flask_app.common.s2n_type import APIService, AnalystOutput
 from flask_app.analyst.base import _AnalystService
@@ -17,13 +17,19 @@ class DescribeSvc(_AnalystService):
 
     # ...............................................
     @classmethod
-    def get_measures(cls, summary_type=None, summary_key=None):
+    def get_measures(
+            cls, summary_type=None, summary_key=None, data_date=None, diff_date=None):
         """Return descriptive measurements for one or all dataset/species.
 
         Args:
             summary_type: data dimension for summary, ("species" or "dataset")
             summary_key: unique identifier for the data dimension being examined.  If
-                None, return stats for all identifiers.
+                None, return stats for all identifiers.  A list of identifiers, even
+                of one, or a string of comma-separated identifiers, returns stats
+                keyed by each identifier.
+            data_date: date of the source data, defaults to the current data date.
+            diff_date: optional earlier date of the source data.  If provided, also
+                return the changes in each count from diff_date to data_date.
 
         Returns:
             full_output (flask_app.common.s2n_type.AnalystOutput): including a
@@ -35,7 +41,8 @@ class DescribeSvc(_AnalystService):
         stat_dict = {}
         try:
             good_params, errinfo = cls._standardize_params(
-                summary_type=summary_type, summary_key=summary_key)
+                summary_type=summary_type, summary_key=summary_key,
+                data_date=data_date, diff_date=diff_date)
         except BadRequest as e:
             errinfo = {"error": [e.description]}
         except Exception:
@@ -45,7 +52,16 @@ class DescribeSvc(_AnalystService):
             if good_params["summary_type"] is not None:
                 try:
                     stat_dict, errors = cls._get_measures(
-                        good_params["summary_type"], good_params["summary_key"])
+                        good_params["summary_type"], good_params["summary_key"],
+                        data_date=good_params["data_date"])
+                    if good_params["diff_date"] is not None:
+                        stat_dict, errors = cls._add_changes(
+                            good_params["summary_type"], good_params["summary_key"],
+                            stat_dict, errors, good_params["data_date"],
+                            good_params["diff_date"])
+                except ServiceUnavailable:
+                    # Matrix is still loading, respond 503 with Retry-After
+                    raise
                 except Exception:
                     errinfo = add_errinfo(errinfo, "error", get_traceback())
                 else:
@@ -64,9 +80,14 @@ class DescribeSvc(_AnalystService):
 
     # ...............................................
     @classmethod
-    def _get_measures(cls, summary_type, summary_key):
+    def _get_measures(cls, summary_type, summary_key, data_date=None):
+        summary_keys = cls._split_summary_keys(summary_key)
+        if summary_keys is not None:
+            return cls._get_batch_measures(
+                summary_type, summary_keys, data_date=data_date)
+
         stat_dict = {}
-        spnet_mtx, errinfo = cls._init_sparse_matrix()
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
         if spnet_mtx is not None:
             if summary_type == "dataset":
                 try:
@@ -95,6 +116,85 @@ class DescribeSvc(_AnalystService):
         out_dict = {f"{summary_type.capitalize()} Statistics":  stat_dict}
         return out_dict, errinfo
 
+    # ...............................................
+    @classmethod
+    def _split_summary_keys(cls, summary_key):
+        # Return a list of keys for a batch request, None for one or all keys
+        if summary_key is None:
+            return None
+        if isinstance(summary_key, str):
+            if "," not in summary_key:
+                return None
+            summary_key = summary_key.split(",")
+        summary_keys = [k.strip() for k in summary_key if k and k.strip()]
+        return summary_keys
+
+    # ...............................................
+    @classmethod
+    def _get_batch_measures(cls, summary_type, summary_keys, data_date=None):
+        stat_dict = {}
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
+        if spnet_mtx is not None:
+            try:
+                if summary_type == "dataset":
+                    stat_dict, missing = spnet_mtx.get_columns_stats(summary_keys)
+                # other valid option is "species"
+                else:
+                    stat_dict, missing = spnet_mtx.get_rows_stats(summary_keys)
+            except Exception:
+                errinfo = add_errinfo(
+                    errinfo, "error",
+                    [HTTPStatus.INTERNAL_SERVER_ERROR, get_traceback()])
+            else:
+                if missing:
+                    errinfo = add_errinfo(
+                        errinfo, "warning",
+                        [f"Key {k} does not exist in {summary_type}" for k in missing])
+
+        out_dict = {f"{summary_type.capitalize()} Statistics":  stat_dict}
+        return out_dict, errinfo
+
+    # ...............................................
+    @classmethod
+    def _add_changes(
+            cls, summary_type, summary_key, out_dict, errinfo, data_date, diff_date):
+        stats_key = f"{summary_type.capitalize()} Statistics"
+        prev_dict, prev_errinfo = cls._get_measures(
+            summary_type, summary_key, data_date=diff_date)
+        # Keys missing from the earlier matrix are new, so changes are from zero
+        for msgs in prev_errinfo.values():
+            errinfo = add_errinfo(
+                errinfo, "warning", [f"{diff_date}: {msg}" for msg in msgs])
+
+        stat_dict = out_dict.get(stats_key, {})
+        prev_stat_dict = prev_dict.get(stats_key, {})
+        summary_keys = cls._split_summary_keys(summary_key)
+        if summary_keys is not None:
+            changes = {
+                key: cls._diff_stats(stats, prev_stat_dict.get(key, {}))
+                for key, stats in stat_dict.items()
+            }
+        else:
+            changes = cls._diff_stats(stat_dict, prev_stat_dict)
+        out_dict[f"{summary_type.capitalize()} Changes"] = {
+            "data_date": data_date,
+            "diff_date": diff_date,
+            "changes": changes
+        }
+        return out_dict, errinfo
+
+    # ...............................................
+    @staticmethod
+    def _diff_stats(stats, prev_stats):
+        # Differences of numeric measures only, labels are not comparable
+        changes = {}
+        for fld, val in stats.items():
+            prev_val = prev_stats.get(fld, 0)
+            if (isinstance(val, (int, float)) and not isinstance(val, bool)
+                    and isinstance(prev_val, (int, float))):
+                changes[fld] = val - prev_val
+        return changes
+
 
 # .............................................................................
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+"""Class for the Specify Network Distribution API service."""
+from http import HTTPStatus
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from flask_app.common.s2n_type import APIService, AnalystOutput
+from flask_app.analyst.base import _AnalystService
+
+from sppy.tools.util.utils import (
+    add_errinfo, combine_errinfo, get_traceback, prettify_object)
+
+
+# .............................................................................
+class DistributionSvc(_AnalystService):
+    """Specify Network API service for distributions of dataset or species counts."""
+    SERVICE_TYPE = APIService.Distribution
+    ORDERED_FIELDNAMES = []
+
+    # ...............................................
+    @classmethod
+    def get_distribution(cls, summary_type=None, summary_key=None, data_date=None):
+        """Return count distributions for a dimension, or where one identifier ranks.
+
+        Args:
+            summary_type: data dimension for distribution, ("species" or "dataset")
+            summary_key: optional unique identifier for the data dimension being
+                examined.  If None, describe the distributions for all identifiers.
+            data_date: date of the source data, defaults to the current data date.
+
+        Returns:
+            full_output (flask_app.common.s2n_type.AnalystOutput): including a
+                dictionary (JSON) of a record containing keywords with values.
+        """
+        if summary_type is None and summary_key is None:
+            return cls.get_endpoint()
+
+        out_dict = {}
+        try:
+            good_params, errinfo = cls._standardize_params(
+                summary_type=summary_type, summary_key=summary_key,
+                data_date=data_date)
+        except BadRequest as e:
+            errinfo = {"error": [e.description]}
+        except Exception:
+            errinfo = {"error": [get_traceback()]}
+
+        else:
+            if good_params["summary_type"] is None:
+                options = cls.SERVICE_TYPE["params"]["summary_type"]["options"]
+                errors = {
+                    "error": [f"Must provide summary_type key with value in {options}"]}
+            else:
+                try:
+                    out_dict, errors = cls._get_distribution(
+                        good_params["summary_type"], good_params["summary_key"],
+                        data_date=good_params["data_date"])
+                except ServiceUnavailable:
+                    # Matrix is still loading, respond 503 with Retry-After
+                    raise
+                except Exception:
+                    errors = {"error": [get_traceback()]}
+            # Combine errors from success or failure
+            errinfo = combine_errinfo(errinfo, errors)
+
+        # Assemble
+        full_out = AnalystOutput(
+            cls.SERVICE_TYPE["name"], description=cls.SERVICE_TYPE["description"],
+            output=out_dict, errors=errinfo)
+
+        return full_out.response
+
+    # ...............................................
+    @classmethod
+    def _get_distribution(cls, summary_type, summary_key, data_date=None):
+        out_dict = {}
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
+        if spnet_mtx is not None:
+            # Datasets are columns (axis 1), species are rows (axis 0)
+            axis = 1 if summary_type == "dataset" else 0
+            try:
+                if summary_key is None:
+                    out_dict = {
+                        f"{summary_type.capitalize()} Distribution":
+                            spnet_mtx.describe_distributions(axis)
+                    }
+                else:
+                    out_dict = {
+                        f"{summary_type.capitalize()} Percentile":
+                            spnet_mtx.get_percentile_ranks(summary_key, axis)
+                    }
+            except IndexError:
+                errinfo = add_errinfo(
+                    errinfo, "error",
+                    f"Key {summary_key} does not exist in {summary_type}")
+            except Exception:
+                errinfo = add_errinfo(
+                    errinfo, "error",
+                    [HTTPStatus.INTERNAL_SERVER_ERROR, get_traceback()])
+        return out_dict, errinfo
+
+
+# .............................................................................
+if __name__ == "__main__":
+    dataset_key = "3e2d26d9-2776-4bec-bdc7-bab3842ffb6b"
+
+    print("**** Endpoint ****")
+    svc = DistributionSvc()
+    response = svc.get_endpoint()
+    print(prettify_object(response))
+
+    print("**** dataset distribution ****")
+    response = svc.get_distribution(summary_type="dataset")
+    print(prettify_object(response))
+
+    print("**** dataset_key ****")
+    response = svc.get_distribution(summary_type="dataset", summary_key=dataset_key)
+    print(prettify_object(response))
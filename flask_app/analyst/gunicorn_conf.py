@@ -0,0 +1,30 @@
+"""Gunicorn settings for the Specify Network analyst services.
+
+Run with:
+    gunicorn -c python:flask_app.analyst.gunicorn_conf flask_app.analyst.routes:app
+"""
+import os
+
+# Import the app, and with ANALYST_PRELOAD set, load data, once in the master process,
+# so forked workers share the loaded arrays copy-on-write
+preload_app = True
+bind = "0.0.0.0:5000"
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+
+
+# .....................................................................................
+def post_fork(server, worker):
+    """Reset matrix loading state in each worker, then load data if not preloaded.
+
+    Args:
+        server (gunicorn.arbiter.Arbiter): gunicorn master process.
+        worker (gunicorn.workers.base.Worker): newly forked worker process.
+    """
+    from flask_app.analyst.base import _AnalystService
+    from flask_app.analyst.matrix_registry import MatrixRegistry
+
+    MatrixRegistry.reset_after_fork()
+    if not _AnalystService.is_ready():
+        # Preload failed or was not requested, load in the background of this worker
+        server.log.info(f"Worker {worker.pid} loading data in the background")
+        _AnalystService.prefetch()
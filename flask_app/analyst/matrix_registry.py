@@ -0,0 +1,289 @@
+"""Process-wide registry of matrices resident in memory for the analyst services."""
+import itertools
+import os
+import threading
+import time
+from werkzeug.exceptions import ServiceUnavailable
+
+try:
+    # Maximum bytes of matrices to keep resident in each worker process
+    MATRIX_MEMORY_BUDGET = int(os.environ["MATRIX_MEMORY_BUDGET"])
+except (KeyError, ValueError):
+    MATRIX_MEMORY_BUDGET = 4 * 1024 ** 3
+try:
+    # Maximum seconds a request waits for a matrix being loaded
+    MATRIX_WAIT_SECONDS = float(os.environ["MATRIX_WAIT_SECONDS"])
+except (KeyError, ValueError):
+    MATRIX_WAIT_SECONDS = 20
+# Seconds a client is asked to wait before retrying while a matrix loads
+MATRIX_RETRY_AFTER_SECONDS = 30
+try:
+    # Seconds before loading a matrix again after a failed load
+    MATRIX_RETRY_FAILED_SECONDS = float(os.environ["MATRIX_RETRY_FAILED_SECONDS"])
+except (KeyError, ValueError):
+    MATRIX_RETRY_FAILED_SECONDS = 5 * 60
+
+
+# .............................................................................
+class _MatrixLoad:
+    """State of one background load of a matrix, shared with requests waiting on it."""
+
+    def __init__(self):
+        """Constructor."""
+        self.done = threading.Event()
+        self.matrix = None
+        self.errinfo = {}
+
+
+# .............................................................................
+class MatrixRegistry:
+    """Hold loaded matrices so each worker process reads data files only once.
+
+    Note:
+        Matrices are keyed by (table_type, data_datestr), so several data dates of a
+            table may be resident at once, i.e. to compare this month to last.
+        When registering a matrix brings the total size over the memory budget, the
+            least recently used matrices are evicted.  The newly registered matrix
+            is never evicted, even if it alone exceeds the budget.
+        Matrices cache results on demand, i.e. a compressed row copy or summaries,
+            so the size of a matrix is measured again each time it is returned, and
+            if it has grown, least recently used matrices are evicted again.
+        The dictionary of matrices is replaced in a single assignment, so concurrent
+            requests see either the old or the new set of matrices, never a partial
+            one.
+        Matrices are loaded (and downloaded if needed) in a background thread.
+            Requests wait for the load up to a timeout, then receive a 503 Service
+            Unavailable response with a Retry-After header, so request threads are
+            never blocked for the whole download.
+        After a failed load, requests receive the errors of that load, without
+            starting another download, until retry_failed_seconds have passed.
+        When gunicorn runs with --preload, matrices registered in the master process
+            before forking are shared copy-on-write by all worker processes.
+    """
+    _matrices = {}
+    # Loads in progress, keyed by (table_type, data_datestr)
+    _loading = {}
+    # Time after which to retry failed loads, and their errors, with the same keys
+    _failures = {}
+    # Size in bytes and last use (a counter value) of each resident matrix
+    _sizes = {}
+    _last_used = {}
+    _clock = itertools.count()
+    _lock = threading.Lock()
+    memory_budget = MATRIX_MEMORY_BUDGET
+    wait_seconds = MATRIX_WAIT_SECONDS
+    retry_after_seconds = MATRIX_RETRY_AFTER_SECONDS
+    retry_failed_seconds = MATRIX_RETRY_FAILED_SECONDS
+
+    # ...............................................
+    @classmethod
+    def get_matrix(cls, table_type, data_datestr, loader, timeout=None):
+        """Return a resident matrix, loading it with `loader` if not yet present.
+
+        Args:
+            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                aggregated data
+            data_datestr (str): date of the source data in YYYY_MM_DD format.
+            loader (function): function with no arguments returning a matrix object
+                (or None) and a dictionary of errors/info from loading it.
+            timeout (float): maximum seconds to wait for a matrix being loaded,
+                defaults to wait_seconds.
+
+        Returns:
+            matrix (object): resident matrix for table_type and data_datestr, or None
+                if it could not be loaded.
+            errinfo (dict): errors/info from loading the matrix, empty if the matrix
+                was already resident, or from the last failed load if it is not yet
+                time to retry.
+
+        Raises:
+            ServiceUnavailable: on matrix still loading after timeout seconds.
+        """
+        key = (table_type, data_datestr)
+        try:
+            matrix = cls._matrices[key]
+        except KeyError:
+            pass
+        else:
+            cls._last_used[key] = next(cls._clock)
+            cls._update_size(key, matrix)
+            return matrix, {}
+
+        failure = cls._get_recent_failure(key)
+        if failure is not None:
+            return None, failure
+        load = cls._start_load(key, loader)
+        if load is None:
+            # Registered between the lookup above and the lock
+            return cls.get_matrix(table_type, data_datestr, loader, timeout=timeout)
+        if timeout is None:
+            timeout = cls.wait_seconds
+        if not load.done.wait(timeout):
+            raise ServiceUnavailable(
+                description=f"Data for {table_type} {data_datestr} is loading, "
+                f"retry in {cls.retry_after_seconds} seconds",
+                retry_after=cls.retry_after_seconds)
+        return load.matrix, load.errinfo
+
+    # ...............................................
+    @classmethod
+    def prefetch(cls, table_type, data_datestr, loader):
+        """Start loading a matrix in the background, if not resident or loading.
+
+        Args:
+            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                aggregated data
+            data_datestr (str): date of the source data in YYYY_MM_DD format.
+            loader (function): function with no arguments returning a matrix object
+                (or None) and a dictionary of errors/info from loading it.
+        """
+        key = (table_type, data_datestr)
+        if key not in cls._matrices and cls._get_recent_failure(key) is None:
+            cls._start_load(key, loader)
+
+    # ...............................................
+    @classmethod
+    def _get_recent_failure(cls, key):
+        # Errors of a failed load, if it is not yet time to retry it
+        try:
+            retry_time, errinfo = cls._failures[key]
+        except KeyError:
+            return None
+        if time.monotonic() < retry_time:
+            return errinfo
+        return None
+
+    # ...............................................
+    @classmethod
+    def _start_load(cls, key, loader):
+        # Only one thread loads a matrix, others wait on the same load
+        with cls._lock:
+            if key in cls._matrices:
+                return None
+            try:
+                load = cls._loading[key]
+            except KeyError:
+                load = _MatrixLoad()
+                cls._loading[key] = load
+                thread = threading.Thread(
+                    target=cls._load, args=(key, loader, load),
+                    name=f"load_{key[0]}_{key[1]}", daemon=True)
+                thread.start()
+        return load
+
+    # ...............................................
+    @classmethod
+    def _load(cls, key, loader, load):
+        try:
+            matrix, errinfo = loader()
+        except Exception as e:
+            matrix, errinfo = None, {"error": [f"Failed to load {key}: {e}"]}
+        with cls._lock:
+            if matrix is not None:
+                cls._register(key, matrix)
+                cls._failures.pop(key, None)
+            else:
+                # A failed load is retried by a request after a delay, so that
+                # every request does not start another download
+                cls._failures[key] = (
+                    time.monotonic() + cls.retry_failed_seconds, errinfo)
+            del cls._loading[key]
+        load.matrix = matrix
+        load.errinfo = errinfo
+        load.done.set()
+
+    # ...............................................
+    @classmethod
+    def is_resident(cls, table_type, data_datestr):
+        """Return whether a matrix is loaded and registered.
+
+        Args:
+            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                aggregated data
+            data_datestr (str): date of the source data in YYYY_MM_DD format.
+
+        Returns:
+            bool: True if the matrix is resident, False if not loaded or loading.
+        """
+        return (table_type, data_datestr) in cls._matrices
+
+    # ...............................................
+    @classmethod
+    def get_data_dates(cls, table_type):
+        """Return the data dates of resident matrices for a table type.
+
+        Args:
+            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
+                aggregated data
+
+        Returns:
+            list of str: data dates in YYYY_MM_DD format, in ascending order.
+        """
+        return sorted([k[1] for k in cls._matrices if k[0] == table_type])
+
+    # ...............................................
+    @staticmethod
+    def _get_size(matrix):
+        # Matrices without a size estimate do not count against the budget
+        return getattr(matrix, "nbytes", 0)
+
+    # ...............................................
+    @classmethod
+    def _register(cls, key, matrix):
+        # Called with the lock held
+        matrices = dict(cls._matrices)
+        matrices[key] = matrix
+        cls._sizes[key] = cls._get_size(matrix)
+        cls._last_used[key] = next(cls._clock)
+        cls._matrices = cls._evict(matrices, key)
+
+    # ...............................................
+    @classmethod
+    def _update_size(cls, key, matrix):
+        # Results cached since the last measurement count against the budget
+        size = cls._get_size(matrix)
+        if size == cls._sizes.get(key):
+            return
+        with cls._lock:
+            if cls._matrices.get(key) is matrix:
+                cls._sizes[key] = size
+                cls._matrices = cls._evict(dict(cls._matrices), key)
+
+    # ...............................................
+    @classmethod
+    def _evict(cls, matrices, key):
+        # Called with the lock held.  Evict least recently used matrices, other than
+        # key, from a copy of the resident matrices until under budget
+        candidates = sorted(
+            [k for k in matrices if k != key], key=lambda k: cls._last_used.get(k, -1))
+        total = sum([cls._sizes.get(k, 0) for k in matrices])
+        for old_key in candidates:
+            if total <= cls.memory_budget:
+                break
+            del matrices[old_key]
+            total -= cls._sizes.pop(old_key, 0)
+            cls._last_used.pop(old_key, None)
+        return matrices
+
+    # ...............................................
+    @classmethod
+    def reset_after_fork(cls):
+        """Reset thread state in a newly forked worker, keeping resident matrices.
+
+        Note:
+            Loader threads of the parent process do not exist in the child, so loads
+                in progress at the fork would never finish, and the lock may have been
+                held by one of them.
+        """
+        cls._lock = threading.Lock()
+        cls._loading = {}
+
+    # ...............................................
+    @classmethod
+    def clear(cls):
+        """Remove all resident matrices, and forget failed loads."""
+        with cls._lock:
+            cls._matrices = {}
+            cls._failures = {}
+            cls._sizes = {}
+            cls._last_used = {}
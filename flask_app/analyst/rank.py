@@ -1,12 +1,13 @@
 """Class for the Specify Network Name API service."""
-from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
 
 from flask_app.common.s2n_type import APIService, AnalystOutput
 from flask_app.analyst.base import _AnalystService
 
 from sppy.aws.aws_constants import PROJ_BUCKET
 from sppy.tools.s2n.spnet import SpNetAnalyses
-from sppy.tools.util.utils import (combine_errinfo, get_traceback, prettify_object)
+from sppy.tools.util.utils import (
+    add_errinfo, combine_errinfo, get_traceback, prettify_object)
 
 
 # .............................................................................
@@ -17,7 +18,7 @@ class RankSvc(_AnalystService):
 
     # ...............................................
     @classmethod
-    def rank_counts(cls, summary_type, rank_by, order=None, limit=10):
+    def rank_counts(cls, summary_type, rank_by, order=None, limit=10, data_date=None):
         """Return occurrence and species counts for dataset/organization identifiers.
 
         Args:
@@ -28,6 +29,7 @@ class RankSvc(_AnalystService):
             order: rank in "descending" or "ascending" order.
             limit: integer URL parameter specifying the number of ordered records to
                 return.
+            data_date: date of the source data, defaults to the current data date.
 
             full_output (flask_app.common.s2n_type.AnalystOutput): including records
                 as a list of lists (CSV) or dictionaries (JSON) of records
@@ -42,7 +44,8 @@ class RankSvc(_AnalystService):
         records = []
         try:
             good_params, errinfo = cls._standardize_params(
-                summary_type=summary_type, rank_by=rank_by, order=order, limit=limit)
+                summary_type=summary_type, rank_by=rank_by, order=order, limit=limit,
+                data_date=data_date)
 
         except BadRequest as e:
             errinfo = {"error": [e.description]}
@@ -52,7 +55,11 @@ class RankSvc(_AnalystService):
             try:
                 records, errors = cls._get_ordered_counts(
                     good_params["summary_type"], good_params["rank_by"],
-                    good_params["order"], good_params["limit"])
+                    good_params["order"], good_params["limit"],
+                    data_date=good_params["data_date"])
+            except ServiceUnavailable:
+                # Matrix is still loading, respond 503 with Retry-After
+                raise
             except Exception:
                 errors = {"error": [get_traceback()]}
 
@@ -68,21 +75,29 @@ class RankSvc(_AnalystService):
 
     # ...............................................
     @classmethod
-    def _get_ordered_counts(cls, summary_type, rank_by, order, limit):
+    def _get_ordered_counts(cls, summary_type, rank_by, order, limit, data_date=None):
         records = []
-        spnet = SpNetAnalyses(PROJ_BUCKET)
-        if summary_type == "dataset":
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
+        if spnet_mtx is not None:
+            # Datasets are columns (axis 1), species are rows (axis 0)
+            axis = 1 if summary_type == "dataset" else 0
+            # Occurrences are matrix values, other dimension is non-zero elements
+            measure = "total" if rank_by == "occurrence" else "count"
             try:
-                records, errinfo = spnet.rank_dataset_counts(rank_by, order, limit)
+                records = spnet_mtx.rank_vectors(
+                    axis=axis, rank_by=measure, descending=(order != "ascending"),
+                    limit=limit)
             except Exception:
-                errinfo = {"error": [get_traceback()]}
-        # species
-        else:
-            errinfo = {"error": ["Only dataset ranks are currently available"]}
-            # try:
-            #     records, errinfo = spnet.rank_species_counts(rank_by, order, limit)
-            # except Exception:
-            #     errinfo = {"error": [get_traceback()]}
+                errinfo = add_errinfo(errinfo, "error", get_traceback())
+
+        # Without the matrix, datasets may still be ranked from the S3 counts table
+        elif summary_type == "dataset":
+            spnet = SpNetAnalyses(PROJ_BUCKET)
+            try:
+                records, errors = spnet.rank_dataset_counts(rank_by, order, limit)
+            except Exception:
+                errors = {"error": [get_traceback()]}
+            errinfo = combine_errinfo(errinfo, errors)
 
         return records, errinfo
 
@@ -111,6 +126,11 @@ if __name__ == "__main__":
     response = svc.rank_counts(summary_type, rank_by, order="ascending")
     print(prettify_object(response))
 
+    summary_type = "species"
+    rank_by = "dataset"
+    response = svc.rank_counts(summary_type, rank_by, limit=limit)
+    print(prettify_object(response))
+
 """
 from flask_app.analyst.rank import *
 
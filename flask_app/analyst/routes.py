@@ -1,12 +1,25 @@
 """URL Routes for the Specify Network API services."""
 from flask import Blueprint, Flask, render_template, request
+from http import HTTPStatus
+import os
+from werkzeug.exceptions import ServiceUnavailable
 
+from flask_app.analyst.base import _AnalystService
 from flask_app.analyst.compare import CompareSvc
 from flask_app.analyst.describe import DescribeSvc
+from flask_app.analyst.distribution import DistributionSvc
 from flask_app.analyst.rank import RankSvc
+from flask_app.analyst.similar import SimilarSvc
 from flask_app.common.constants import (
     STATIC_DIR, TEMPLATE_DIR)
-from flask_app.common.s2n_type import APIEndpoint
+from flask_app.common.s2n_type import AnalystOutput, APIEndpoint
+from flask_app.analyst.matrix_registry import MatrixRegistry
+
+from sppy.aws.aws_tools import get_current_datadate_str
+from sppy.tools.s2n.constants import SUMMARY_TABLE_TYPES
+
+# Load data on import, i.e. in the gunicorn master process when run with --preload
+ANALYST_PRELOAD = os.environ.get("ANALYST_PRELOAD", "").lower() in ("1", "true", "yes")
 
 analyst_blueprint = Blueprint(
     "analyst", __name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR,
@@ -16,6 +29,42 @@ app = Flask(__name__)
 app.config["JSON_SORT_KEYS"] = False
 app.register_blueprint(analyst_blueprint)
 
+if ANALYST_PRELOAD:
+    for _key, _vals in _AnalystService.preload().items():
+        app.logger.info(f"Preload {_key}: {_vals}")
+
+# Service answering each endpoint, to describe it in error responses
+ENDPOINT_SERVICES = {
+    "describe_endpoint": DescribeSvc,
+    "compare_endpoint": CompareSvc,
+    "distribution_endpoint": DistributionSvc,
+    "rank_endpoint": RankSvc,
+    "similar_endpoint": SimilarSvc,
+}
+
+
+# .....................................................................................
+@app.errorhandler(ServiceUnavailable)
+def handle_service_unavailable(e):
+    """Respond to a request for data that is still loading.
+
+    Args:
+        e (werkzeug.exceptions.ServiceUnavailable): exception raised while waiting
+            for a matrix to load.
+
+    Returns:
+        response: A flask_app.analyst API response object containing the reason in
+            errors, with status 503 and a Retry-After header.
+    """
+    svc = ENDPOINT_SERVICES.get(request.endpoint, _AnalystService)
+    full_out = AnalystOutput(
+        svc.SERVICE_TYPE["name"], description=svc.SERVICE_TYPE["description"],
+        errors={"error": [e.description]})
+    headers = {}
+    if e.retry_after is not None:
+        headers["Retry-After"] = str(e.retry_after)
+    return full_out.response, HTTPStatus.SERVICE_UNAVAILABLE, headers
+
 
 # .....................................................................................
 @app.route('/')
@@ -45,6 +94,26 @@ def analyst_status():
     }
 
 
+# .....................................................................................
+@app.route("/api/v1/ready/", methods=["GET"])
+def analyst_ready():
+    """Report whether data for the current data date is loaded.
+
+    Returns:
+        dict: current data date and data dates of loaded matrices, with status 200
+            when the current matrix is loaded, 503 otherwise.
+    """
+    data_datestr = get_current_datadate_str()
+    is_ready = _AnalystService.is_ready(data_datestr)
+    status = HTTPStatus.OK if is_ready else HTTPStatus.SERVICE_UNAVAILABLE
+    return {
+        "ready": is_ready,
+        "data_date": data_datestr,
+        "loaded_data_dates": MatrixRegistry.get_data_dates(
+            SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX)
+    }, status
+
+
 # # ..........................
 # @app.route("/api/v1/schema")
 # def display_raw_schema():
@@ -71,20 +140,35 @@ def analyst_status():
 
 
 # .....................................................................................
-@app.route("/api/v1/describe/")
+@app.route("/api/v1/describe/", methods=["GET", "POST"])
 def describe_endpoint():
     """Get the statistics for descriptive measures of some dimension of occurrence data.
 
     Returns:
         response: A flask_app.analyst API response object containing the dataset
             API response.
+
+    Note:
+        Many keys may be requested at once with comma-separated values in the
+            summary_key URL argument, or with a POST body containing JSON like
+            {"summary_type": "species", "summary_key": ["key1", "key2"]}.
     """
     type_arg = request.args.get("summary_type", default=None, type=str)
     key_arg = request.args.get("summary_key", default=None, type=str)
+    date_arg = request.args.get("data_date", default=None, type=str)
+    diff_date_arg = request.args.get("diff_date", default=None, type=str)
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        type_arg = body.get("summary_type", type_arg)
+        key_arg = body.get("summary_key", key_arg)
+        date_arg = body.get("data_date", date_arg)
+        diff_date_arg = body.get("diff_date", diff_date_arg)
     if type_arg is None:
         response = DescribeSvc.get_endpoint()
     else:
-        response = DescribeSvc.get_measures(summary_type=type_arg, summary_key=key_arg)
+        response = DescribeSvc.get_measures(
+            summary_type=type_arg, summary_key=key_arg, data_date=date_arg,
+            diff_date=diff_date_arg)
     return response
 
 
@@ -99,11 +183,32 @@ def compare_endpoint():
     """
     type_arg = request.args.get("summary_type", default=None, type=str)
     key_arg = request.args.get("summary_key", default=None, type=str)
+    date_arg = request.args.get("data_date", default=None, type=str)
     if type_arg is None:
         response = CompareSvc.get_endpoint()
     else:
         response = CompareSvc.compare_measures(
-            summary_type=type_arg, summary_key=key_arg)
+            summary_type=type_arg, summary_key=key_arg, data_date=date_arg)
+    return response
+
+
+# .....................................................................................
+@app.route("/api/v1/distribution/")
+def distribution_endpoint():
+    """Get the distribution of counts for a data dimension, or where one key ranks.
+
+    Returns:
+        response: A flask_app.analyst API response object containing the distribution
+            API response.
+    """
+    type_arg = request.args.get("summary_type", default=None, type=str)
+    key_arg = request.args.get("summary_key", default=None, type=str)
+    date_arg = request.args.get("data_date", default=None, type=str)
+    if type_arg is None:
+        response = DistributionSvc.get_endpoint()
+    else:
+        response = DistributionSvc.get_distribution(
+            summary_type=type_arg, summary_key=key_arg, data_date=date_arg)
     return response
 
 
@@ -120,6 +225,7 @@ def rank_endpoint():
     rank_by_arg = request.args.get("rank_by", default=None, type=str)
     order_arg = request.args.get("order", default=None, type=str)
     limit_arg = request.args.get("limit", default=10, type=int)
+    date_arg = request.args.get("data_date", default=None, type=str)
     print(
         f"*** type_arg={summary_type_arg}, rank_by_arg={rank_by_arg}, order_arg={order_arg}, "
         f"limit_arg={limit_arg} ***")
@@ -128,7 +234,31 @@ def rank_endpoint():
         response = RankSvc.get_endpoint()
     else:
         response = RankSvc.rank_counts(
-            summary_type_arg, rank_by_arg, order=order_arg, limit=limit_arg)
+            summary_type_arg, rank_by_arg, order=order_arg, limit=limit_arg,
+            data_date=date_arg)
+    return response
+
+
+# .....................................................................................
+@app.route("/api/v1/similar/")
+def similar_endpoint():
+    """Get the datasets or species overlapping most with one dataset or species.
+
+    Returns:
+        response: A flask_app.analyst API response object containing the similar
+            API response.
+    """
+    type_arg = request.args.get("summary_type", default=None, type=str)
+    key_arg = request.args.get("summary_key", default=None, type=str)
+    measure_arg = request.args.get("measure", default=None, type=str)
+    limit_arg = request.args.get("limit", default=10, type=int)
+    date_arg = request.args.get("data_date", default=None, type=str)
+    if type_arg is None:
+        response = SimilarSvc.get_endpoint()
+    else:
+        response = SimilarSvc.get_similar(
+            summary_type=type_arg, summary_key=key_arg, measure=measure_arg,
+            limit=limit_arg, data_date=date_arg)
     return response
 
 
@@ -0,0 +1,126 @@
+"""Class for the Specify Network Similar API service."""
+from http import HTTPStatus
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from flask_app.common.s2n_type import APIService, AnalystOutput
+from flask_app.analyst.base import _AnalystService
+
+from sppy.tools.util.utils import (
+    add_errinfo, combine_errinfo, get_traceback, prettify_object)
+
+
+# .............................................................................
+class SimilarSvc(_AnalystService):
+    """Specify Network API service for finding datasets or species that overlap."""
+    SERVICE_TYPE = APIService.Similar
+    ORDERED_FIELDNAMES = []
+
+    # ...............................................
+    @classmethod
+    def get_similar(
+            cls, summary_type=None, summary_key=None, measure=None, limit=10,
+            data_date=None):
+        """Return the identifiers most similar to one identifier.
+
+        Args:
+            summary_type: data dimension for comparison, ("species" or "dataset")
+            summary_key: unique identifier for the data dimension being examined.
+            measure: measure of similarity to rank by, ("jaccard", "cosine" or
+                "shared")
+            limit: integer indicating how many similar records to return.
+            data_date: date of the source data, defaults to the current data date.
+
+        Returns:
+            full_output (flask_app.common.s2n_type.AnalystOutput): including a
+                dictionary (JSON) of a record containing keywords with values.
+        """
+        if summary_type is None and summary_key is None:
+            return cls.get_endpoint()
+
+        out_dict = {}
+        try:
+            good_params, errinfo = cls._standardize_params(
+                summary_type=summary_type, summary_key=summary_key, measure=measure,
+                limit=limit, data_date=data_date)
+        except BadRequest as e:
+            errinfo = {"error": [e.description]}
+        except Exception:
+            errinfo = {"error": [get_traceback()]}
+
+        else:
+            if good_params["summary_type"] is None:
+                options = cls.SERVICE_TYPE["params"]["summary_type"]["options"]
+                errors = {
+                    "error": [f"Must provide summary_type key with value in {options}"]}
+            elif good_params["summary_key"] is None:
+                errors = {
+                    "error": ["Parameter `summary_key` is required for similar API."]}
+            else:
+                try:
+                    out_dict, errors = cls._get_similar(
+                        good_params["summary_type"], good_params["summary_key"],
+                        good_params["measure"], good_params["limit"],
+                        data_date=good_params["data_date"])
+                except ServiceUnavailable:
+                    # Matrix is still loading, respond 503 with Retry-After
+                    raise
+                except Exception:
+                    errors = {"error": [get_traceback()]}
+            # Combine errors from success or failure
+            errinfo = combine_errinfo(errinfo, errors)
+
+        # Assemble
+        full_out = AnalystOutput(
+            cls.SERVICE_TYPE["name"], description=cls.SERVICE_TYPE["description"],
+            output=out_dict, errors=errinfo)
+
+        return full_out.response
+
+    # ...............................................
+    @classmethod
+    def _get_similar(cls, summary_type, summary_key, measure, limit, data_date=None):
+        records = []
+        spnet_mtx, errinfo = cls._init_sparse_matrix(data_date)
+        if spnet_mtx is not None:
+            # Datasets are columns (axis 1), species are rows (axis 0)
+            axis = 1 if summary_type == "dataset" else 0
+            try:
+                records = spnet_mtx.get_similarity().get_similar(
+                    summary_key, axis=axis, measure=measure, limit=limit)
+            except IndexError:
+                errinfo = add_errinfo(
+                    errinfo, "error",
+                    f"Key {summary_key} does not exist in {summary_type}")
+            except Exception:
+                errinfo = add_errinfo(
+                    errinfo, "error",
+                    [HTTPStatus.INTERNAL_SERVER_ERROR, get_traceback()])
+
+        out_dict = {
+            f"{summary_type.capitalize()} Similarity": {
+                f"{summary_type}_key": summary_key,
+                "measure": measure,
+                "records": records
+            }
+        }
+        return out_dict, errinfo
+
+
+# .............................................................................
+if __name__ == "__main__":
+    dataset_key = "3e2d26d9-2776-4bec-bdc7-bab3842ffb6b"
+    species_key = "8277078 Carcharodus alceae"
+
+    print("**** Endpoint ****")
+    svc = SimilarSvc()
+    response = svc.get_endpoint()
+    print(prettify_object(response))
+
+    print("**** dataset_key ****")
+    response = svc.get_similar(summary_type="dataset", summary_key=dataset_key)
+    print(prettify_object(response))
+
+    print("**** species_key, cosine ****")
+    response = svc.get_similar(
+        summary_type="species", summary_key=species_key, measure="cosine", limit=5)
+    print(prettify_object(response))
@@ -85,7 +85,9 @@ class APIEndpoint:
     # Analyst services
     Compare = "compare"
     Describe = "describe"
+    Distribution = "distribution"
     Rank = "rank"
+    Similar = "similar"
 
     @classmethod
     def Resources(cls):
@@ -100,7 +102,9 @@ class APIEndpoint:
                 [
                     cls.Compare,
                     cls.Describe,
-                    cls.Rank
+                    cls.Distribution,
+                    cls.Rank,
+                    cls.Similar
                 ],
             cls.Broker:
                 [
@@ -191,6 +195,13 @@ class APIService:
                     "Key of type of data to compare (i.e: species_key, dataset_key)",
                 "default": None
             },
+            "data_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to query, in YYYY_MM_DD format.  "
+                    "Defaults to the current data date.",
+                "default": None
+            },
         },
         "description":
             "Compare the counts for one item in of all dimensions of the "
@@ -214,7 +225,23 @@ class APIService:
             "summary_key": {
                 "type": "",
                 "description":
-                    "Key of type of data to summarize (i.e: species_key, dataset_key)",
+                    "Key of type of data to summarize (i.e: species_key, dataset_key), "
+                    "or comma-separated keys to summarize each",
+                "default": None
+            },
+            "data_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to query, in YYYY_MM_DD format.  "
+                    "Defaults to the current data date.",
+                "default": None
+            },
+            "diff_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to compare data_date to, in YYYY_MM_DD "
+                    "format.  If provided, return the changes in counts for each "
+                    "summary_key since diff_date.",
                 "default": None
             },
         },
@@ -224,6 +251,41 @@ class APIService:
         S2nKey.RECORD_FORMAT: ""
 
     }
+    # Distributions of counts
+    Distribution = {
+        "name": APIEndpoint.Distribution,
+        "endpoint": f"{APIEndpoint.Root}/{APIEndpoint.Distribution}",
+        "params": {
+            "summary_type": {
+                "type": "",
+                "description":
+                    "Type or dimension of aggregated specimen occurrence data to "
+                    "describe the distribution of (i.e: dataset, species)",
+                "options": ["dataset", "species"],
+                "default": None
+            },
+            "summary_key": {
+                "type": "",
+                "description":
+                    "Key of type of data to find the percentile and rank of (i.e: "
+                    "species_key, dataset_key).  If omitted, return quantiles and "
+                    "histograms for all items of the type.",
+                "default": None
+            },
+            "data_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to query, in YYYY_MM_DD format.  "
+                    "Defaults to the current data date.",
+                "default": None
+            },
+        },
+        "description":
+            "Return quantiles and histograms of the occurrence counts and counts of "
+            "the other dimension for all datasets or species, or the percentile and "
+            "rank of one dataset or species in those distributions.",
+        S2nKey.RECORD_FORMAT: ""
+    }
     # Rankings
     Rank = {
         "name": APIEndpoint.Rank,
@@ -234,9 +296,8 @@ class APIService:
                 "type": "",
                 "description":
                     "Type or dimension of aggregated specimen occurrence data to "
-                    "summarize (i.e: dataset)",
-                # TODO: add species
-                "options": ["dataset"],
+                    "summarize (i.e: dataset, species)",
+                "options": ["dataset", "species"],
                 "default": "dataset"
             },
             "rank_by": {
@@ -246,8 +307,7 @@ class APIService:
                     "counts or other dimension).  Summary type must be ranked by "
                     "occurrence counts or a different data dimension.",
                 # TODO: extend dimensions to other measurements
-                # TODO: add dataset
-                "options": ["occurrence", "species"],
+                "options": ["occurrence", "species", "dataset"],
                 # None will resolve to the other dimension while there are only 2
                 "default": "occurrence",
             },
@@ -257,11 +317,62 @@ class APIService:
                 "default": "descending"
             },
             "limit": {"type": 2, "default": 10, "min": 1, "max": 500},
+            "data_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to query, in YYYY_MM_DD format.  "
+                    "Defaults to the current data date.",
+                "default": None
+            },
         },
         "description":
             "Return an ordered list of summaries of one type/dimension of data, ranked "
             "by occurrence counts or another dimension of the data for the top X "
-            "(descending) or bottom X (ascending) datasets",
+            "(descending) or bottom X (ascending) datasets or species",
+        S2nKey.RECORD_FORMAT: ""
+    }
+    # Overlap between items of one dimension
+    Similar = {
+        "name": APIEndpoint.Similar,
+        "endpoint": f"{APIEndpoint.Root}/{APIEndpoint.Similar}",
+        "params": {
+            "summary_type": {
+                "type": "",
+                "description":
+                    "Type or dimension of aggregated specimen occurrence data to "
+                    "compare (i.e: species, dataset)",
+                "options": ["dataset", "species"],
+                "default": None
+            },
+            "summary_key": {
+                "type": "",
+                "description":
+                    "Key of type of data to find similar items for (i.e: species_key, "
+                    "dataset_key)",
+                "default": None
+            },
+            "measure": {
+                "type": "",
+                "description":
+                    "Measure of similarity to rank by: jaccard (shared / combined "
+                    "species or datasets), cosine (of occurrence counts), or shared "
+                    "(count of shared species or datasets)",
+                "options": ["jaccard", "cosine", "shared"],
+                "default": "jaccard"
+            },
+            "limit": {"type": 2, "default": 10, "min": 1, "max": 500},
+            "data_date": {
+                "type": "",
+                "description":
+                    "Date of the source data to query, in YYYY_MM_DD format.  "
+                    "Defaults to the current data date.",
+                "default": None
+            },
+        },
+        "description":
+            "Return the datasets sharing the most species with a dataset, or the "
+            "species sharing the most datasets with a species, ranked by a measure "
+            "of similarity.",
         S2nKey.RECORD_FORMAT: ""
     }
     # Broker endpoints
@@ -4,10 +4,12 @@
 # --------------------------------------------------------------------------------------
 import base64
 import boto3
+from boto3.s3.transfer import create_transfer_manager, TransferConfig
 from botocore.exceptions import ClientError, SSLError
 import csv
 import certifi
 import datetime as DT
+import hashlib
 from http import HTTPStatus
 from io import BytesIO
 import json
@@ -15,7 +17,8 @@ from logging import ERROR
 import pandas as pd
 import os
 import requests
-from time import sleep
+from s3transfer.subscribers import BaseSubscriber
+import tempfile
 import xml.etree.ElementTree as ET
 
 from sppy.aws.aws_constants import (
@@ -283,7 +286,7 @@ def get_previous_datadate_str():
     n = DT.datetime.now()
     yr = n.year
     mo = n.month - 1
-    if n.month == 0:
+    if mo == 0:
         mo = 12
         yr -= 1
     date_str = f"{yr}_{mo:02d}_01"
@@ -397,44 +400,129 @@ def download_from_s3(
         Exception: on failure with SSL error to download from S3
         Exception: on failure with AWS error to download from S3
         Exception: on failure to save file locally
+        Exception: on downloaded file not matching the size or ETag of the S3 object
+
+    Note:
+        The object is downloaded to a temporary file in local_path, verified, then
+            renamed to local_filename, so local_filename never exists partially
+            written.  The download returns only when it is complete.
+        Every GET request of the download is conditional on the ETag returned by the
+            HEAD request, so an object replaced during the download fails with a
+            ClientError instead of mixing or mislabeling versions.
     """
     local_filename = os.path.join(local_path, filename)
     obj_name = f"{bucket_path}/{filename}"
-    # Delete if needed
-    if os.path.exists(local_filename):
-        if overwrite is True:
-            os.remove(local_filename)
-        else:
-            logit(logger, f"{local_filename} already exists")
-    # Download current
-    if not os.path.exists(local_filename):
-        s3_client = boto3.client("s3", region_name=region)
-        try:
-            s3_client.download_file(bucket, obj_name, local_filename)
-        except SSLError:
-            raise Exception(
-                f"Failed with SSLError to download s3://{bucket}/{obj_name}")
-        except ClientError as e:
-            raise Exception(
-                f"Failed with ClientError to download s3://{bucket}/{obj_name}, "
-                f"({e})")
-        except Exception as e:
-            raise Exception(
-                f"Failed with unknown Exception to download s3://{bucket}/{obj_name}, "
-                f"({e})")
-        else:
-            # Do not return until download to complete, allow max 5 min
-            count = 0
-            while not os.path.exists(local_filename) and count < 10:
-                sleep(seconds=30)
-            if not os.path.exists(local_filename):
-                raise Exception(f"Failed to download from S3 to {local_filename}")
-            else:
-                logit(logger, f"Downloaded from S3 to {local_filename}")
+    if os.path.exists(local_filename) and overwrite is not True:
+        logit(logger, f"{local_filename} already exists")
+        return local_filename
 
+    s3_client = boto3.client("s3", region_name=region)
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=local_path, prefix=f".{filename}.", suffix=".part")
+    os.close(fd)
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=obj_name)
+        # Only ranged GET requests are sent with IfMatch, so use them for any size
+        config = TransferConfig(multipart_threshold=1)
+        with create_transfer_manager(s3_client, config) as manager:
+            future = manager.download(
+                bucket, obj_name, tmp_filename,
+                subscribers=[_ProvideObjectHead(head)])
+            future.result()
+    except SSLError:
+        os.remove(tmp_filename)
+        raise Exception(
+            f"Failed with SSLError to download s3://{bucket}/{obj_name}")
+    except ClientError as e:
+        os.remove(tmp_filename)
+        raise Exception(
+            f"Failed with ClientError to download s3://{bucket}/{obj_name}, "
+            f"({e})")
+    except Exception as e:
+        os.remove(tmp_filename)
+        raise Exception(
+            f"Failed with unknown Exception to download s3://{bucket}/{obj_name}, "
+            f"({e})")
+
+    # ETags of objects encrypted with KMS keys or customer keys are not MD5 checksums
+    etag = head.get("ETag")
+    if (head.get("ServerSideEncryption") in ("aws:kms", "aws:kms:dsse")
+            or head.get("SSECustomerAlgorithm") is not None):
+        etag = None
+    try:
+        _verify_download(tmp_filename, head["ContentLength"], etag)
+    except Exception as e:
+        os.remove(tmp_filename)
+        raise Exception(f"Failed to download s3://{bucket}/{obj_name}, ({e})")
+    # Atomic on the same filesystem, replacing any existing file
+    os.replace(tmp_filename, local_filename)
+    logit(logger, f"Downloaded from S3 to {local_filename}")
     return local_filename
 
 
+# .............................................................................
+class _ProvideObjectHead(BaseSubscriber):
+    """Give a download the size and ETag of the object from an earlier HEAD request.
+
+    Note:
+        The transfer manager then makes no HEAD request of its own, and sends the
+            ETag as IfMatch with each GET request.
+    """
+
+    # ...........................
+    def __init__(self, head):
+        """Constructor.
+
+        Args:
+            head (dict): response of a HEAD request for the S3 object.
+        """
+        self._size = head["ContentLength"]
+        self._etag = head.get("ETag")
+
+    # ...........................
+    def on_queued(self, future, **kwargs):
+        """Set the size and ETag of the object before the download starts.
+
+        Args:
+            future (s3transfer.futures.TransferFuture): the queued download.
+            **kwargs: other arguments passed to subscribers.
+        """
+        future.meta.provide_transfer_size(self._size)
+        future.meta.provide_object_etag(self._etag)
+
+
+# .............................................................................
+def _verify_download(local_filename, content_length, etag=None):
+    """Check that a downloaded file matches the size and ETag of its S3 object.
+
+    Args:
+        local_filename (str): full path to the downloaded file.
+        content_length (int): size of the S3 object in bytes.
+        etag (str): ETag of the S3 object, or None to check only the size.
+
+    Raises:
+        Exception: on file size not equal to content_length.
+        Exception: on MD5 checksum of the file not equal to a single-part ETag.
+
+    Note:
+        The ETag of an object uploaded in one part is the MD5 checksum of its
+            contents.  ETags of multipart uploads contain "-" and are not checksums
+            of the whole object, so only the size is checked.
+    """
+    size = os.path.getsize(local_filename)
+    if size != content_length:
+        raise Exception(f"Size {size} != expected size {content_length}")
+    if etag is not None:
+        etag = etag.strip('"')
+        if "-" not in etag:
+            md5 = hashlib.md5()
+            with open(local_filename, "rb") as inf:
+                for chunk in iter(lambda: inf.read(1024 * 1024), b""):
+                    md5.update(chunk)
+            if md5.hexdigest() != etag:
+                raise Exception(f"MD5 {md5.hexdigest()} != ETag {etag}")
+
+
 # ...............................................
 def upload_to_s3(full_filename, bucket, bucket_path, region=REGION):
     """Upload a file to S3.
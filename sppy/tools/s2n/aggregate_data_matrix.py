@@ -1,6 +1,7 @@
 """Matrix to summarize 2 dimensions of data by counts of a third in a sparse matrix."""
 import json
 from logging import ERROR, INFO
+import numpy as np
 from numpy import integer as np_int, floating as np_float, ndarray
 import os
 from zipfile import ZipFile
@@ -73,6 +74,31 @@ class _AggregateDataMatrix:
         zip_fname = f"{local_path}/{basename}.zip"
         return mtx_fname, meta_fname, zip_fname
 
+    # ...............................................
+    @staticmethod
+    def add_combined_fields(stacked_df, combine_fields):
+        """Add fields constructed from 2 existing fields to stacked records.
+
+        Args:
+            stacked_df (pandas.DataFrame): DataFrame of stacked records.
+            combine_fields (dict): dictionary of new fieldnames with a tuple of 2
+                existing fieldnames to combine, i.e. the "combine_fields" value of a
+                stacked table in sppy.tools.s2n.constants.Summaries.TABLES.
+
+        Returns:
+            stacked_df (pandas.DataFrame): input DataFrame, modified in place, with a
+                new column for each new field containing the string values of the 2
+                existing fields, separated by a space.
+
+        Note:
+            Fields are combined with vectorized string operations on whole columns,
+                not row by row.
+        """
+        for fld, (fld1, fld2) in combine_fields.items():
+            stacked_df[fld] = (
+                stacked_df[fld1].astype(str) + " " + stacked_df[fld2].astype(str))
+        return stacked_df
+
     # ......................................................
     @staticmethod
     def convert_np_vals_for_json(obj):
@@ -96,6 +122,101 @@ class _AggregateDataMatrix:
         else:
             return obj
 
+    # ...............................................
+    @classmethod
+    def get_labels_filename(cls, meta_fname, labels_ext):
+        """Return the filename of binary axis labels stored with JSON metadata.
+
+        Args:
+            meta_fname (str): filename for JSON metadata.
+            labels_ext (str): extension of the labels file, from the table metadata,
+                or None if the table does not store labels apart from metadata.
+
+        Returns:
+            labels_fname (str): filename for labels, or None.
+        """
+        if labels_ext is None:
+            return None
+        basename, _ext = os.path.splitext(meta_fname)
+        return f"{basename}{labels_ext}"
+
+    # ...............................................
+    @staticmethod
+    def _encode_labels(labels):
+        # All labels in one UTF-8 buffer, newline separated
+        labels = [str(lbl) for lbl in labels]
+        text = "\n".join(labels)
+        if labels and text.count("\n") != len(labels) - 1:
+            raise Exception("Labels containing newlines cannot be stored")
+        return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+    # ...............................................
+    @staticmethod
+    def _decode_labels(buf, count):
+        if count == 0:
+            return []
+        return buf.tobytes().decode("utf-8").split("\n")
+
+    # ...............................................
+    @classmethod
+    def _dump_labels(cls, labels, labels_fname):
+        """Write row and column labels to a compact binary file, deleting existing.
+
+        Args:
+            labels (dict): lists of labels keyed by axis name, "row" and "column".
+            labels_fname (str): local output filename for labels.
+
+        Raises:
+            Exception: on label containing a newline.
+            Exception: on failure to write labels to file.
+
+        Note:
+            Each axis is saved as a byte array of UTF-8 encoded labels, which decodes
+                far faster than a JSON list.
+        """
+        if os.path.exists(labels_fname):
+            os.remove(labels_fname)
+            print(f"Removed file {labels_fname}.")
+
+        arrays = {}
+        for axis_name, axis_labels in labels.items():
+            arrays[f"{axis_name}_labels"] = cls._encode_labels(axis_labels)
+            arrays[f"{axis_name}_count"] = np.array(len(axis_labels))
+        try:
+            # np.savez appends .npz to names without it, so write to an open file
+            with open(labels_fname, "wb") as outf:
+                np.savez(outf, **arrays)
+        except Exception as e:
+            raise Exception(f"Failed to write labels to {labels_fname}: {e}")
+
+    # ...............................................
+    @classmethod
+    def load_labels(cls, labels_fname):
+        """Read row and column labels from a binary labels file.
+
+        Args:
+            labels_fname (str): Filename of labels to read.
+
+        Returns:
+            labels (dict): lists of labels keyed by axis name, "row" and "column".
+
+        Raises:
+            Exception: on failure to read file.
+        """
+        labels = {}
+        try:
+            with np.load(labels_fname) as npz:
+                for axis_name in ("row", "column"):
+                    try:
+                        buf = npz[f"{axis_name}_labels"]
+                    except KeyError:
+                        continue
+                    count = int(npz[f"{axis_name}_count"])
+                    labels[axis_name] = cls._decode_labels(buf, count)
+        except Exception as e:
+            raise Exception(f"Failed to load {labels_fname}: {e}")
+        return labels
+
     # ...............................................
     @classmethod
     def _dump_metadata(self, metadata, meta_fname):
@@ -108,11 +229,23 @@ class _AggregateDataMatrix:
         Raises:
             Exception: on failure to serialize metadata as JSON.
             Exception: on failure to write metadata json string to file.
+
+        Note:
+            For tables with a "labels_extension", row and column labels are written
+                to a binary labels file alongside the JSON, not into the JSON.
         """
         if os.path.exists(meta_fname):
             os.remove(meta_fname)
             print(f"Removed file {meta_fname}.")
 
+        labels_fname = self.get_labels_filename(
+            meta_fname, metadata.get("labels_extension"))
+        if labels_fname is not None:
+            metadata = dict(metadata)
+            labels = {
+                axis_name: metadata.pop(axis_name) for axis_name in ("row", "column")}
+            self._dump_labels(labels, labels_fname)
+
         try:
             metastr = json.dumps(metadata)
         except Exception as e:
@@ -137,6 +270,10 @@ class _AggregateDataMatrix:
         Raises:
             Exception: on failure to read file.
             Exception: on failure load JSON metadata into a dictionary
+
+        Note:
+            Row and column labels are read from a binary labels file, if the metadata
+                names a "labels_extension", otherwise from the JSON itself.
         """
         # Read JSON dictionary as string
         try:
@@ -150,6 +287,14 @@ class _AggregateDataMatrix:
         except Exception as e:
             raise Exception(f"Failed to load {meta_filename}: {e}")
 
+        labels_fname = cls.get_labels_filename(
+            meta_filename, meta_dict.get("labels_extension"))
+        if labels_fname is not None and "row" not in meta_dict:
+            try:
+                meta_dict.update(cls.load_labels(labels_fname))
+            except Exception:
+                raise
+
         return meta_dict
 
     # ...............................................
@@ -189,12 +334,27 @@ class _AggregateDataMatrix:
         # Always delete local files before compressing this data.
         overwrite = True
         [mtx_fname, meta_fname, zip_fname] = self._get_input_files(local_path=local_path)
+        expected_files = [mtx_fname, meta_fname, zip_fname]
+        labels_fname = self.get_labels_filename(
+            meta_fname, self._table.get("labels_extension"))
+        if labels_fname is not None:
+            expected_files.append(labels_fname)
         all_exist, deleted_files = self._check_for_existing_files(
-            [mtx_fname, meta_fname, zip_fname], overwrite)
+            expected_files, overwrite)
         if deleted_files:
             self._logme(f"Deleted existing files {','.join(deleted_files)}.")
         return [mtx_fname, meta_fname, zip_fname]
 
+    # .............................................................................
+    @classmethod
+    def _find_matrix_member(cls, members, basename, default_fname, local_path):
+        # Matrix file is the archive member with this basename that is not metadata
+        for member in members:
+            mbasename, ext = os.path.splitext(member)
+            if mbasename == basename and ext != ".json":
+                return f"{local_path}/{member}"
+        return default_fname
+
     # .............................................................................
     @classmethod
     def _uncompress_files(cls, zip_filename, local_path, overwrite=False):
@@ -245,6 +405,11 @@ class _AggregateDataMatrix:
             # Unzip to local dir
             with ZipFile(zip_filename, mode="r") as archive:
                 archive.extractall(f"{local_path}/")
+                members = archive.namelist()
+            # Archives written with an earlier matrix_extension (i.e. .csv)
+            if not os.path.exists(mtx_fname):
+                mtx_fname = cls._find_matrix_member(
+                    members, fname, mtx_fname, local_path)
             for fn in [mtx_fname, meta_fname]:
                 if not os.path.exists(fn):
                     raise Exception(f"Missing expected file {fn}")
@@ -4,11 +4,15 @@ import os
 
 from sppy.aws.aws_constants import (LOCAL_OUTDIR, PROJ_BUCKET, REGION, SUMMARY_FOLDER)
 from sppy.aws.aws_tools import (
-    download_from_s3, get_current_datadate_str, get_today_str,
-    read_s3_parquet_to_pandas, upload_to_s3
+    download_from_s3, get_current_datadate_str, get_previous_datadate_str,
+    get_today_str, upload_to_s3
 )
-from sppy.tools.s2n.constants import (Summaries, SUMMARY_TABLE_TYPES)
+from sppy.tools.s2n.constants import (
+    MAX_DELTA_CHAIN_LENGTH, Summaries, SUMMARY_TABLE_TYPES)
+from sppy.tools.s2n.matrix_validation import (
+    validate_stacked_to_aggregate_extremes, validate_stacked_to_aggregate_sums)
 from sppy.tools.s2n.sparse_matrix import SparseMatrix
+from sppy.tools.s2n.stacked_records import StackedParquet
 from sppy.tools.s2n.summary_matrix import SummaryMatrix
 from sppy.tools.util.logtools import Logger, logit
 
@@ -213,6 +217,101 @@ def test_stacked_to_aggregate_extremes(
     logit(logger, "")
 
 
+# ...............................................
+def read_sparse_matrix(data_datestr, local_path="/tmp", logger=None):
+    """Download the species by dataset matrix for a date, or rebuild it from deltas.
+
+    Args:
+        data_datestr (str): date of the matrix in YYYY_MM_DD format.
+        local_path (str): local path for downloaded files.
+        logger (object): logger for saving relevant processing messages
+
+    Returns:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix for
+            data_datestr.
+        chain_length (int): number of deltas applied to the last full matrix, 0 if
+            the matrix was saved in full.
+
+    Raises:
+        Exception: on neither a full matrix nor a delta available for data_datestr.
+    """
+    mtx_table_type = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
+    table = Summaries.get_table(mtx_table_type, data_datestr)
+    try:
+        zip_filename = download_from_s3(
+            PROJ_BUCKET, SUMMARY_FOLDER, f"{table['fname']}.zip",
+            local_path=local_path, logger=logger, overwrite=False)
+    except Exception as e:
+        logit(logger, f"No full matrix for {data_datestr}: {e}")
+    else:
+        sparse_coo, row_categ, col_categ, meta_dict, _table_type, _data_datestr = \
+            SparseMatrix.uncompress_zipped_data(zip_filename, local_path=local_path)
+        sparse_matrix = SparseMatrix(
+            sparse_coo, mtx_table_type, data_datestr, row_categ, col_categ,
+            axis_stats=meta_dict.get("axis_stats"), logger=logger)
+        return sparse_matrix, 0
+
+    # Apply the delta for this date to the previous matrix
+    delta_fname = SparseMatrix.get_delta_filename(table["fname"], local_path)
+    delta_filename = download_from_s3(
+        PROJ_BUCKET, SUMMARY_FOLDER, os.path.basename(delta_fname),
+        local_path=local_path, logger=logger, overwrite=False)
+    delta = SparseMatrix.read_delta_file(delta_filename)
+    prev_mtx, _prev_chain_length = read_sparse_matrix(
+        delta["prev_datestr"], local_path=local_path, logger=logger)
+    return prev_mtx.apply_column_delta(delta), delta["chain_length"]
+
+
+# ...............................................
+def update_matrix_from_previous(
+        stacked_records, x_fld, y_fld, val_fld, data_datestr, prev_datestr,
+        local_path="/tmp", logger=None):
+    """Create a matrix by patching the matrix for a previous date with changed columns.
+
+    Args:
+        stacked_records (pandas.DataFrame or iterable of pandas.DataFrame): all
+            records for data_datestr, in one DataFrame or in batches that can be read
+            more than once, containing columns to be used as rows, columns, and
+            values.
+        x_fld: column in stacked_records containing values to be used as columns
+            (axis 1)
+        y_fld: column in stacked_records containing values to be used as rows (axis 0)
+        val_fld: : column in stacked_records containing values to be used as values
+            for the intersection of x and y fields
+        data_datestr (str): date of the stacked data in YYYY_MM_DD format.
+        prev_datestr (str): date of the previous matrix in YYYY_MM_DD format.
+        local_path (str): local path for downloaded and delta files.
+        logger (object): logger for saving relevant processing messages
+
+    Returns:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix for
+            data_datestr, or None if the previous matrix is not available.
+        delta_filename (str): local file containing the delta from the previous
+            matrix, or None if the matrix should be saved in full, because there
+            is no previous matrix, or the previous MAX_DELTA_CHAIN_LENGTH matrices
+            were saved as deltas.
+    """
+    try:
+        prev_mtx, prev_chain_length = read_sparse_matrix(
+            prev_datestr, local_path=local_path, logger=logger)
+    except Exception as e:
+        logit(logger, f"No previous matrix for {prev_datestr}: {e}")
+        return None, None
+
+    # Delta applies only to the previous matrix, with the same codes
+    delta = prev_mtx.compute_column_delta(
+        stacked_records, x_fld, y_fld, val_fld, data_datestr,
+        chain_length=prev_chain_length + 1)
+    sparse_matrix = prev_mtx.apply_column_delta(delta)
+    delta_filename = None
+    if delta["chain_length"] <= MAX_DELTA_CHAIN_LENGTH:
+        table = Summaries.get_table(
+            SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, data_datestr)
+        delta_filename = SparseMatrix.get_delta_filename(table["fname"], local_path)
+        SparseMatrix.write_delta_file(delta, delta_filename)
+    return sparse_matrix, delta_filename
+
+
 # --------------------------------------------------------------------------------------
 # Main
 # --------------------------------------------------------------------------------------
@@ -241,70 +340,64 @@ if __name__ == "__main__":
     fld_mods = table["combine_fields"]
     # Species (taxonKey + name) in columns/y/axis 0
     stk_col_label_for_axis0 = list(fld_mods.keys())[0]
-    (fld1, fld2) = fld_mods[stk_col_label_for_axis0]
     pqt_fname = f"{table['fname']}.parquet"
 
-    # Read stacked (record) data directly into DataFrame
-    stk_df = read_s3_parquet_to_pandas(
-        PROJ_BUCKET, SUMMARY_FOLDER, pqt_fname, tst_logger, s3_client=None
-    )
-
-    # .................................
-    # Combine key and species fields to ensure uniqueness
-    def _combine_columns(row):
-        return str(row[fld1]) + ' ' + str(row[fld2])
-
-    # ......................
-    stk_df[stk_col_label_for_axis0] = stk_df.apply(_combine_columns, axis=1)
-    # .................................
-
-    # Create matrix from record data
-    agg_sparse_mtx = SparseMatrix.init_from_stacked_data(
-        stk_df, stk_col_label_for_axis1, stk_col_label_for_axis0, stk_col_label_for_val,
-        mtx_table_type, data_datestr, logger=tst_logger)
-
-    # Test raw counts between stacked data and sparse matrix
+    # Download stacked (record) data, then read it in batches, combining key and
+    # species fields to ensure uniqueness
+    pqt_filename = download_from_s3(
+        PROJ_BUCKET, SUMMARY_FOLDER, pqt_fname, local_path=local_path,
+        logger=tst_logger, overwrite=overwrite)
+    stk_records = StackedParquet(
+        pqt_filename,
+        [stk_col_label_for_axis1, stk_col_label_for_axis0, stk_col_label_for_val],
+        combine_fields=fld_mods, logger=tst_logger)
+
+    # Patch the previous month's matrix with changed datasets, if it exists
+    agg_sparse_mtx, delta_filename = update_matrix_from_previous(
+        stk_records, stk_col_label_for_axis1, stk_col_label_for_axis0,
+        stk_col_label_for_val, data_datestr, get_previous_datadate_str(),
+        local_path=local_path, logger=tst_logger)
+    # Otherwise create matrix from record data, encoding row groups on all CPUs
+    if agg_sparse_mtx is None:
+        agg_sparse_mtx = SparseMatrix.init_from_stacked_parquet(
+            pqt_filename, stk_col_label_for_axis1, stk_col_label_for_axis0,
+            stk_col_label_for_val, mtx_table_type, data_datestr,
+            combine_fields=fld_mods, max_workers=os.cpu_count(), logger=tst_logger)
+
+    # Test raw counts between stacked data and all rows/columns of sparse matrix
     for stk_lbl, axis in ((stk_col_label_for_axis0, 0), (stk_col_label_for_axis1, 1)):
         # Test stacked column used for axis 0/1 against sparse matrix axis 0/1
-        test_stacked_to_aggregate_sum(
-            stk_df, stk_lbl, stk_col_label_for_val, agg_sparse_mtx, agg_axis=axis,
-            test_count=5, logger=tst_logger)
+        validate_stacked_to_aggregate_sums(
+            stk_records, stk_lbl, stk_col_label_for_val, agg_sparse_mtx, agg_axis=axis,
+            logger=tst_logger)
 
-    # Test min/max values for rows/columns
+    # Test min/max values for all rows/columns
     for is_max in (False, True):
         for axis in (0, 1):
-            test_stacked_to_aggregate_extremes(
-                stk_df, stk_col_label_for_axis0, stk_col_label_for_axis1,
-                stk_col_label_for_val, agg_sparse_mtx, agg_axis=axis, test_count=5,
+            validate_stacked_to_aggregate_extremes(
+                stk_records, stk_col_label_for_axis0, stk_col_label_for_axis1,
+                stk_col_label_for_val, agg_sparse_mtx, agg_axis=axis,
                 logger=tst_logger, is_max=is_max)
 
     # .................................
-    # Save sparse matrix to S3
+    # Save sparse matrix, or only the delta from the previous matrix, to S3
     # .................................
-    out_filename = agg_sparse_mtx.compress_to_file()
-    upload_to_s3(out_filename, PROJ_BUCKET, SUMMARY_FOLDER, REGION)
+    if delta_filename is not None:
+        upload_to_s3(delta_filename, PROJ_BUCKET, SUMMARY_FOLDER, REGION)
+    else:
+        out_filename = agg_sparse_mtx.compress_to_file(local_path=local_path)
+        upload_to_s3(out_filename, PROJ_BUCKET, SUMMARY_FOLDER, REGION)
+        # Save uncompressed arrays next to the zip, for memory-mapping on the server
+        for out_filename in agg_sparse_mtx.write_memmap_files(local_path=local_path):
+            upload_to_s3(out_filename, PROJ_BUCKET, SUMMARY_FOLDER, REGION)
     # Copy logfile to S3
     upload_to_s3(tst_logger.filename, PROJ_BUCKET, SUMMARY_FOLDER, REGION)
 
     # .................................
-    # Download data and recreate sparse matrix
+    # Download data and recreate sparse matrix, from a full matrix or deltas
     # .................................
-    table = Summaries.get_table(mtx_table_type, data_datestr)
-    zip_fname = f"{table['fname']}.zip"
-    # Only download if file does not exist
-    zip_filename = download_from_s3(
-        PROJ_BUCKET, SUMMARY_FOLDER, zip_fname, local_path=local_path,
-        overwrite=overwrite)
-
-    # Only extract if files do not exist
-    sparse_coo, row_categ, col_categ, table_type, _data_datestr = \
-        SparseMatrix.uncompress_zipped_data(
-            zip_filename, local_path=local_path, overwrite=overwrite)
-
-    # Create
-    sp_mtx = SparseMatrix(
-        sparse_coo, mtx_table_type, data_datestr, row_categ, col_categ,
-        logger=tst_logger)
+    sp_mtx, _chain_length = read_sparse_matrix(
+        data_datestr, local_path=local_path, logger=tst_logger)
 
     # .................................
     # Create 2 summary matrices from sparse matrix and upload
@@ -376,7 +469,6 @@ stk_col_label_for_val = table["value_fld"]
 fld_mods = table["combine_fields"]
 # Species (taxonKey + name) in columns/y/axis 0
 stk_col_label_for_axis0 = list(fld_mods.keys())[0]
-(fld1, fld2) = fld_mods[stk_col_label_for_axis0]
 pqt_fname = f"{table['fname']}.parquet"
 
 # Read stacked (record) data directly into DataFrame
@@ -384,14 +476,8 @@ stk_df = read_s3_parquet_to_pandas(
     PROJ_BUCKET, SUMMARY_FOLDER, pqt_fname, tst_logger, s3_client=None
 )
 
-# .................................
 # Combine key and species fields to ensure uniqueness
-def _combine_columns(row):
-    return str(row[fld1]) + ' ' + str(row[fld2])
-
-# ......................
-stk_df[stk_col_label_for_axis0] = stk_df.apply(_combine_columns, axis=1)
-# .................................
+stk_df = SparseMatrix.add_combined_fields(stk_df, fld_mods)
 
 # Create matrix from record data
 agg_sparse_mtx = SparseMatrix.init_from_stacked_data(
@@ -432,14 +518,15 @@ zip_filename = download_from_s3(
     overwrite=overwrite)
 
 # Only extract if files do not exist
-sparse_coo, row_categ, col_categ, table_type, _data_datestr = \
+sparse_coo, row_categ, col_categ, meta_dict, table_type, _data_datestr = \
     SparseMatrix.uncompress_zipped_data(
         zip_filename, local_path=local_path, overwrite=overwrite)
 
 # Create
 sp_mtx = SparseMatrix(
     sparse_coo, mtx_table_type, data_datestr, row_category=row_categ,
-    column_category=col_categ, logger=tst_logger)
+    column_category=col_categ, axis_stats=meta_dict.get("axis_stats"),
+    logger=tst_logger)
 
 # .................................
 # Create 2 summary matrices from sparse matrix and upload
@@ -9,6 +9,9 @@ from sppy.aws.aws_constants import (
 
 # .............................................................................
 MATRIX_SEPARATOR = ","
+# Most consecutive data dates saved as a delta from the previous matrix, rather than
+# as a full matrix
+MAX_DELTA_CHAIN_LENGTH = 6
 
 
 # .............................................................................
@@ -70,6 +73,8 @@ class Summaries:
                 "fname": f"speciesxdataset_matrix_{DATESTR_TOKEN}",
                 "table_format": "Zip",
                 "matrix_extension": ".npz",
+                # Row and column labels, stored apart from the JSON metadata
+                "labels_extension": ".labels.npz",
                 # Axis 0
                 "row": "taxonkey_species",
                 "row_summary_table": SUMMARY_TABLE_TYPES.SPECIES_DATASET_SUMMARY,
@@ -83,7 +88,7 @@ class Summaries:
                 "code": SUMMARY_TABLE_TYPES.SPECIES_DATASET_SUMMARY,
                 "fname": f"speciesxdataset_summary_{DATESTR_TOKEN}",
                 "table_format": "Zip",
-                "matrix_extension": ".csv",
+                "matrix_extension": ".parquet",
                 # Axis 0, matches row (axis 0) in SPECIES_DATASET_MATRIX
                 "row": "taxonkey_species",
                 # Axis 1
@@ -96,7 +101,7 @@ class Summaries:
                 "code": SUMMARY_TABLE_TYPES.DATASET_SPECIES_SUMMARY,
                 "fname": f"datasetxspecies_summary_{DATESTR_TOKEN}",
                 "table_format": "Zip",
-                "matrix_extension": ".csv",
+                "matrix_extension": ".parquet",
                 # Axis 0, matches column (axis 1) in SPECIES_DATASET_MATRIX
                 "row": DATASET_GBIF_KEY,
                 # Axis 1
@@ -421,9 +426,43 @@ class SNKeys(Enum):
                 cls.ALL_MEDIAN_COUNT: "median_species_count_of_all_datasets",
                 cls.ALL_MAX_COUNT: "max_species_count_of_all_datasets",
             }
-        # elif table_type == SUMMARY_TABLE_TYPES.SPECIES_DATASET_SUMMARY:
-        #     keys = {
-        #     }
+        elif table_type == SUMMARY_TABLE_TYPES.SPECIES_DATASET_SUMMARY:
+            keys = {
+                # ----------------------------------------------------------------------
+                # Row
+                # -----------------------------
+                cls.TYPE: "species",
+                # One species
+                cls.ONE_LABEL: "species_label",
+                # Count (non-zero elements in row)
+                cls.ONE_COUNT: "total_datasets_for_species",
+                # Values (total of values in row)
+                cls.ONE_TOTAL: "total_occurrences_for_species",
+                # Values: Minimum occurrence count for one species
+                cls.ONE_MIN_COUNT: "min_occurrences_for_species",
+                # Values: Maximum occurrence count for one species, dataset labels
+                cls.ONE_MAX_COUNT: "max_occurrences_for_species",
+                cls.ONE_MAX_COUNT_LABELS: "datasets_with_max_occurrences",
+                # -----------------------------
+                # All species
+                # ------------
+                # COMPARES TO:  cls.ONE_TOTAL: "total_occurrences_for_species",
+                # Values: Total of all occurrences for all species - stats
+                cls.ALL_TOTAL: "total_occurrences_of_all_species",
+                cls.ALL_MIN_TOTAL: "min_occurrences_of_all_species",
+                cls.ALL_MEAN_TOTAL: "mean_occurrences_of_all_species",
+                cls.ALL_MEDIAN_TOTAL: "median_occurrences_of_all_species",
+                cls.ALL_MAX_TOTAL: "max_occurrences_of_all_species",
+                # ------------
+                # COMPARES TO: cls.ONE_COUNT: "total_datasets_for_species",
+                # Counts: Count of all datasets (from all rows/species)
+                cls.ALL_COUNT: "total_dataset_count",
+                # Dataset counts for all species - stats
+                cls.ALL_MIN_COUNT: "min_dataset_count_of_all_species",
+                cls.ALL_MEAN_COUNT: "mean_dataset_count_of_all_species",
+                cls.ALL_MEDIAN_COUNT: "median_dataset_count_of_all_species",
+                cls.ALL_MAX_COUNT: "max_dataset_count_of_all_species",
+            }
         else:
             raise Exception(f"Keys not defined for table {table_type}")
         return keys
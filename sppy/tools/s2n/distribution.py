@@ -0,0 +1,106 @@
+"""Distribution of the totals or counts of all rows or all columns of a SparseMatrix."""
+import numpy as np
+
+from sppy.tools.s2n.aggregate_data_matrix import _AggregateDataMatrix
+
+# Quantiles precomputed for every distribution
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+
+# .............................................................................
+class Distribution:
+    """Quantiles, histogram, and percentile ranks of a set of non-negative values.
+
+    Note:
+        Values are sorted once on creation, so that the percentile rank of any value
+            is found with a binary search rather than a pass over all values.
+        Histogram bins are powers of 10, i.e. 0, 1-9, 10-99, 100-999, because totals
+            and counts of occurrences, species and datasets are highly skewed.
+    """
+
+    # ...........................
+    def __init__(self, values, quantiles=QUANTILES):
+        """Constructor.
+
+        Args:
+            values (numpy.ndarray): 1-d array of non-negative values, i.e. the total
+                or count of each row or column of a matrix.
+            quantiles (tuple of float): quantiles, between 0 and 1, to compute.
+        """
+        self._sorted = np.sort(values)
+        conv = _AggregateDataMatrix.convert_np_vals_for_json
+        self._quantiles = []
+        if self._sorted.size > 0:
+            for q, val in zip(quantiles, np.quantile(self._sorted, quantiles)):
+                self._quantiles.append({"quantile": q, "value": conv(val)})
+        self._histogram = self._compute_log_histogram()
+
+    # ...........................
+    def _compute_log_histogram(self):
+        # Bin edges 0, 1, 10, 100 ... up to the first power of 10 above the maximum
+        max_val = self._sorted[-1] if self._sorted.size > 0 else 0
+        digits = int(np.floor(np.log10(max_val))) + 1 if max_val >= 1 else 0
+        edges = np.concatenate([[0], 10 ** np.arange(digits + 1)])
+        # Number of values below each edge, in one binary search
+        bin_counts = np.diff(np.searchsorted(self._sorted, edges, side="left"))
+        histogram = [
+            {"min": int(lo), "max": int(hi) - 1, "count": int(cnt)}
+            for lo, hi, cnt in zip(edges[:-1], edges[1:], bin_counts)
+        ]
+        return histogram
+
+    # ...........................
+    @property
+    def size(self):
+        """Return the number of values in the distribution.
+
+        Returns:
+            int: number of values.
+        """
+        return self._sorted.size
+
+    # ...........................
+    @property
+    def nbytes(self):
+        """Return the memory used by the sorted values.
+
+        Returns:
+            int: number of bytes.
+        """
+        return self._sorted.nbytes
+
+    # ...........................
+    def get_quantiles(self):
+        """Return the precomputed quantiles.
+
+        Returns:
+            list of dict: quantile and value for each quantile.
+        """
+        return self._quantiles
+
+    # ...........................
+    def get_histogram(self):
+        """Return the precomputed histogram on log (powers of 10) bins.
+
+        Returns:
+            list of dict: minimum and maximum value, inclusive, and the count of
+                values for each bin.
+        """
+        return self._histogram
+
+    # ...........................
+    def get_percentile_rank(self, value):
+        """Return the percentile and rank of a value within the distribution.
+
+        Args:
+            value: value to locate, i.e. the total or count of one row or column.
+
+        Returns:
+            percentile (float): percentage of values less than or equal to value.
+            rank (int): 1 + the number of values greater than value, so that the
+                largest value has rank 1.
+        """
+        at_or_below = np.searchsorted(self._sorted, value, side="right")
+        percentile = 100.0 * at_or_below / self._sorted.size
+        rank = self._sorted.size - at_or_below + 1
+        return float(percentile), int(rank)
@@ -0,0 +1,162 @@
+"""Summary table held in memory as columns, indexed by a key field."""
+import numpy as np
+import pandas as pd
+
+
+# .............................................................................
+class IndexedTable:
+    """Columnar table answering key lookups and ordered queries in-process.
+
+    Note:
+        Replaces S3 Select queries on summary tables with one download of the table,
+            so each lookup is a hash index search rather than a request to S3.
+        Records are returned in the same form as S3 Select output, dictionaries for
+            JSON format, lists of values for CSV format.
+    """
+
+    # ...........................
+    def __init__(self, dataframe, key_fld):
+        """Constructor.
+
+        Args:
+            dataframe (pandas.DataFrame): table with a column for each field.
+            key_fld (str): fieldname of the column used to look up records.
+
+        Raises:
+            Exception: on key_fld not a column of dataframe.
+        """
+        if key_fld not in dataframe.columns:
+            raise Exception(f"Key field {key_fld} is not in table")
+        self.key_fld = key_fld
+        self.fields = [str(fld) for fld in dataframe.columns]
+        # Python objects, so records serialize to JSON without conversion
+        self._columns = {
+            str(fld): self._to_python_values(dataframe[fld])
+            for fld in dataframe.columns}
+        self._sorted_positions = {}
+        self._key_index = pd.Index(self._columns[key_fld])
+
+    # ...........................
+    @staticmethod
+    def _to_python_values(column):
+        """Return the values of a column as Python objects, with None for missing.
+
+        Args:
+            column (pandas.Series): values of one field.
+
+        Returns:
+            numpy.ndarray: object array of values, where NaN, NaT and pandas.NA are
+                replaced by None, which serializes to JSON null.
+        """
+        vals = column.to_numpy(dtype=object)
+        vals[column.isna().to_numpy()] = None
+        return vals
+
+    # ...........................
+    @classmethod
+    def read_parquet(cls, filename, key_fld):
+        """Read a table from a local parquet file.
+
+        Args:
+            filename (str): full path to a parquet file.
+            key_fld (str): fieldname of the column used to look up records.
+
+        Returns:
+            IndexedTable: table containing all records of the file.
+        """
+        return IndexedTable(pd.read_parquet(filename), key_fld)
+
+    # ...........................
+    @property
+    def size(self):
+        """Return the number of records in the table.
+
+        Returns:
+            int: number of records.
+        """
+        return len(self._key_index)
+
+    # ...........................
+    def _get_records(self, positions, format):
+        columns = [self._columns[fld][positions] for fld in self.fields]
+        if format == "JSON":
+            recs = [dict(zip(self.fields, vals)) for vals in zip(*columns)]
+        else:
+            recs = [list(vals) for vals in zip(*columns)]
+        return recs
+
+    # ...........................
+    def get_records(self, keys, format="JSON"):
+        """Return all records matching any of a list of keys.
+
+        Args:
+            keys (str or list of str): one or more values of the key field.
+            format: output format, options "CSV" or "JSON"
+
+        Returns:
+            list of records (dicts for JSON format or lists for CSV format), in
+                the order of keys, omitting keys that are not present.
+        """
+        if not (isinstance(keys, list) or isinstance(keys, tuple)):
+            keys = [keys]
+        if self._key_index.is_unique:
+            positions = self._key_index.get_indexer(keys)
+        else:
+            positions, _missing = self._key_index.get_indexer_non_unique(keys)
+        return self._get_records(positions[positions >= 0], format)
+
+    # ...........................
+    def get_values(self, keys, field):
+        """Return the value of one field for each of a list of keys.
+
+        Args:
+            keys (list of str): values of the key field.
+            field: fieldname (column) of the values to return.
+
+        Returns:
+            dict: value of field for each key, None for keys that are not present.
+                If a key is present more than once, the value of the first record.
+        """
+        if self._key_index.is_unique:
+            positions = self._key_index.get_indexer(keys)
+        else:
+            # Search only the first record of each key
+            first_positions = np.flatnonzero(~self._key_index.duplicated(keep="first"))
+            first_idx = self._key_index[first_positions].get_indexer(keys)
+            positions = np.where(first_idx >= 0, first_positions[first_idx], -1)
+        vals = self._columns[field][positions]
+        return {
+            key: (val if pos >= 0 else None)
+            for key, val, pos in zip(keys, vals, positions)}
+
+    # ...........................
+    def get_ordered_records(self, sort_field, order, limit, format="JSON"):
+        """Return the first records sorted by the values of one field.
+
+        Args:
+            sort_field: fieldname (column) to sort records on
+            order: string indicating whether to sort in "descending" or
+                "ascending" order.
+            limit: number of records to return.
+            format: output format, options "CSV" or "JSON"
+
+        Returns:
+            list of records (dicts for JSON format or lists for CSV format), with
+                the fieldnames as the first record for CSV format.
+        """
+        is_ascending = (order == "ascending")
+        # Sorted once per field and order, then each query is a slice
+        try:
+            sorted_positions = self._sorted_positions[(sort_field, is_ascending)]
+        except KeyError:
+            vals = pd.to_numeric(
+                pd.Series(self._columns[sort_field]), errors="coerce"
+            ).to_numpy(dtype=np.float64, na_value=np.nan)
+            # Negate for descending order, keeping missing values last
+            sorted_positions = np.argsort(
+                vals if is_ascending else -vals, kind="stable")
+            self._sorted_positions[(sort_field, is_ascending)] = sorted_positions
+        recs = self._get_records(sorted_positions[:limit], format)
+        if format != "JSON":
+            recs.insert(0, list(self.fields))
+        return recs
@@ -0,0 +1,177 @@
+"""Tools to validate every row and column of a SparseMatrix against stacked data."""
+import numpy as np
+import pandas as pd
+
+from sppy.tools.s2n.stacked_records import iter_record_batches
+from sppy.tools.util.logtools import logit
+
+
+# ...............................................
+def _log_mismatches(mismatches, tested_count, description, logger, max_listed=10):
+    if len(mismatches) == 0:
+        logit(logger, f"  All {tested_count} {description} equal")
+    else:
+        logit(
+            logger, f"  !!! {len(mismatches)} of {tested_count} {description} NOT "
+            f"equal, including {mismatches[:max_listed]}")
+    logit(logger, "")
+
+
+# ...............................................
+def _get_codes(labels, categories):
+    """Return matrix codes for labels, searching categories once per distinct label.
+
+    Args:
+        labels (pandas.Series): labels of a batch of stacked records.
+        categories (pandas.Index): labels of one axis of the matrix.
+
+    Returns:
+        codes (numpy.ndarray): code of each label, -1 for missing labels (None or NaN)
+            and labels not in categories.
+        absent (list): labels not in categories.
+    """
+    label_codes, uniques = pd.factorize(labels)
+    unique_codes = categories.get_indexer(uniques)
+    absent = uniques[unique_codes < 0].tolist()
+    return np.append(unique_codes, -1)[label_codes], absent
+
+
+# ...............................................
+def validate_stacked_to_aggregate_sums(
+        stk_records, stk_axis_col_label, stk_val_col_label, agg_sparse_mtx, agg_axis=0,
+        logger=None):
+    """Test for equality of sums in stacked data and all vectors of a sparse matrix.
+
+    Args:
+        stk_records (pandas.DataFrame or iterable of pandas.DataFrame): stacked data,
+            in one DataFrame or in batches, containing records with columns of
+            categorical values and counts.
+        stk_axis_col_label: column label in stacked dataframe to be used as the column
+            labels of the axis in the aggregate sparse matrix.
+        stk_val_col_label: column label in stacked dataframe for data to be used as
+            value in the aggregate sparse matrix.
+        agg_sparse_mtx (SparseMatrix): object containing a scipy.sparse.coo_array
+            with 3 columns from the stacked_df arranged as rows and columns with values
+        agg_axis (int): Axis 0 (row) or 1 (column) that corresponds with the column
+            label (stk_axis_col_label) in the original stacked data.
+        logger (object): logger for saving relevant processing messages
+
+    Returns:
+        mismatches (list): labels whose sum in the stacked data differs from the total
+            of their row or column, or which are missing from either.
+
+    Note: The sparse matrix must have been created from the stacked records.
+    """
+    logit(logger, f"Test sums on axis {agg_axis}: {stk_axis_col_label}")
+    if agg_axis == 0:
+        categories = agg_sparse_mtx.row_category.categories
+    else:
+        categories = agg_sparse_mtx.column_category.categories
+    # Sums for all labels in one pass over the stacked data, aligned with matrix codes
+    expected = np.zeros(categories.size, dtype=np.float64)
+    mismatches = []
+    for batch_df in iter_record_batches(stk_records):
+        codes, absent = _get_codes(batch_df[stk_axis_col_label], categories)
+        placed = codes >= 0
+        expected += np.bincount(
+            codes[placed], weights=batch_df[stk_val_col_label].to_numpy()[placed],
+            minlength=categories.size)
+        mismatches.extend([lbl for lbl in absent if lbl not in mismatches])
+    # Rows are totaled across axis 1
+    totals = agg_sparse_mtx.get_totals(1 - agg_axis)
+
+    mismatches.extend(categories[np.flatnonzero(expected != totals)].tolist())
+    _log_mismatches(
+        mismatches, categories.size, "stacked and aggregate sums", logger)
+    return mismatches
+
+
+# ...............................................
+def validate_stacked_to_aggregate_extremes(
+        stk_records, stk_col_label_for_axis0, stk_col_label_for_axis1,
+        stk_col_label_for_val, agg_sparse_mtx, agg_axis=0, logger=None, is_max=True):
+    """Test min/max values and labels of all matrix vectors against stacked data.
+
+    Args:
+        stk_records (pandas.DataFrame or iterable of pandas.DataFrame): stacked data,
+            in one DataFrame or in batches, containing records with columns of
+            categorical values and counts.
+        stk_col_label_for_axis0: column label in stacked dataframe to be used as the
+            row (axis 0) labels of the axis in the aggregate sparse matrix.
+        stk_col_label_for_axis1: column label in stacked dataframe to be used as the
+            column (axis 1) labels of the axis in the aggregate sparse matrix.
+        stk_col_label_for_val: column label in stacked dataframe for data to be used as
+            value in the aggregate sparse matrix.
+        agg_sparse_mtx (SparseMatrix): object containing a scipy.sparse.coo_array
+            with 3 columns from the stacked_df arranged as rows and columns with values
+        agg_axis (int): Axis 0 (row) or 1 (column) that corresponds with the column
+            label (stk_axis_col_label) in the original stacked data.
+        logger (object): logger for saving relevant processing messages
+        is_max (bool): flag indicating whether to test maximum (T) or minimum (F)
+
+    Returns:
+        mismatches (list): labels whose extreme value, or the labels on the other axis
+            containing it, differ between the stacked data and the sparse matrix.
+
+    Note: The sparse matrix must have been created from the stacked records.
+
+    Note: Records are read in one pass.  The extreme value of each label so far is
+        updated with each batch, and records equal to it are kept as candidates,
+        then candidates not equal to the final extreme value are dropped.
+    """
+    extm = "Max" if is_max is True else "Min"
+    row_categories = agg_sparse_mtx.row_category.categories
+    col_categories = agg_sparse_mtx.column_category.categories
+    # Vector labels are on this axis, attribute labels on the opposite axis
+    if agg_axis == 0:
+        filter_label, attr_label = stk_col_label_for_axis0, stk_col_label_for_axis1
+        categories, other_categories = row_categories, col_categories
+    elif agg_axis == 1:
+        filter_label, attr_label = stk_col_label_for_axis1, stk_col_label_for_axis0
+        categories, other_categories = col_categories, row_categories
+    else:
+        raise Exception(f"2D sparse array does not have axis {agg_axis}")
+    logit(logger, f"Test {extm} values on axis {agg_axis}: {filter_label}")
+
+    update = np.maximum if is_max is True else np.minimum
+    unseen = -np.inf if is_max is True else np.inf
+    stk_extremes = np.full(categories.size, unseen)
+    # Elements, as codes and values, that may contain extreme values
+    cand_codes = np.empty(0, dtype=np.int64)
+    cand_other_codes = np.empty(0, dtype=np.int64)
+    cand_vals = np.empty(0, dtype=np.float64)
+    mismatches = []
+    for batch_df in iter_record_batches(stk_records):
+        codes, absent = _get_codes(batch_df[filter_label], categories)
+        other_codes, _ = _get_codes(batch_df[attr_label], other_categories)
+        mismatches.extend([lbl for lbl in absent if lbl not in mismatches])
+        # Records with labels missing from the matrix are reported separately
+        placed = (codes >= 0) & (other_codes >= 0)
+        codes = codes[placed]
+        vals = batch_df[stk_col_label_for_val].to_numpy()[placed].astype(np.float64)
+        update.at(stk_extremes, codes, vals)
+        cand_codes = np.concatenate([cand_codes, codes])
+        cand_other_codes = np.concatenate([cand_other_codes, other_codes[placed]])
+        cand_vals = np.concatenate([cand_vals, vals])
+        is_extreme = cand_vals == stk_extremes[cand_codes]
+        cand_codes = cand_codes[is_extreme]
+        cand_other_codes = cand_other_codes[is_extreme]
+        cand_vals = cand_vals[is_extreme]
+
+    agg_extremes, agg_codes, agg_other_codes = \
+        agg_sparse_mtx.get_extreme_val_elements(axis=agg_axis, is_max=is_max)
+    stk_extremes[stk_extremes == unseen] = 0
+    bad = stk_extremes != agg_extremes
+
+    # Compare the (vector, attribute) elements containing extreme values as sets,
+    # encoded as one integer per element
+    stk_elts = np.unique(cand_codes * other_categories.size + cand_other_codes)
+    agg_elts = np.unique(
+        agg_codes.astype(np.int64) * other_categories.size + agg_other_codes)
+    diff_elts = np.setxor1d(stk_elts, agg_elts, assume_unique=True)
+    bad[diff_elts // other_categories.size] = True
+
+    mismatches.extend(categories[np.flatnonzero(bad)].tolist())
+    _log_mismatches(
+        mismatches, categories.size, f"{extm} values and labels", logger)
+    return mismatches
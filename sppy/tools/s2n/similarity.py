@@ -0,0 +1,191 @@
+"""Similarity of one row or column of a SparseMatrix to all other rows or columns."""
+import numpy as np
+
+from sppy.tools.s2n.aggregate_data_matrix import _AggregateDataMatrix
+
+
+# .............................................................................
+class SIMILARITY_MEASURE:
+    """Measures of overlap between 2 rows or 2 columns of a SparseMatrix."""
+    SHARED = "shared"
+    JACCARD = "jaccard"
+    COSINE = "cosine"
+
+    # ...........................
+    @classmethod
+    def options(cls):
+        """Return all similarity measures.
+
+        Returns:
+            list of all similarity measures.
+        """
+        return [cls.JACCARD, cls.COSINE, cls.SHARED]
+
+
+# .............................................................................
+class SparseSimilarity:
+    """Compare one row (or column) of a sparse matrix to all other rows (or columns).
+
+    Note:
+        Similarity of columns, i.e. datasets, is computed from the species they share,
+            and similarity of rows, i.e. species, from the datasets they share.
+        Shared count and Jaccard index use only the presence of non-zero values, and
+            cosine similarity uses the values (occurrence counts).
+    """
+
+    # ...........................
+    def __init__(self, csr_array, csc_array, row_category, column_category):
+        """Constructor.
+
+        Args:
+            csr_array (scipy.sparse.csr_array): matrix data in compressed row format,
+                with no duplicate entries.
+            csc_array (scipy.sparse.csc_array): the same data in compressed column
+                format, with no duplicate entries.
+            row_category (pandas.api.types.CategoricalDtype): ordered row labels used
+                to identify axis 0/rows.
+            column_category (pandas.api.types.CategoricalDtype): ordered column labels
+                used to identify axis 1/columns.
+        """
+        self._csr = csr_array
+        self._csc = csc_array
+        self._categories = {0: row_category, 1: column_category}
+        # Number of non-zero values and L2 norm of each row/column, keyed by axis
+        self._counts = {}
+        self._norms = {}
+
+    # ...........................
+    @property
+    def nbytes(self):
+        """Return the memory used by counts and norms computed on first use.
+
+        Returns:
+            int: number of bytes, excluding the shared compressed arrays and labels.
+        """
+        return int(sum([
+            vals.nbytes for vals in
+            list(self._counts.values()) + list(self._norms.values())]))
+
+    # ...........................
+    def _get_compressed(self, axis):
+        # Compressed format for slicing vectors of this axis, and for the other axis
+        if axis == 0:
+            return self._csr, self._csc
+        elif axis == 1:
+            return self._csc, self._csr
+        raise Exception(f"2D sparse array does not have axis {axis}")
+
+    # ...........................
+    def _get_counts_and_norms(self, axis):
+        # Computed once for each axis, on first use
+        if axis not in self._counts:
+            compressed, _other = self._get_compressed(axis)
+            self._counts[axis] = np.diff(compressed.indptr)
+            sq_data = compressed.data.astype(np.float64) ** 2
+            sq_totals = np.zeros(self._counts[axis].size, dtype=np.float64)
+            nonempty = np.flatnonzero(self._counts[axis])
+            if nonempty.size > 0:
+                sq_totals[nonempty] = np.add.reduceat(
+                    sq_data, compressed.indptr[nonempty])
+            self._norms[axis] = np.sqrt(sq_totals)
+        return self._counts[axis], self._norms[axis]
+
+    # ...........................
+    def _get_overlap(self, idx, axis):
+        """Compute shared counts and dot products of one vector with all others.
+
+        Args:
+            idx (int): index of the vector of interest.
+            axis (int): row (0) or column (1) header for the vectors.
+
+        Returns:
+            shared (numpy.ndarray): number of elements where the vector of interest
+                and each vector are both non-zero.
+            dots (numpy.ndarray): dot product of the vector of interest with each
+                vector.
+        """
+        compressed, other = self._get_compressed(axis)
+        size = compressed.indptr.size - 1
+        start, stop = compressed.indptr[idx], compressed.indptr[idx + 1]
+        # Positions (i.e. species of a dataset) where the vector is non-zero
+        members = np.asarray(compressed.indices[start:stop])
+        weights = np.asarray(compressed.data[start:stop], dtype=np.float64)
+        # Gather the other-axis vectors at those positions (i.e. the datasets of
+        # each species) and tally which vectors of this axis they contain
+        starts = other.indptr[members]
+        lengths = other.indptr[members + 1] - starts
+        gather = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        gather += np.arange(gather.size)
+        neighbors = np.asarray(other.indices)[gather]
+        shared = np.bincount(neighbors, minlength=size)
+        dots = np.bincount(
+            neighbors,
+            weights=np.asarray(other.data)[gather] * np.repeat(weights, lengths),
+            minlength=size)
+        return shared, dots
+
+    # ...........................
+    def get_similar(self, label, axis=1, measure=SIMILARITY_MEASURE.JACCARD, limit=10):
+        """Return the rows (or columns) most similar to the one with label `label`.
+
+        Args:
+            label: label on the row (axis 0) or column (axis 1) of interest.
+            axis (int): row (0) or column (1) header for the vector of interest.
+            measure (str): one of SIMILARITY_MEASURE.options() to rank by.
+            limit (int): maximum number of similar rows (or columns) to return.
+
+        Returns:
+            records (list of dict): for up to `limit` other rows (or columns) sharing
+                at least one non-zero element with the vector of interest, in
+                descending order of `measure`, a dictionary of the label, shared
+                count, Jaccard index and cosine similarity.
+
+        Raises:
+            IndexError: on label does not exist in category
+            Exception: on axis not in (0, 1)
+            Exception: on unknown measure
+        """
+        if measure not in SIMILARITY_MEASURE.options():
+            raise Exception(
+                f"Measure {measure} not in {SIMILARITY_MEASURE.options()}")
+        try:
+            categories = self._categories[axis].categories
+        except KeyError:
+            raise Exception(f"2D sparse array does not have axis {axis}")
+        try:
+            idx = categories.get_loc(label)
+        except KeyError:
+            raise IndexError(f"Label {label} does not exist in axis {axis}")
+
+        counts, norms = self._get_counts_and_norms(axis)
+        shared, dots = self._get_overlap(idx, axis)
+        # Only vectors with some overlap, excluding the vector of interest
+        shared[idx] = 0
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        jaccard = shared / (counts[idx] + counts[candidates] - shared)
+        cosine = dots[candidates] / (norms[idx] * norms[candidates])
+        scores = {
+            SIMILARITY_MEASURE.SHARED: shared,
+            SIMILARITY_MEASURE.JACCARD: jaccard,
+            SIMILARITY_MEASURE.COSINE: cosine,
+        }[measure]
+
+        # Select the top `limit` without sorting all candidates, then order those,
+        # breaking ties by the order of the labels
+        if candidates.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(candidates.size)
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+
+        conv = _AggregateDataMatrix.convert_np_vals_for_json
+        records = [
+            {
+                "label": categories[candidates[i]],
+                SIMILARITY_MEASURE.SHARED: conv(shared[i]),
+                SIMILARITY_MEASURE.JACCARD: conv(jaccard[i]),
+                SIMILARITY_MEASURE.COSINE: conv(cosine[i]),
+            } for i in top
+        ]
+        return records
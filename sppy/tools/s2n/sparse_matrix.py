@@ -1,4 +1,5 @@
 """Matrix to summarize 2 dimensions of data by counts of a third in a sparse matrix."""
+from concurrent.futures import ProcessPoolExecutor
 from logging import ERROR
 import numpy as np
 import pandas as pd
@@ -9,7 +10,65 @@ import scipy.sparse
 from sppy.aws.aws_constants import PROJ_BUCKET, DATASET_GBIF_KEY
 from sppy.tools.s2n.aggregate_data_matrix import _AggregateDataMatrix
 from sppy.tools.s2n.constants import (SNKeys, Summaries)
+from sppy.tools.s2n.distribution import Distribution
+from sppy.tools.s2n.similarity import SparseSimilarity
 from sppy.tools.s2n.spnet import SpNetAnalyses
+from sppy.tools.s2n.stacked_records import (
+    iter_record_batches, read_partition, StackedParquet)
+from sppy.tools.s2n.summary_matrix import SummaryMatrix
+from sppy.tools.util.logtools import logit
+
+
+# .............................................................................
+def _factorize_partition(partition, x_fld, y_fld, val_fld):
+    """Encode the column and row labels of one row group of stacked records.
+
+    Args:
+        partition (tuple): arguments to read_partition for one row group, from
+            StackedParquet.get_partitions.
+        x_fld: column in the records containing values to be used as columns.
+        y_fld: column in the records containing values to be used as rows.
+        val_fld: column in the records containing values for the matrix.
+
+    Returns:
+        x_uniques (numpy.ndarray): column labels in order of first appearance.
+        y_uniques (numpy.ndarray): row labels in order of first appearance.
+        col_idx (numpy.ndarray): partition code of the column label of each record.
+        row_idx (numpy.ndarray): partition code of the row label of each record.
+        vals (numpy.ndarray): value of each record.
+
+    Note:
+        Records without a row or column label cannot be placed, and are dropped.
+    """
+    batch_df = read_partition(*partition).dropna(subset=[x_fld, y_fld])
+    col_idx, x_uniques = pd.factorize(batch_df[x_fld].to_numpy())
+    row_idx, y_uniques = pd.factorize(batch_df[y_fld].to_numpy())
+    return (
+        x_uniques, y_uniques, col_idx.astype(np.int32), row_idx.astype(np.int32),
+        batch_df[val_fld].to_numpy())
+
+
+# .............................................................................
+def _merge_partition_labels(partition_uniques):
+    """Merge the labels of all partitions, in order of first appearance.
+
+    Args:
+        partition_uniques (list of numpy.ndarray): labels of each partition, in order
+            of first appearance within the partition.
+
+    Returns:
+        categ (pandas.api.types.CategoricalDtype): ordered labels of all partitions.
+        mappings (list of numpy.ndarray): for each partition, the merged code of each
+            partition code.
+
+    Note:
+        The labels of all partitions are hashed once, and the codes of the
+            concatenated labels are the mappings.
+    """
+    merged_codes, merged = pd.factorize(np.concatenate(partition_uniques))
+    ends = np.cumsum([uniques.size for uniques in partition_uniques])
+    mappings = np.split(merged_codes.astype(np.int32), ends[:-1])
+    return CategoricalDtype(merged, ordered=True), mappings
 
 
 # .............................................................................
@@ -19,13 +78,14 @@ class SparseMatrix(_AggregateDataMatrix):
     # ...........................
     def __init__(
             self, sparse_coo_array, table_type, data_datestr, row_category,
-            column_category, logger=None):
+            column_category, axis_stats=None, csc_array=None, logger=None):
         """Constructor for species by dataset comparisons.
 
         Args:
-            sparse_coo_array (scipy.sparse.coo_array): A 2d sparse array with count
-                values for one aggregator0 (i.e. species) rows (axis 0) by another
-                aggregator1 (i.e. dataset) columns (axis 1) to use for computations.
+            sparse_coo_array (scipy.sparse.coo_array, csr_array or csc_array): A 2d
+                sparse array with count values for one aggregator0 (i.e. species) rows
+                (axis 0) by another aggregator1 (i.e. dataset) columns (axis 1) to use
+                for computations.
             table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of
                 aggregated data
             data_datestr (str): date of the source data in YYYY_MM_DD format.
@@ -33,6 +93,12 @@ class SparseMatrix(_AggregateDataMatrix):
                 to identify axis 0/rows.
             column_category (pandas.api.types.CategoricalDtype): ordered column labels
                 used to identify axis 1/columns.
+            axis_stats (dict): optional precomputed statistics for all rows and all
+                columns, keyed by "row" and "column", as saved in matrix metadata.  If
+                None, statistics are computed from the matrix.
+            csc_array (scipy.sparse.csc_array): optional compressed column copy of the
+                same data, i.e. memory-mapped from files, used instead of converting
+                sparse_coo_array to CSC.  If given, sparse_coo_array must be CSR.
             logger (object): An optional local logger to use for logging output
                 with consistent options
 
@@ -40,11 +106,39 @@ class SparseMatrix(_AggregateDataMatrix):
             numerous, rows are always species, columns are datasets.  This allows
             easier exporting to other formats (i.e. Excel), which allows more rows than
             columns.
+
+        Note: Only the compressed column (CSC) array is kept, so one copy of the data
+            is resident.  A compressed row (CSR) copy is created on the first request
+            that slices rows, unless both formats are memory-mapped from files.
         """
-        self._coo_array = sparse_coo_array
+        if csc_array is not None:
+            # Both formats are file-backed and shared by all processes
+            self._csr_array = sparse_coo_array
+            self._csc_array = csc_array
+        else:
+            # Convert once, then keep no reference to the input format
+            self._csr_array = None
+            self._csc_array = sparse_coo_array.tocsc()
+        self._shape = self._csc_array.shape
         self._row_categ = row_category
         self._col_categ = column_category
+        # Bytes of row and column labels, measured on first use
+        self._label_nbytes = None
         _AggregateDataMatrix.__init__(self, table_type, data_datestr, logger=logger)
+        # Totals and counts of every row and column, and statistics for all rows and
+        # all columns, computed once so that requests only look them up.
+        self._axis_totals = {}
+        self._axis_counts = {}
+        self._axis_stats = {}
+        # Distributions of totals and counts, keyed by (axis, "total" or "count")
+        self._distributions = {}
+        self._init_axis_aggregates(axis_stats)
+        # Similarity engine, created on first use
+        self._similarity = None
+        # Ranked orders of totals or counts, keyed by (axis, rank_by, descending)
+        self._rank_orders = {}
+        # Summaries of each column (axis 0) or row (axis 1), created on first use
+        self._summary_matrices = {}
 
     # ...........................
     @classmethod
@@ -100,6 +194,133 @@ class SparseMatrix(_AggregateDataMatrix):
             sparse_coo, table_type, data_datestr, y_categ, x_categ, logger=logger)
         return sparse_matrix
 
+    # ...........................
+    @classmethod
+    def init_from_stacked_parquet(
+            cls, parquet_filenames, x_fld, y_fld, val_fld, table_type, data_datestr,
+            combine_fields=None, batch_size=1000000, max_workers=1, logger=None):
+        """Create a sparse matrix by streaming records from one or more parquet files.
+
+        Args:
+            parquet_filenames (str or list of str): local parquet file, or ordered
+                parts of one table (i.e. files ending in _000.parquet, _001.parquet),
+                containing records with columns to be used as the new rows, new
+                columns, and values.
+            x_fld: column in the input records containing values to be used as
+                columns (axis 1)
+            y_fld: column in the input records containing values to be used as rows
+                (axis 0)
+            val_fld: : column in the input records containing values to be used as
+                values for the intersection of x and y fields
+            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): table type of
+                sparse matrix aggregated data
+            data_datestr (str): date of the source data in YYYY_MM_DD format.
+            combine_fields (dict): optional dictionary of new fields constructed from
+                2 existing fields, i.e. the "combine_fields" value of the stacked
+                table in sppy.tools.s2n.constants.Summaries.TABLES.  x_fld or y_fld
+                may be a new field.
+            batch_size (int): maximum number of records to read into memory at once,
+                when reading in one process.
+            max_workers (int): number of processes to encode labels with, i.e. the
+                number of CPUs.  If more than 1, each row group of each file is read
+                and encoded by one process.
+            logger (object): logger for saving relevant processing messages
+
+        Returns:
+            sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix of y
+                values (rows, y axis=0) by x values (columnns, x axis=1), with values
+                from another column.
+
+        Note:
+            Only one batch, or one row group per process, of records is held in
+                memory at a time.  Row and column codes are assigned in order of first
+                appearance, as in init_from_stacked_data, and coordinates and values
+                are written into arrays preallocated from the record counts in the
+                parquet metadata.
+            With multiple processes, each row group is factorized separately, then
+                the labels of all row groups are merged, in file and row group order,
+                and the codes of each row group are remapped to the merged codes, so
+                the matrix is identical to one built in one process.
+        """
+        stacked_records = StackedParquet(
+            parquet_filenames, [x_fld, y_fld, val_fld], combine_fields=combine_fields,
+            batch_size=batch_size, logger=logger)
+        rec_count = stacked_records.num_rows
+        row_idx = np.empty(rec_count, dtype=np.int32)
+        col_idx = np.empty(rec_count, dtype=np.int32)
+        vals = np.empty(rec_count, dtype=stacked_records.get_dtype(val_fld))
+        partitions = stacked_records.get_partitions()
+
+        pos = 0
+        if max_workers > 1 and len(partitions) > 1:
+            # Codes of each row group are written as they arrive, then remapped
+            bounds = []
+            x_uniques = []
+            y_uniques = []
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                for (part_x, part_y, part_cols, part_rows, part_vals) in executor.map(
+                        _factorize_partition, partitions,
+                        *[[fld] * len(partitions) for fld in (x_fld, y_fld, val_fld)]):
+                    end = pos + part_vals.size
+                    col_idx[pos:end] = part_cols
+                    row_idx[pos:end] = part_rows
+                    vals[pos:end] = part_vals
+                    bounds.append((pos, end))
+                    x_uniques.append(part_x)
+                    y_uniques.append(part_y)
+                    pos = end
+            logit(
+                logger, f"Factorized {rec_count} records in {len(partitions)} row "
+                f"groups on {max_workers} processes")
+            x_categ, x_mappings = _merge_partition_labels(x_uniques)
+            y_categ, y_mappings = _merge_partition_labels(y_uniques)
+            for (start, end), x_mapping, y_mapping in zip(
+                    bounds, x_mappings, y_mappings):
+                col_idx[start:end] = x_mapping[col_idx[start:end]]
+                row_idx[start:end] = y_mapping[row_idx[start:end]]
+
+        else:
+            # Label to code, for all labels seen so far
+            y_codes = {}
+            x_codes = {}
+            for batch_df in stacked_records:
+                # Records without a row or column label cannot be placed
+                batch_df = batch_df.dropna(subset=[x_fld, y_fld])
+                end = pos + len(batch_df)
+                row_idx[pos:end] = cls._assign_codes(batch_df[y_fld], y_codes)
+                col_idx[pos:end] = cls._assign_codes(batch_df[x_fld], x_codes)
+                vals[pos:end] = batch_df[val_fld].to_numpy()
+                pos = end
+            y_categ = CategoricalDtype(list(y_codes.keys()), ordered=True)
+            x_categ = CategoricalDtype(list(x_codes.keys()), ordered=True)
+
+        sparse_coo = scipy.sparse.coo_array(
+            (vals[:pos], (row_idx[:pos], col_idx[:pos])),
+            shape=(y_categ.categories.size, x_categ.categories.size))
+        sparse_matrix = SparseMatrix(
+            sparse_coo, table_type, data_datestr, y_categ, x_categ, logger=logger)
+        return sparse_matrix
+
+    # ...........................
+    @staticmethod
+    def _assign_codes(labels, codes):
+        """Return codes for labels, adding new labels to codes with the next code.
+
+        Args:
+            labels (pandas.Series): labels for one batch of records.
+            codes (dict): code for every label seen in earlier batches, updated with
+                new labels in this batch.
+
+        Returns:
+            numpy.ndarray of integer codes, one for each label.
+        """
+        uniques = pd.unique(labels)
+        for lbl in uniques:
+            if lbl not in codes:
+                codes[lbl] = len(codes)
+        unique_codes = np.array([codes[lbl] for lbl in uniques], dtype=np.int32)
+        return unique_codes[pd.Index(uniques).get_indexer(labels)]
+
     # ...........................
     @property
     def row_category(self):
@@ -122,10 +343,49 @@ class SparseMatrix(_AggregateDataMatrix):
         """
         return self._col_categ
 
+    # ...........................
+    @property
+    def nbytes(self):
+        """Get the memory used by the matrix arrays, labels and cached results.
+
+        Returns:
+            int: number of bytes in the CSC and CSR (if created) arrays, row and
+                column labels with their lookup tables, including memory-mapped
+                arrays, and aggregates, distributions, rank orders, summaries and
+                similarity data computed so far.
+
+        Note:
+            The size changes as results are cached on demand, i.e. on the first
+                request that slices rows, ranks or finds similar vectors.
+            Label sizes are measured once, as this scans every label, and again
+                after warm_label_lookups builds their hash tables.
+        """
+        nbytes = 0
+        for arr in (self._csc_array, self._csr_array):
+            if arr is not None:
+                nbytes += arr.data.nbytes + arr.indices.nbytes + arr.indptr.nbytes
+        if self._label_nbytes is None:
+            self._label_nbytes = sum([
+                categ.categories.memory_usage(deep=True)
+                for categ in (self._row_categ, self._col_categ)])
+        nbytes += self._label_nbytes
+        for vals in (
+                list(self._axis_totals.values()) + list(self._axis_counts.values())
+                + list(self._rank_orders.values())):
+            nbytes += vals.nbytes
+        for dist in self._distributions.values():
+            nbytes += dist.nbytes
+        # Summaries and similarity share this matrix's arrays and labels
+        for summary_matrix in self._summary_matrices.values():
+            nbytes += summary_matrix.cached_nbytes
+        if self._similarity is not None:
+            nbytes += self._similarity.nbytes
+        return int(nbytes)
+
     # .............................................................................
     def _to_dataframe(self):
         sdf = pd.DataFrame.sparse.from_spmatrix(
-            self._coo_array,
+            self._csc_array,
             index=self._row_categ.categories,
             columns=self._col_categ.categories)
         return sdf
@@ -139,15 +399,38 @@ class SparseMatrix(_AggregateDataMatrix):
         else:
             raise Exception(f"2D sparse array does not have axis {axis}")
 
-        # returns a tuple of a single 1-dimensional array of locations
-        arr = np.where(categ.categories == label)[0]
+        # Categories are a pandas.Index with a hash table built on first lookup, so
+        # this does not scan all labels
         try:
-            # labels are unique in categories so there will be 0 or 1 value in the array
-            code = arr[0]
-        except IndexError:
-            raise
+            code = categ.categories.get_loc(label)
+        except KeyError:
+            raise IndexError(f"Label {label} does not exist in axis {axis}")
         return code
 
+    # ...............................................
+    def _get_codes_from_categories(self, labels, axis=0):
+        """Get the codes (indexes) for many labels along one axis in one lookup.
+
+        Args:
+            labels (list): labels to find codes for.
+            axis (int): row (0) or column (1) header containing the labels.
+
+        Returns:
+            codes (numpy.ndarray): code for each label, in the same order as labels,
+                with -1 for any label that does not exist in the axis.
+
+        Raises:
+            Exception: on axis not in (0, 1)
+        """
+        if axis == 0:
+            categ = self._row_categ
+        elif axis == 1:
+            categ = self._col_categ
+        else:
+            raise Exception(f"2D sparse array does not have axis {axis}")
+        codes = categ.categories.get_indexer(labels)
+        return codes
+
     # ...............................................
     def _get_category_from_code(self, code, axis=0):
         if axis == 0:
@@ -178,22 +461,141 @@ class SparseMatrix(_AggregateDataMatrix):
             categ = self._col_categ
         else:
             raise Exception(f"2D sparse array does not have axis {axis}")
-        category_labels = []
-        for code in code_list:
-            category_labels.append(categ.categories[code])
+        # Translate all codes with one index into the categories
+        category_labels = categ.categories[
+            np.asarray(code_list, dtype=np.int64)].tolist()
         return category_labels
 
     # ...........................
     def _to_csr(self):
-        # Convert to CSR format for efficient row slicing
-        csr = self._coo_array.tocsr()
-        return csr
+        # Convert to CSR format for efficient row slicing, only once
+        if self._csr_array is None:
+            self._csr_array = self._csc_array.tocsr()
+        return self._csr_array
 
     # ...........................
     def _to_csc(self):
-        # Convert to CSC format for efficient column slicing
-        csc = self._coo_array.tocsr()
-        return csc
+        # Canonical format, for efficient column slicing
+        return self._csc_array
+
+    # ...........................
+    def get_similarity(self):
+        """Return an object for finding rows or columns similar to one another.
+
+        Returns:
+            similarity (sppy.tools.s2n.similarity.SparseSimilarity): similarity engine
+                sharing this matrix's compressed row and column arrays.
+        """
+        if self._similarity is None:
+            self._similarity = SparseSimilarity(
+                self._to_csr(), self._to_csc(), self._row_categ, self._col_categ)
+        return self._similarity
+
+    # ...........................
+    def warm_label_lookups(self):
+        """Build the hash tables used to find the codes of row and column labels.
+
+        Note:
+            pandas prepares an Index on its first lookups, which scans all labels.
+                The first get_loc checks whether a large Index is sorted, and the
+                first get_indexer infers the type of the labels.  For millions of
+                labels each takes a tenth of a second or more.
+            Summary matrices and the similarity engine share these Index objects, so
+                their lookups are warmed too.
+        """
+        for categ in (self._row_categ, self._col_categ):
+            if categ.categories.size > 0:
+                first = categ.categories[0]
+                categ.categories.get_loc(first)
+                categ.categories.get_indexer([first])
+        # Measure labels again, with their hash tables
+        self._label_nbytes = None
+
+    # ...........................
+    def get_summary_matrix(self, axis):
+        """Return a summary of the count and total of each column or row.
+
+        Args:
+            axis (int): Summarize each column, down axis 0, or each row, across axis 1.
+
+        Returns:
+            summary_matrix (sppy.tools.s2n.summary_matrix.SummaryMatrix): summary
+                backed by this matrix's precomputed counts, totals and labels.
+        """
+        try:
+            return self._summary_matrices[axis]
+        except KeyError:
+            summary_matrix = SummaryMatrix.init_from_sparse_matrix(
+                self, axis=axis, logger=self._logger)
+            self._summary_matrices[axis] = summary_matrix
+            return summary_matrix
+
+    # ...........................
+    def _init_axis_aggregates(self, axis_stats=None):
+        """Compute totals and counts for every row and column, and stats for each axis.
+
+        Args:
+            axis_stats (dict): optional precomputed statistics, keyed by "row" and
+                "column", to use instead of computing them.
+
+        Note:
+            Keys follow numpy conventions, aggregating down axis 0 produces one value
+                per column, aggregating across axis 1 produces one value per row.
+            Row aggregates are counted from the CSC row indices, so no CSR copy of the
+                matrix is created.
+        """
+        csc = self._to_csc()
+        num_rows = self._shape[0]
+        # Totals and counts of non-zero elements for each column
+        self._axis_totals[0] = np.asarray(csc.sum(axis=0)).ravel()
+        self._axis_counts[0] = np.diff(csc.indptr)
+        # Totals and counts of non-zero elements for each row
+        self._axis_totals[1] = np.bincount(
+            csc.indices, weights=csc.data, minlength=num_rows).astype(
+                self._axis_totals[0].dtype)
+        self._axis_counts[1] = np.bincount(csc.indices, minlength=num_rows)
+        # Sorted once, so percentiles are a binary search per request
+        for axis in (0, 1):
+            self._distributions[(axis, "total")] = Distribution(self._axis_totals[axis])
+            self._distributions[(axis, "count")] = Distribution(self._axis_counts[axis])
+
+        if axis_stats is None:
+            axis_stats = {}
+        for stats_key, axis in (("column", 0), ("row", 1)):
+            try:
+                self._axis_stats[stats_key] = axis_stats[stats_key]
+            except KeyError:
+                self._axis_stats[stats_key] = self._compute_axis_stats(axis)
+
+    # ...........................
+    def _compute_axis_stats(self, axis):
+        """Compute statistics of the totals and counts of all columns or all rows.
+
+        Args:
+            axis (int): Summarize all columns, down axis 0, or all rows, across axis 1.
+
+        Returns:
+            stats (dict): JSON-serializable statistics for the totals and counts.
+        """
+        # Labels of the vectors are on the opposite axis of the aggregation
+        label_axis = 1 if axis == 0 else 0
+        stats = {"count": self._shape[label_axis]}
+        for measure, vals in (
+                ("total", self._axis_totals[axis]), ("count", self._axis_counts[axis])):
+            min_val = vals.min()
+            max_val = vals.max()
+            max_codes = np.flatnonzero(vals == max_val)
+            stats[f"{measure}s"] = self.convert_np_vals_for_json(vals.sum())
+            stats[f"min_{measure}"] = self.convert_np_vals_for_json(min_val)
+            stats[f"min_{measure}_number"] = self.convert_np_vals_for_json(
+                np.count_nonzero(vals == min_val))
+            stats[f"mean_{measure}"] = self.convert_np_vals_for_json(vals.mean())
+            stats[f"median_{measure}"] = self.convert_np_vals_for_json(
+                np.median(vals))
+            stats[f"max_{measure}"] = self.convert_np_vals_for_json(max_val)
+            stats[f"max_{measure}_labels"] = self._get_categories_from_code(
+                max_codes, axis=label_axis)
+        return stats
 
     # ...............................................
     def get_random_labels(self, count, axis=0):
@@ -217,7 +619,7 @@ class SparseMatrix(_AggregateDataMatrix):
             raise Exception(f"2D sparse array does not have axis {axis}")
         # Get a random sample of category indexes
         idxs = random.sample(range(1, len(categ.categories)), count)
-        labels = [self._get_category_from_code(i, axis=axis) for i in idxs]
+        labels = self._get_categories_from_code(idxs, axis=axis)
         return labels
 
     # ...............................................
@@ -233,7 +635,7 @@ class SparseMatrix(_AggregateDataMatrix):
         Note: because the sparse data will only from contain unique rows and columns
             with data, this should ALWAYS equal the number of rows
         """
-        return self._coo_array.shape[0]
+        return self._shape[0]
 
     # ...............................................
     @property
@@ -246,7 +648,7 @@ class SparseMatrix(_AggregateDataMatrix):
         Note: because the sparse data will only from contain unique rows and columns
             with data, this should ALWAYS equal the number of columns
         """
-        return self._coo_array.shape[1]
+        return self._shape[1]
 
     # ...............................................
     def get_vector_from_label(self, label, axis=0):
@@ -257,7 +659,8 @@ class SparseMatrix(_AggregateDataMatrix):
             axis (int): row (0) or column (1) header for vector and index to gather.
 
         Returns:
-            vector (scipy.sparse.csr_array): 1-d array of the row/column for 'label'.
+            vector (scipy.sparse.csr_array or scipy.sparse.csc_array): 2-d array of
+                shape (1, columns) for a row or (rows, 1) for a column for 'label'.
             idx (int): index for the vector (zeros and non-zeros) in the sparse matrix
 
         Raises:
@@ -268,10 +671,11 @@ class SparseMatrix(_AggregateDataMatrix):
             idx = self._get_code_from_category(label, axis=axis)
         except IndexError:
             raise
+        # Slice rows from compressed rows, columns from compressed columns
         if axis == 0:
-            vector = self._coo_array.getrow(idx)
+            vector = self._to_csr()[idx:idx + 1, :]
         elif axis == 1:
-            vector = self._coo_array.getcol(idx)
+            vector = self._to_csc()[:, idx:idx + 1]
         else:
             raise Exception(f"2D sparse array does not have axis {axis}")
         idx = self.convert_np_vals_for_json(idx)
@@ -298,6 +702,32 @@ class SparseMatrix(_AggregateDataMatrix):
         total = vector.sum()
         return total
 
+    # ...............................................
+    @staticmethod
+    def _get_vector_elements(vector):
+        """Get the non-zero values of a row or column and their positions.
+
+        Args:
+            vector (scipy.sparse.csr_array or scipy.sparse.csc_array): 2-d array of
+                shape (1, columns) for a row or (rows, 1) for a column.
+
+        Returns:
+            vals (numpy.ndarray): non-zero values in the vector.
+            idxs (numpy.ndarray): index of each value along the vector, i.e. column
+                codes for a row, row codes for a column.
+        """
+        # A row sliced from CSR, or a column sliced from CSC, holds its values and
+        # their positions directly in data and indices
+        if vector.format == "csr" and vector.shape[0] == 1:
+            vals, idxs = vector.data, vector.indices
+        elif vector.format == "csc" and vector.shape[1] == 1:
+            vals, idxs = vector.data, vector.indices
+        else:
+            row_idxs, col_idxs, vals = scipy.sparse.find(vector)
+            idxs = col_idxs if vector.shape[0] == 1 else row_idxs
+        is_nonzero = vals != 0
+        return vals[is_nonzero], idxs[is_nonzero]
+
     # ...............................................
     def get_row_labels_for_data_in_column(self, col, value=None):
         """Get the minimum or maximum NON-ZERO value and row label(s) for a column.
@@ -311,16 +741,12 @@ class SparseMatrix(_AggregateDataMatrix):
             target: The minimum or maximum value for a column
             row_labels: The labels of the rows containing the target value
         """
-        # Returns row_idxs, col_idxs, vals of NNZ values in row
-        row_idxs, col_idxs, vals = scipy.sparse.find(col)
-        if value is None:
-            idxs_lst = [row_idxs[i] for i in range(len(row_idxs))]
-        else:
-            tmp_idxs = np.where(vals == value)[0]
-            tmp_idx_lst = [tmp_idxs[i] for i in range(len(tmp_idxs))]
-            # Row indexes of maxval in column
-            idxs_lst = [row_idxs[i] for i in tmp_idx_lst]
-        row_labels = [self._get_category_from_code(idx, axis=0) for idx in idxs_lst]
+        # Values and row indexes of NNZ values in column
+        vals, row_idxs = self._get_vector_elements(col)
+        if value is not None:
+            # Row indexes of value in column
+            row_idxs = row_idxs[vals == value]
+        row_labels = self._get_categories_from_code(row_idxs, axis=0)
         return row_labels
 
     # ...............................................
@@ -339,18 +765,56 @@ class SparseMatrix(_AggregateDataMatrix):
         Raises:
             Exception: on axis not in (0, 1)
         """
-        # Returns row_idxs, col_idxs, vals of NNZ values in row
-        row_idxs, col_idxs, vals = scipy.sparse.find(vector)
+        if axis not in (0, 1):
+            raise Exception(f"2D sparse array does not have axis {axis}")
+        # Values of NNZ elements and their indexes within the vector
+        vals, idxs = self._get_vector_elements(vector)
         if is_max is True:
             target = vals.max()
         else:
             target = vals.min()
+        # Label axis is the opposite of the vector axis
+        labels = self._get_categories_from_code(idxs[vals == target], axis=1 - axis)
         target = self.convert_np_vals_for_json(target)
-
-        # Get labels for this value in
-        labels = self.get_labels_for_val_in_vector(vector, target, axis=axis)
         return target, labels
 
+    # ...............................................
+    def get_extreme_val_elements(self, axis=0, is_max=True):
+        """Get the minimum or maximum NON-ZERO value of every row or column, and where.
+
+        Args:
+            axis (int): row (0) or column (1) header for the vectors.
+            is_max (bool): flag indicating whether to get maximum (T) or minimum (F)
+
+        Returns:
+            extremes (numpy.ndarray): minimum or maximum value of each row (axis 0)
+                or column (axis 1), 0 for empty vectors.
+            vector_codes (numpy.ndarray): code of the row or column for each element
+                containing its vector's extreme value.
+            other_codes (numpy.ndarray): code on the opposite axis for each element
+                containing its vector's extreme value.
+
+        Raises:
+            Exception: on axis not in (0, 1)
+        """
+        if axis == 0:
+            compressed = self._to_csr()
+        elif axis == 1:
+            compressed = self._to_csc()
+        else:
+            raise Exception(f"2D sparse array does not have axis {axis}")
+        counts = np.diff(compressed.indptr)
+        extremes = np.zeros(counts.size, dtype=compressed.data.dtype)
+        nonempty = np.flatnonzero(counts)
+        if nonempty.size > 0:
+            ufunc = np.maximum if is_max is True else np.minimum
+            extremes[nonempty] = ufunc.reduceat(
+                compressed.data, compressed.indptr[nonempty])
+        # Row (or column) of each element, and elements equal to their vector extreme
+        element_codes = np.repeat(np.arange(counts.size), counts)
+        is_extreme = compressed.data == extremes[element_codes]
+        return extremes, element_codes[is_extreme], compressed.indices[is_extreme]
+
     # ...............................................
     def get_labels_for_val_in_vector(self, vector, target_val, axis=0):
         """Get the row or column label(s) for a vector containing target_val.
@@ -367,28 +831,14 @@ class SparseMatrix(_AggregateDataMatrix):
         Raises:
             Exception: on axis not in (0, 1)
         """
-        # Returns row_idxs, col_idxs, vals of NNZ values in row
-        row_idxs, col_idxs, vals = scipy.sparse.find(vector)
-
-        # Get indexes of target value within NNZ vals
-        tmp_idxs = np.where(vals == target_val)[0]
-        tmp_idx_lst = [tmp_idxs[i] for i in range(len(tmp_idxs))]
-        # Get actual indexes (within all zero/non-zero elements) of target in vector
-        if axis == 0:
-            # Column indexes of maxval in row
-            idxs_lst = [col_idxs[i] for i in tmp_idx_lst]
-            # Label axis is the opposite of the vector axis
-            label_axis = 1
-        elif axis == 1:
-            # Row indexes of maxval in column
-            idxs_lst = [row_idxs[j] for j in tmp_idx_lst]
-            label_axis = 0
-        else:
+        if axis not in (0, 1):
             raise Exception(f"2D sparse array does not have axis {axis}")
-
-        # Convert from indexes to labels
-        labels = [
-            self._get_category_from_code(idx, axis=label_axis) for idx in idxs_lst]
+        # Values of NNZ elements and their indexes within the vector, i.e. column
+        # indexes in a row or row indexes in a column
+        vals, idxs = self._get_vector_elements(vector)
+        # Label axis is the opposite of the vector axis
+        labels = self._get_categories_from_code(
+            idxs[vals == target_val], axis=1 - axis)
         return labels
 
     # ...............................................
@@ -407,12 +857,8 @@ class SparseMatrix(_AggregateDataMatrix):
         Raises:
             Exception: on axis not in (0, 1)
         """
-        # Returns row_idxs, col_idxs, vals of NNZ values in row
-        row_idxs, col_idxs, vals = scipy.sparse.find(vector)
-        # Get indexes of target value within NNZ vals
-        tmp_idxs = np.where(vals == target_val)[0]
-        tmp_idx_lst = [tmp_idxs[i] for i in range(len(tmp_idxs))]
-        count = len(tmp_idx_lst)
+        vals, _idxs = self._get_vector_elements(vector)
+        count = int(np.count_nonzero(vals == target_val))
         return count
 
     # ...............................................
@@ -491,58 +937,30 @@ class SparseMatrix(_AggregateDataMatrix):
             all_row_stats (dict): counts and statistics about all rows.
             (numpy.ndarray): array of totals of all rows.
         """
-        # Sum all rows to return a column (axis=1) of species totals
-        all_totals = self._coo_array.sum(axis=1)
-        # Min total and rows that contain it
-        min_total = all_totals.min()
-        min_total_number = self.count_val_in_vector(all_totals, min_total)
-        # Max total and rows that contain that
-        max_total = all_totals.max()
-        # Get species names for largest number of occurrences
-        max_total_labels = self.get_labels_for_val_in_vector(
-            all_totals, max_total, axis=1)
-
-        # Get number of non-zero entries for every row (column, numpy.ndarray)
-        all_counts = self._coo_array.getnnz(axis=1)
-        min_count = all_counts.min()
-        min_count_number = self.count_val_in_vector(all_counts, min_count)
-        max_count = all_counts.max()
-        max_count_labels = self.get_labels_for_val_in_vector(
-            all_counts, max_count, axis=1)
-
-        # Count columns with at least one non-zero entry (all columns)
-        row_count = self._coo_array.shape[0]
+        # Precomputed statistics for all rows
+        stats = self._axis_stats["row"]
         all_row_stats = {
             # Count of other axis
-            self._keys[SNKeys.ROWS_COUNT]: row_count,
-            self._keys[SNKeys.ROWS_MIN_COUNT]:
-                self.convert_np_vals_for_json(min_count),
-            self._keys[SNKeys.ROWS_MIN_TOTAL_NUMBER]: min_count_number,
+            self._keys[SNKeys.ROWS_COUNT]: stats["count"],
+            self._keys[SNKeys.ROWS_MIN_COUNT]: stats["min_count"],
+            self._keys[SNKeys.ROWS_MIN_COUNT_NUMBER]: stats["min_count_number"],
 
-            self._keys[SNKeys.ROWS_MEAN_COUNT]:
-                self.convert_np_vals_for_json(all_counts.mean()),
-            self._keys[SNKeys.ROWS_MEDIAN_COUNT]:
-                self.convert_np_vals_for_json(np.median(all_counts, axis=0)),
+            self._keys[SNKeys.ROWS_MEAN_COUNT]: stats["mean_count"],
+            self._keys[SNKeys.ROWS_MEDIAN_COUNT]: stats["median_count"],
 
-            self._keys[SNKeys.ROWS_MAX_COUNT]:
-                self.convert_np_vals_for_json(max_count),
-            self._keys[SNKeys.ROWS_MAX_COUNT_LABELS]: max_count_labels,
+            self._keys[SNKeys.ROWS_MAX_COUNT]: stats["max_count"],
+            self._keys[SNKeys.ROWS_MAX_COUNT_LABELS]: stats["max_count_labels"],
 
             # Total of values
-            self._keys[SNKeys.ROWS_TOTAL]:
-                self.convert_np_vals_for_json(all_totals.sum()),
-            self._keys[SNKeys.ROWS_MIN_TOTAL]:
-                self.convert_np_vals_for_json(min_total),
-            self._keys[SNKeys.ROWS_MIN_TOTAL]: min_total_number,
-
-            self._keys[SNKeys.ROWS_MEAN_TOTAL]:
-                self.convert_np_vals_for_json(all_totals.mean()),
-            self._keys[SNKeys.ROWS_MEDIAN_TOTAL]: self.convert_np_vals_for_json(
-                np.median(all_totals, axis=0)[0, 0]),
-
-            self._keys[SNKeys.ROWS_MAX_TOTAL]:
-                self.convert_np_vals_for_json(max_total),
-            self._keys[SNKeys.ROW_MAX_TOTAL_LABELS]: max_total_labels,
+            self._keys[SNKeys.ROWS_TOTAL]: stats["totals"],
+            self._keys[SNKeys.ROWS_MIN_TOTAL]: stats["min_total"],
+            self._keys[SNKeys.ROWS_MIN_TOTAL_NUMBER]: stats["min_total_number"],
+
+            self._keys[SNKeys.ROWS_MEAN_TOTAL]: stats["mean_total"],
+            self._keys[SNKeys.ROWS_MEDIAN_TOTAL]: stats["median_total"],
+
+            self._keys[SNKeys.ROWS_MAX_TOTAL]: stats["max_total"],
+            self._keys[SNKeys.ROWS_MAX_TOTAL_LABELS]: stats["max_total_labels"],
         }
 
         return all_row_stats
@@ -621,11 +1039,167 @@ class SparseMatrix(_AggregateDataMatrix):
 
         return stats
 
+    # ...............................................
+    def _get_vectors_stats(self, codes, axis=0):
+        """Get totals, counts and extreme values for many rows or columns at once.
+
+        Args:
+            codes (numpy.ndarray): codes (indexes) of rows or columns to measure.
+            axis (int): rows (0) or columns (1) to measure.
+
+        Returns:
+            vstats (dict): arrays of "total", "count", "min", "min_number" and "max"
+                with one value per code, and "max_labels", a list with the labels on
+                the other axis containing the maximum value, for each code.
+
+        Raises:
+            Exception: on axis not in (0, 1)
+
+        Note:
+            Rows are sliced from CSR and columns from CSC, so the non-zero values of
+                each vector are contiguous in the slice and are reduced together
+                without iterating over vectors.
+        """
+        if axis == 0:
+            sub = self._to_csr()[codes, :]
+            label_axis = 1
+        elif axis == 1:
+            sub = self._to_csc()[:, codes]
+            label_axis = 0
+        else:
+            raise Exception(f"2D sparse array does not have axis {axis}")
+
+        counts = np.diff(sub.indptr)
+        # Reduce only non-empty vectors, reduceat cannot reduce an empty segment
+        has_vals = counts > 0
+        starts = sub.indptr[:-1][has_vals]
+        totals = np.zeros(len(codes), dtype=sub.data.dtype)
+        minvals = np.zeros(len(codes), dtype=sub.data.dtype)
+        maxvals = np.zeros(len(codes), dtype=sub.data.dtype)
+        min_numbers = np.zeros(len(codes), dtype=np.int64)
+        max_numbers = np.zeros(len(codes), dtype=np.int64)
+        is_max = np.zeros(sub.data.size, dtype=bool)
+        if sub.data.size > 0:
+            totals[has_vals] = np.add.reduceat(sub.data, starts)
+            minvals[has_vals] = np.minimum.reduceat(sub.data, starts)
+            maxvals[has_vals] = np.maximum.reduceat(sub.data, starts)
+            # Find non-zero values equal to the min or max of their own vector
+            is_min = sub.data == np.repeat(minvals, counts)
+            is_max = sub.data == np.repeat(maxvals, counts)
+            min_numbers[has_vals] = np.add.reduceat(is_min.astype(np.int64), starts)
+            max_numbers[has_vals] = np.add.reduceat(is_max.astype(np.int64), starts)
+
+        # Translate all max codes at once, then split into one list per vector
+        max_labels = np.array(
+            self._get_categories_from_code(sub.indices[is_max], axis=label_axis),
+            dtype=object)
+        max_labels = [
+            lbls.tolist() for lbls in np.split(max_labels, np.cumsum(max_numbers)[:-1])]
+        vstats = {
+            "total": totals,
+            "count": counts,
+            "min": minvals,
+            "min_number": min_numbers,
+            "max": maxvals,
+            "max_labels": max_labels,
+        }
+        return vstats
+
+    # ...............................................
+    def get_rows_stats(self, row_labels):
+        """Get a dictionary of statistics for each of many rows in one pass.
+
+        Args:
+            row_labels (list): labels on the rows to gather stats for.
+
+        Returns:
+            all_stats (dict): quantitative measures of each row, keyed by row label,
+                identical to get_one_row_stats for that label.
+            missing_labels (list): labels not found in the data.
+        """
+        codes = self._get_codes_from_categories(row_labels, axis=0)
+        found = codes >= 0
+        found_labels = [lbl for lbl, is_found in zip(row_labels, found) if is_found]
+        missing_labels = [
+            lbl for lbl, is_found in zip(row_labels, found) if not is_found]
+        vstats = self._get_vectors_stats(codes[found], axis=0)
+
+        # Look up dataset names for all vectors at once
+        all_max_labels = set()
+        for lbls in vstats["max_labels"]:
+            all_max_labels.update(lbls)
+        names = self._lookup_dataset_names(list(all_max_labels))
+
+        all_stats = {}
+        for i, row_label in enumerate(found_labels):
+            max_col_labels = vstats["max_labels"][i]
+            if isinstance(names, dict):
+                max_names = {lbl: names.get(lbl) for lbl in max_col_labels}
+            else:
+                max_names = max_col_labels
+            all_stats[row_label] = {
+                self._keys[SNKeys.ROW_LABEL]: row_label,
+                self._keys[SNKeys.ROW_TOTAL]:
+                    self.convert_np_vals_for_json(vstats["total"][i]),
+                self._keys[SNKeys.ROW_COUNT]:
+                    self.convert_np_vals_for_json(vstats["count"][i]),
+                self._keys[SNKeys.ROW_MIN_TOTAL]:
+                    self.convert_np_vals_for_json(vstats["min"][i]),
+                self._keys[SNKeys.ROW_MAX_TOTAL]:
+                    self.convert_np_vals_for_json(vstats["max"][i]),
+                self._keys[SNKeys.ROW_MAX_TOTAL_LABELS]: max_names
+            }
+        return all_stats, missing_labels
+
+    # ...............................................
+    def get_columns_stats(self, col_labels):
+        """Get a dictionary of statistics for each of many columns in one pass.
+
+        Args:
+            col_labels (list): labels on the columns to gather stats for.
+
+        Returns:
+            all_stats (dict): quantitative measures of each column, keyed by column
+                label, identical to get_one_column_stats for that label.
+            missing_labels (list): labels not found in the data.
+        """
+        codes = self._get_codes_from_categories(col_labels, axis=1)
+        found = codes >= 0
+        found_labels = [lbl for lbl, is_found in zip(col_labels, found) if is_found]
+        missing_labels = [
+            lbl for lbl, is_found in zip(col_labels, found) if not is_found]
+        vstats = self._get_vectors_stats(codes[found], axis=1)
+
+        # Look up dataset names for all columns at once
+        names = self._lookup_dataset_names(found_labels)
+
+        all_stats = {}
+        for i, col_label in enumerate(found_labels):
+            stats = {}
+            if isinstance(names, dict):
+                stats[self._keys[SNKeys.COL_LABEL]] = {col_label: names.get(col_label)}
+            else:
+                stats[self._keys[SNKeys.COL_LABEL]] = col_label
+            stats[self._keys[SNKeys.COL_COUNT]] = self.convert_np_vals_for_json(
+                vstats["count"][i])
+            stats[self._keys[SNKeys.COL_TOTAL]] = self.convert_np_vals_for_json(
+                vstats["total"][i])
+            stats[self._keys[SNKeys.COL_MIN_TOTAL]] = self.convert_np_vals_for_json(
+                vstats["min"][i])
+            stats[self._keys[SNKeys.COL_MIN_TOTAL_NUMBER]] = \
+                self.convert_np_vals_for_json(vstats["min_number"][i])
+            stats[self._keys[SNKeys.COL_MAX_TOTAL]] = self.convert_np_vals_for_json(
+                vstats["max"][i])
+            stats[self._keys[SNKeys.COL_MAX_TOTAL_LABELS]] = vstats["max_labels"][i]
+            all_stats[col_label] = stats
+        return all_stats, missing_labels
+
     # ...............................................
     def _lookup_dataset_names(self, labels):
         if self._table["column"] != DATASET_GBIF_KEY:
             names = labels
         else:
+            # Dataset metadata is downloaded once per process, shared by all objects
             spnet = SpNetAnalyses(PROJ_BUCKET)
             names = spnet.lookup_dataset_names(labels)
         return names
@@ -637,59 +1211,37 @@ class SparseMatrix(_AggregateDataMatrix):
         Returns:
             all_col_stats (dict): counts and statistics about all columns.
         """
-        # Sum all rows for each column to return a row (numpy.matrix, axis=0)
-        all_totals = self._coo_array.sum(axis=0)
-        # Min total and columns that contain it
-        min_total = all_totals.min()
-        min_total_number = self.count_val_in_vector(all_totals, min_total)
-        # Max total and columns that contain it
-        max_total = all_totals.max()
-        max_total_labels = self.get_labels_for_val_in_vector(
-            all_totals, max_total, axis=0)
-        max_total_names = self._lookup_dataset_names(max_total_labels)
-
-        # Get number of non-zero rows for every column (row, numpy.ndarray)
-        all_counts = self._coo_array.getnnz(axis=0)
-        # Min count and columns that contain that
-        min_count = all_counts.min()
-        min_count_number = self.count_val_in_vector(all_counts, min_count)
-        # Max count and columns that contain that
-        max_count = all_counts.max()
-        max_count_labels = self.get_labels_for_val_in_vector(
-            all_counts, max_count, axis=0)
-        max_count_names = self._lookup_dataset_names(max_count_labels)
-
-        # Count rows with at least one non-zero entry (all rows)
-        col_count = self._coo_array.shape[1]
+        # Precomputed statistics for all columns
+        stats = self._axis_stats["column"]
+        max_total_names = stats["max_total_labels"]
+        max_count_names = stats["max_count_labels"]
+        # Add dataset titles if column labels contain dataset_keys/GUIDs, in one lookup
+        if self._table["column"] == DATASET_GBIF_KEY:
+            names = self._lookup_dataset_names(
+                list(max_total_names) + list(max_count_names))
+            max_total_names = {lbl: names.get(lbl) for lbl in max_total_names}
+            max_count_names = {lbl: names.get(lbl) for lbl in max_count_names}
         all_col_stats = {
             # Count of other axis
-            self._keys[SNKeys.COLS_COUNT]: col_count,
-            self._keys[SNKeys.COLS_MIN_COUNT]:
-                self.convert_np_vals_for_json(min_count),
-            self._keys[SNKeys.COLS_MIN_COUNT_NUMBER]: min_count_number,
-
-            self._keys[SNKeys.COLS_MEAN_COUNT]:
-                self.convert_np_vals_for_json(all_counts.mean()),
-            self._keys[SNKeys.COLS_MEDIAN_COUNT]:
-                self.convert_np_vals_for_json(np.median(all_counts, axis=0)),
-
-            self._keys[SNKeys.COLS_MAX_COUNT]:
-                self.convert_np_vals_for_json(max_count),
+            self._keys[SNKeys.COLS_COUNT]: stats["count"],
+            self._keys[SNKeys.COLS_MIN_COUNT]: stats["min_count"],
+            self._keys[SNKeys.COLS_MIN_COUNT_NUMBER]: stats["min_count_number"],
+
+            self._keys[SNKeys.COLS_MEAN_COUNT]: stats["mean_count"],
+            self._keys[SNKeys.COLS_MEDIAN_COUNT]: stats["median_count"],
+
+            self._keys[SNKeys.COLS_MAX_COUNT]: stats["max_count"],
             self._keys[SNKeys.COLS_MAX_COUNT_LABELS]: max_count_names,
 
             # Total occurrences
-            self._keys[SNKeys.COLS_TOTAL]:
-                self.convert_np_vals_for_json(all_totals.sum()),
-            self._keys[SNKeys.COLS_MIN_TOTAL]:
-                self.convert_np_vals_for_json(min_total),
-            self._keys[SNKeys.COLS_MIN_TOTAL_NUMBER]: min_total_number,
-
-            self._keys[SNKeys.COLS_MEAN_TOTAL]:
-                self.convert_np_vals_for_json(all_totals.mean()),
-            self._keys[SNKeys.COLS_MEDIAN_TOTAL]:
-                self.convert_np_vals_for_json(np.median(all_totals, axis=1)[0, 0]),
-
-            self._keys[SNKeys.COLS_MAX_TOTAL]: self.convert_np_vals_for_json(max_total),
+            self._keys[SNKeys.COLS_TOTAL]: stats["totals"],
+            self._keys[SNKeys.COLS_MIN_TOTAL]: stats["min_total"],
+            self._keys[SNKeys.COLS_MIN_TOTAL_NUMBER]: stats["min_total_number"],
+
+            self._keys[SNKeys.COLS_MEAN_TOTAL]: stats["mean_total"],
+            self._keys[SNKeys.COLS_MEDIAN_TOTAL]: stats["median_total"],
+
+            self._keys[SNKeys.COLS_MAX_TOTAL]: stats["max_total"],
             self._keys[SNKeys.COLS_MAX_TOTAL_LABELS]: max_total_names,
         }
         return all_col_stats
@@ -702,16 +1254,10 @@ class SparseMatrix(_AggregateDataMatrix):
             axis (int): Axis to sum.
 
         Returns:
-            all_totals (list): list of values for the axis.
+            all_totals (numpy.ndarray): 1-d array of values for the axis, one per
+                column for axis 0, one per row for axis 1.
         """
-        mtx = self._coo_array.sum(axis=axis)
-        # 2d Matrix is a list of rows
-        # Axis 0 produces a matrix shape (1, col_count), 1 row
-        # Axis 1 produces matrix shape (row_count, 1), row_count rows
-        if axis == 0:
-            all_totals = mtx.tolist()[0]
-        elif axis == 1:
-            all_totals = mtx.T.tolist()[0]
+        all_totals = self._axis_totals[axis]
         return all_totals
 
     # ...............................................
@@ -722,11 +1268,206 @@ class SparseMatrix(_AggregateDataMatrix):
             axis (int): Axis to count non-zero values for.
 
         Returns:
-            all_counts (list): list of values for the axis.
+            all_counts (numpy.ndarray): 1-d array of values for the axis, one per
+                column for axis 0, one per row for axis 1.
         """
-        all_counts = self._coo_array.getnnz(axis=axis)
+        all_counts = self._axis_counts[axis]
         return all_counts
 
+    # ...............................................
+    def _get_rank_order(self, axis, rank_by, descending):
+        """Return the codes of all rows or columns, ordered by total or count.
+
+        Args:
+            axis (int): Axis of the vectors to rank, rows (0) or columns (1).
+            rank_by (str): rank by "total" of values or "count" of non-zero values.
+            descending (bool): flag indicating whether to order largest first.
+
+        Returns:
+            order (numpy.ndarray): codes of all rows or columns in rank order, ties
+                in order of the codes.
+
+        Raises:
+            Exception: on rank_by not in ("total", "count").
+
+        Note:
+            The order is sorted once for each axis, rank_by and direction, then
+                reused for every request.
+        """
+        key = (axis, rank_by, descending)
+        try:
+            return self._rank_orders[key]
+        except KeyError:
+            pass
+        agg_axis, _label_fld, _count_fld = self._get_aggregate_fields(axis)
+        if rank_by == "total":
+            vals = self._axis_totals[agg_axis]
+        elif rank_by == "count":
+            vals = self._axis_counts[agg_axis]
+        else:
+            raise Exception(f"Cannot rank by {rank_by}, only by total or count")
+        if descending:
+            vals = -vals
+        order = np.lexsort((np.arange(vals.size), vals))
+        self._rank_orders[key] = order
+        return order
+
+    # ...............................................
+    def _get_aggregate_fields(self, axis):
+        """Return the aggregation axis and output field names for totals and counts.
+
+        Args:
+            axis (int): Axis of the labeled vectors, rows (0) or columns (1).
+
+        Returns:
+            agg_axis (int): numpy axis aggregated to produce one value per vector,
+                the key for the precomputed totals, counts and distributions.
+            label_fld (str): field name for the labels, i.e. "dataset_key".
+            count_fld (str): field name for counts of non-zero elements, i.e.
+                "species_count" for a dataset.
+
+        Raises:
+            Exception: on axis not in (0, 1)
+
+        Note:
+            Like get_similar, axis is the dimension enumerated, so 0 for each row
+                (species), 1 for each column (dataset).  Totals for each column are
+                summed down numpy axis 0, for each row across numpy axis 1.
+        """
+        if axis == 0:
+            agg_axis, label_fld = 1, self._table["row"]
+            count_fld = f"{self._keys[SNKeys.COL_TYPE]}_count"
+        elif axis == 1:
+            agg_axis, label_fld = 0, self._table["column"]
+            count_fld = f"{self._keys[SNKeys.ROW_TYPE]}_count"
+        else:
+            raise Exception(f"2D sparse array does not have axis {axis}")
+        return agg_axis, label_fld, count_fld
+
+    # ...............................................
+    def get_distribution(self, axis, measure):
+        """Return the distribution of totals or counts for all columns or all rows.
+
+        Args:
+            axis (int): Axis of the vectors, rows (0) or columns (1).
+            measure (str): "total" of values or "count" of non-zero values.
+
+        Returns:
+            distribution (sppy.tools.s2n.distribution.Distribution): precomputed
+                distribution of the measure.
+
+        Raises:
+            Exception: on axis not in (0, 1) or measure not in ("total", "count").
+        """
+        agg_axis, _label_fld, _count_fld = self._get_aggregate_fields(axis)
+        try:
+            return self._distributions[(agg_axis, measure)]
+        except KeyError:
+            raise Exception(
+                f"No distribution of {measure} on axis {axis}, only of total or "
+                f"count on axis 0 or 1")
+
+    # ...............................................
+    def describe_distributions(self, axis):
+        """Return quantiles and histograms of totals and counts of columns or rows.
+
+        Args:
+            axis (int): Axis of the vectors, rows (0) or columns (1).
+
+        Returns:
+            dict: the number of columns or rows, and quantiles and a histogram on
+                log bins for the totals (i.e. "occ_count") and counts (i.e.
+                "species_count" for datasets).
+
+        Raises:
+            Exception: on axis not in (0, 1)
+        """
+        agg_axis, _label_fld, count_fld = self._get_aggregate_fields(axis)
+        out = {"count": self._axis_totals[agg_axis].size}
+        for fld, measure in ((self._table["value"], "total"), (count_fld, "count")):
+            dist = self._distributions[(agg_axis, measure)]
+            out[fld] = {
+                "quantiles": dist.get_quantiles(),
+                "histogram": dist.get_histogram()
+            }
+        return out
+
+    # ...............................................
+    def get_percentile_ranks(self, label, axis):
+        """Return where one column or row ranks among all by total and by count.
+
+        Args:
+            label: label of the row (axis 0) or column (axis 1) of interest.
+            axis (int): Axis of the vectors, rows (0) or columns (1).
+
+        Returns:
+            record (dict): the label, and for the total (i.e. "occ_count") and count
+                (i.e. "species_count" for a dataset), the value, percentile of all
+                columns or rows with the same or smaller value, and rank, where 1
+                is the largest.
+
+        Raises:
+            IndexError: on label does not exist in category
+            Exception: on axis not in (0, 1)
+        """
+        agg_axis, label_fld, count_fld = self._get_aggregate_fields(axis)
+        try:
+            code = self._get_code_from_category(label, axis=axis)
+        except IndexError:
+            raise
+        record = {label_fld: label}
+        for fld, measure, vals in (
+                (self._table["value"], "total", self._axis_totals[agg_axis]),
+                (count_fld, "count", self._axis_counts[agg_axis])):
+            dist = self._distributions[(agg_axis, measure)]
+            percentile, rank = dist.get_percentile_rank(vals[code])
+            record[fld] = {
+                "value": self.convert_np_vals_for_json(vals[code]),
+                "percentile": percentile,
+                "rank": rank
+            }
+        return record
+
+    # ...............................................
+    def rank_vectors(self, axis=1, rank_by="total", descending=True, limit=10):
+        """Return the top or bottom rows or columns ranked by total or count.
+
+        Args:
+            axis (int): Axis of the vectors to rank, rows (0) or columns (1).
+            rank_by (str): rank by "total" of values or "count" of non-zero values.
+            descending (bool): flag indicating whether to return the largest first
+                (top), or the smallest first (bottom).
+            limit (int): number of ranked rows or columns to return.
+
+        Returns:
+            records (list of dict): for each ranked row or column, a dictionary with
+                the label, total (i.e. "occ_count") and count (i.e. "species_count"
+                for a dataset).  Records for dataset columns also contain the
+                "dataset_title".
+
+        Raises:
+            Exception: on axis not in (0, 1)
+            Exception: on rank_by not in ("total", "count").
+        """
+        agg_axis, label_fld, count_fld = self._get_aggregate_fields(axis)
+        codes = self._get_rank_order(axis, rank_by, descending)[:limit]
+        labels = self._get_categories_from_code(codes, axis=axis)
+        totals = self._axis_totals[agg_axis][codes]
+        counts = self._axis_counts[agg_axis][codes]
+        records = [
+            {
+                label_fld: lbl,
+                self._table["value"]: self.convert_np_vals_for_json(tot),
+                count_fld: self.convert_np_vals_for_json(cnt)
+            } for lbl, tot, cnt in zip(labels, totals, counts)
+        ]
+        # Add dataset titles if column labels contain dataset_keys/GUIDs
+        if axis == 1 and label_fld == DATASET_GBIF_KEY:
+            names = self._lookup_dataset_names(labels)
+            for rec in records:
+                rec["dataset_title"] = names.get(rec[label_fld])
+        return records
+
     # ...............................................
     def compare_column_to_others(self, col_label, agg_type=None):
         """Compare the number of rows and counts in rows to those of other columns.
@@ -748,23 +1489,27 @@ class SparseMatrix(_AggregateDataMatrix):
             comparisons["Occurrences"] = {
                 self._keys[SNKeys.COL_TOTAL]: stats[self._keys[SNKeys.COL_TOTAL]],
                 self._keys[SNKeys.COLS_TOTAL]: all_stats[self._keys[SNKeys.COLS_TOTAL]],
-                self._keys[SNKeys.COLS_MIN]: all_stats[self._keys[SNKeys.COLS_MIN]],
-                self._keys[SNKeys.COLS_MAX]: all_stats[self._keys[SNKeys.COLS_MAX]],
-                self._keys[SNKeys.COLS_MEAN]: all_stats[self._keys[SNKeys.COLS_MEAN]],
-                self._keys[SNKeys.COLS_MEDIAN]: all_stats[self._keys[SNKeys.COLS_MEDIAN]]
+                self._keys[SNKeys.COLS_MIN_TOTAL]:
+                    all_stats[self._keys[SNKeys.COLS_MIN_TOTAL]],
+                self._keys[SNKeys.COLS_MAX_TOTAL]:
+                    all_stats[self._keys[SNKeys.COLS_MAX_TOTAL]],
+                self._keys[SNKeys.COLS_MEAN_TOTAL]:
+                    all_stats[self._keys[SNKeys.COLS_MEAN_TOTAL]],
+                self._keys[SNKeys.COLS_MEDIAN_TOTAL]:
+                    all_stats[self._keys[SNKeys.COLS_MEDIAN_TOTAL]]
             }
         if agg_type in ("axis", None):
             comparisons["Species"] = {
                 self._keys[SNKeys.COL_COUNT]: stats[self._keys[SNKeys.COL_COUNT]],
                 self._keys[SNKeys.COLS_COUNT]: all_stats[self._keys[SNKeys.COLS_COUNT]],
-                self._keys[SNKeys.COLS_COUNT_MIN]:
-                    all_stats[self._keys[SNKeys.COLS_COUNT_MIN]],
-                self._keys[SNKeys.COLS_COUNT_MAX]:
-                    all_stats[self._keys[SNKeys.COLS_COUNT_MAX]],
-                self._keys[SNKeys.COLS_COUNT_MEAN]:
-                    all_stats[self._keys[SNKeys.COLS_COUNT_MEAN]],
-                self._keys[SNKeys.COLS_COUNT_MEDIAN]:
-                    all_stats[self._keys[SNKeys.COLS_COUNT_MEDIAN]]
+                self._keys[SNKeys.COLS_MIN_COUNT]:
+                    all_stats[self._keys[SNKeys.COLS_MIN_COUNT]],
+                self._keys[SNKeys.COLS_MAX_COUNT]:
+                    all_stats[self._keys[SNKeys.COLS_MAX_COUNT]],
+                self._keys[SNKeys.COLS_MEAN_COUNT]:
+                    all_stats[self._keys[SNKeys.COLS_MEAN_COUNT]],
+                self._keys[SNKeys.COLS_MEDIAN_COUNT]:
+                    all_stats[self._keys[SNKeys.COLS_MEDIAN_COUNT]]
             }
         return comparisons
 
@@ -788,30 +1533,349 @@ class SparseMatrix(_AggregateDataMatrix):
             comparisons["Occurrences"] = {
                 self._keys[SNKeys.ROW_TOTAL]: stats[self._keys[SNKeys.ROW_TOTAL]],
                 self._keys[SNKeys.ROWS_TOTAL]: all_stats[self._keys[SNKeys.ROWS_TOTAL]],
-                self._keys[SNKeys.ROWS_MIN]: all_stats[self._keys[SNKeys.ROWS_MIN]],
-                self._keys[SNKeys.ROWS_MAX]: all_stats[self._keys[SNKeys.ROWS_MAX]],
-                self._keys[SNKeys.ROWS_MEAN]: all_stats[self._keys[SNKeys.ROWS_MEAN]],
-                self._keys[SNKeys.ROWS_MEDIAN]:
-                    all_stats[self._keys[SNKeys.ROWS_MEDIAN]],
+                self._keys[SNKeys.ROWS_MIN_TOTAL]:
+                    all_stats[self._keys[SNKeys.ROWS_MIN_TOTAL]],
+                self._keys[SNKeys.ROWS_MAX_TOTAL]:
+                    all_stats[self._keys[SNKeys.ROWS_MAX_TOTAL]],
+                self._keys[SNKeys.ROWS_MEAN_TOTAL]:
+                    all_stats[self._keys[SNKeys.ROWS_MEAN_TOTAL]],
+                self._keys[SNKeys.ROWS_MEDIAN_TOTAL]:
+                    all_stats[self._keys[SNKeys.ROWS_MEDIAN_TOTAL]],
             }
         if agg_type in ("axis", None):
             comparisons["Datasets"] = {
                 self._keys[SNKeys.ROW_COUNT]: stats[self._keys[SNKeys.ROW_COUNT]],
                 self._keys[SNKeys.ROWS_COUNT]: all_stats[self._keys[SNKeys.ROWS_COUNT]],
-                self._keys[SNKeys.ROWS_COUNT_MIN]:
-                    all_stats[self._keys[SNKeys.ROWS_COUNT_MIN]],
-                self._keys[SNKeys.ROWS_COUNT_MAX]:
-                    all_stats[self._keys[SNKeys.ROWS_COUNT_MAX]],
-                self._keys[SNKeys.ROWS_COUNT_MEAN]:
-                    all_stats[self._keys[SNKeys.ROWS_COUNT_MEAN]],
-                self._keys[SNKeys.ROWS_COUNT_MEDIAN]:
-                    all_stats[self._keys[SNKeys.ROWS_COUNT_MEDIAN]]
+                self._keys[SNKeys.ROWS_MIN_COUNT]:
+                    all_stats[self._keys[SNKeys.ROWS_MIN_COUNT]],
+                self._keys[SNKeys.ROWS_MAX_COUNT]:
+                    all_stats[self._keys[SNKeys.ROWS_MAX_COUNT]],
+                self._keys[SNKeys.ROWS_MEAN_COUNT]:
+                    all_stats[self._keys[SNKeys.ROWS_MEAN_COUNT]],
+                self._keys[SNKeys.ROWS_MEDIAN_COUNT]:
+                    all_stats[self._keys[SNKeys.ROWS_MEDIAN_COUNT]]
             }
         return comparisons
 
+    # .............................................................................
+    @staticmethod
+    def _get_extended_codes(labels, categories, new_codes):
+        """Return codes for labels, numbering labels not in categories after them.
+
+        Args:
+            labels (pandas.Series): labels to encode.
+            categories (pandas.Index): existing labels, whose codes are unchanged.
+            new_codes (dict): code offset, from the end of categories, of every new
+                label seen so far, updated with new labels in labels.
+
+        Returns:
+            codes (numpy.ndarray): code for each label; new labels are numbered after
+                the existing categories, in order of first appearance, and missing
+                labels (None or NaN) are -1.
+
+        Note:
+            Labels are factorized first, so categories are searched once for each
+                distinct label rather than for every record.
+        """
+        label_codes, uniques = pd.factorize(labels)
+        unique_codes = categories.get_indexer(uniques)
+        is_new = unique_codes < 0
+        if is_new.any():
+            unique_codes[is_new] = categories.size + SparseMatrix._assign_codes(
+                pd.Series(uniques[is_new]), new_codes)
+        # Missing labels are factorized to -1, the appended last element
+        return np.append(unique_codes, -1)[label_codes]
+
+    # .............................................................................
+    @staticmethod
+    def _hash_elements(row_codes, vals):
+        """Return a 64-bit hash of each element from its row code and value.
+
+        Args:
+            row_codes (numpy.ndarray): row code of each element.
+            vals (numpy.ndarray): value of each element.
+
+        Returns:
+            hashes (numpy.ndarray): unsigned 64-bit hash of each element.
+
+        Note:
+            Uses the splitmix64 finalizer, so that sums of the hashes of a column's
+                elements differ, with near certainty, if any element differs.
+        """
+        vals = np.ascontiguousarray(vals, dtype=np.float64)
+        hashes = row_codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        hashes ^= vals.view(np.uint64)
+        hashes ^= hashes >> np.uint64(30)
+        hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        hashes ^= hashes >> np.uint64(27)
+        hashes *= np.uint64(0x94D049BB133111EB)
+        hashes ^= hashes >> np.uint64(31)
+        return hashes
+
+    # .............................................................................
+    def _get_column_digests(self):
+        # Element count and sum of element hashes, wrapping at 2^64, for each column
+        csc = self._to_csc()
+        hashes = self._hash_elements(csc.indices, csc.data)
+        cumulative = np.zeros(hashes.size + 1, dtype=np.uint64)
+        np.cumsum(hashes, out=cumulative[1:])
+        digests = cumulative[csc.indptr[1:]] - cumulative[csc.indptr[:-1]]
+        return np.diff(csc.indptr), digests
+
+    # .............................................................................
+    def compute_column_delta(
+            self, stacked_records, x_fld, y_fld, val_fld, data_datestr,
+            chain_length=1):
+        """Find columns that differ between this matrix and records for a new date.
+
+        Args:
+            stacked_records (pandas.DataFrame or iterable of pandas.DataFrame): all
+                records for the new data date, in one DataFrame or in batches,
+                containing columns to be used as rows, columns, and values.  Batches
+                are read twice, so an iterable must return the same batches each time.
+            x_fld: column in the input records containing values to be used as
+                columns (axis 1)
+            y_fld: column in the input records containing values to be used as rows
+                (axis 0)
+            val_fld: : column in the input records containing values to be used as
+                values for the intersection of x and y fields
+            data_datestr (str): date of the new source data in YYYY_MM_DD format.
+            chain_length (int): number of deltas from the last full matrix to the
+                matrix for data_datestr.
+
+        Returns:
+            delta (dict): changes from this matrix, with keys:
+                * prev_datestr, data_datestr: dates of this and the new matrix.
+                * chain_length: number of deltas since the last full matrix.
+                * new_row_labels: row labels not in this matrix, in the order their
+                    codes are assigned, following existing rows.
+                * new_column_labels: column labels not in this matrix, in the order
+                    their codes are assigned, following existing columns.
+                * columns: codes of changed, new, or emptied columns.
+                * indptr, indices, data: compressed column arrays containing the new
+                    contents of the changed columns, in the order of `columns`.
+
+        Note:
+            Existing rows and columns keep their codes, so a delta applies only to
+                the matrix it was computed from.
+            The first pass over the records only counts and hashes the elements of
+                each column, to compare with this matrix's columns.  The second pass
+                keeps only records of changed columns, so a new matrix is never built
+                from all records.  Only the column code of each record, 4 bytes, is
+                kept between passes.
+        """
+        prev_rows = self._row_categ.categories
+        prev_cols = self._col_categ.categories
+        new_rows = {}
+        new_cols = {}
+        counts = np.zeros(prev_cols.size, dtype=np.int64)
+        digests = np.zeros(prev_cols.size, dtype=np.uint64)
+        # Column code of each record, -1 for records without both labels, kept so
+        # the second pass only encodes row labels of records in changed columns
+        batch_col_idxs = []
+        for batch_df in iter_record_batches(stacked_records):
+            row_idx = self._get_extended_codes(batch_df[y_fld], prev_rows, new_rows)
+            col_idx = self._get_extended_codes(batch_df[x_fld], prev_cols, new_cols)
+            col_idx[row_idx < 0] = -1
+            batch_col_idxs.append(col_idx.astype(np.int32))
+            placed = col_idx >= 0
+            col_count = prev_cols.size + len(new_cols)
+            counts = np.pad(counts, (0, col_count - counts.size))
+            digests = np.pad(digests, (0, col_count - digests.size))
+            counts += np.bincount(col_idx[placed], minlength=col_count)
+            np.add.at(
+                digests, col_idx[placed],
+                self._hash_elements(
+                    row_idx[placed], batch_df[val_fld].to_numpy()[placed]))
+
+        # Previous matrix, with empty columns for new columns
+        prev_counts, prev_digests = self._get_column_digests()
+        prev_counts = np.pad(prev_counts, (0, counts.size - prev_counts.size))
+        prev_digests = np.pad(prev_digests, (0, digests.size - prev_digests.size))
+        # Columns with any element added, removed or changed
+        changed = np.flatnonzero((counts != prev_counts) | (digests != prev_digests))
+        # Position of each column in the delta, -1 for unchanged or unplaced records
+        positions = np.full(counts.size + 1, -1, dtype=np.int64)
+        positions[changed] = np.arange(changed.size)
+
+        row_codes = [np.empty(0, dtype=np.int64)]
+        col_positions = [np.empty(0, dtype=np.int64)]
+        vals = [np.empty(0, dtype=self._to_csc().dtype)]
+        for batch_df, col_idx in zip(
+                iter_record_batches(stacked_records), batch_col_idxs):
+            keep = positions[col_idx] >= 0
+            row_codes.append(self._get_extended_codes(
+                batch_df[y_fld][keep], prev_rows, new_rows))
+            col_positions.append(positions[col_idx[keep]])
+            vals.append(batch_df[val_fld].to_numpy()[keep])
+        shape = (prev_rows.size + len(new_rows), changed.size)
+        changed_csc = scipy.sparse.coo_array(
+            (
+                np.concatenate(vals),
+                (np.concatenate(row_codes), np.concatenate(col_positions))
+            ), shape=shape).tocsc()
+        changed_csc.sort_indices()
+        delta = {
+            "prev_datestr": self._data_datestr,
+            "data_datestr": data_datestr,
+            "chain_length": chain_length,
+            "new_row_labels": list(new_rows.keys()),
+            "new_column_labels": list(new_cols.keys()),
+            "columns": changed,
+            "indptr": changed_csc.indptr,
+            "indices": changed_csc.indices,
+            "data": changed_csc.data,
+        }
+        self._logme(
+            f"{changed.size} of {counts.size} columns changed, {len(new_rows)} new "
+            f"rows, {len(new_cols)} new columns")
+        return delta
+
+    # .............................................................................
+    def apply_column_delta(self, delta):
+        """Create a matrix for a new data date by replacing changed columns.
+
+        Args:
+            delta (dict): changes computed from this matrix by compute_column_delta.
+
+        Returns:
+            sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix
+                containing this matrix's unchanged columns and the delta's columns,
+                without rows or columns left empty, i.e. datasets no longer present.
+
+        Raises:
+            Exception: on delta computed from a matrix for another data date.
+
+        Note:
+            Removing empty rows and columns changes codes, so the next delta must be
+                computed from the returned matrix, not this one.
+        """
+        if delta["prev_datestr"] != self._data_datestr:
+            raise Exception(
+                f"Delta from {delta['prev_datestr']} cannot be applied to matrix for "
+                f"{self._data_datestr}")
+        row_labels = self._row_categ.categories.tolist() + delta["new_row_labels"]
+        col_labels = self._col_categ.categories.tolist() + delta["new_column_labels"]
+        shape = (len(row_labels), len(col_labels))
+        changed = np.asarray(delta["columns"])
+        is_changed = np.zeros(shape[1], dtype=bool)
+        is_changed[changed] = True
+
+        # Unchanged elements of this matrix
+        prev_csc = self._to_csc()
+        prev_cols = np.repeat(
+            np.arange(prev_csc.shape[1]), np.diff(prev_csc.indptr))
+        keep = ~is_changed[prev_cols]
+        # Elements of changed columns
+        delta_cols = changed[np.repeat(
+            np.arange(changed.size), np.diff(delta["indptr"]))]
+
+        sparse_coo = scipy.sparse.coo_array(
+            (
+                np.concatenate([prev_csc.data[keep], delta["data"]]),
+                (
+                    np.concatenate([prev_csc.indices[keep], delta["indices"]]),
+                    np.concatenate([prev_cols[keep], delta_cols])
+                )
+            ), shape=shape)
+        sparse_matrix = SparseMatrix(
+            sparse_coo, self._table_type, delta["data_datestr"],
+            CategoricalDtype(row_labels, ordered=True),
+            CategoricalDtype(col_labels, ordered=True), logger=self._logger)
+        return sparse_matrix.compact()
+
+    # .............................................................................
+    def compact(self):
+        """Return a matrix without empty rows or columns.
+
+        Returns:
+            sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): this matrix,
+                if no rows or columns are empty, otherwise a new matrix containing
+                only rows and columns with values, with new codes.
+        """
+        keep_rows = np.flatnonzero(self._axis_counts[1])
+        keep_cols = np.flatnonzero(self._axis_counts[0])
+        if (keep_rows.size == self._row_categ.categories.size
+                and keep_cols.size == self._col_categ.categories.size):
+            return self
+        csc = self._to_csc()[:, keep_cols][keep_rows, :]
+        sparse_matrix = SparseMatrix(
+            csc, self._table_type, self._data_datestr,
+            CategoricalDtype(self._row_categ.categories[keep_rows], ordered=True),
+            CategoricalDtype(self._col_categ.categories[keep_cols], ordered=True),
+            logger=self._logger)
+        return sparse_matrix
+
+    # .............................................................................
+    @classmethod
+    def get_delta_filename(cls, basename, local_path):
+        """Return the filename of the delta from the previous matrix to a matrix.
+
+        Args:
+            basename (str): base filename of the new matrix, without extension.
+            local_path (str): Absolute path of the directory containing the file.
+
+        Returns:
+            delta_fname (str): absolute filename of the delta.
+        """
+        return f"{local_path}/{basename}.delta.npz"
+
+    # .............................................................................
+    @classmethod
+    def write_delta_file(cls, delta, delta_fname):
+        """Write a matrix delta to a compressed NPZ file.
+
+        Args:
+            delta (dict): changes computed by compute_column_delta.
+            delta_fname (str): local output filename for the delta.
+
+        Raises:
+            Exception: on failure to write the delta to file.
+        """
+        arrays = {
+            key: np.asarray(delta[key]) for key in (
+                "prev_datestr", "data_datestr", "chain_length", "columns", "indptr",
+                "indices", "data")}
+        for key in ("new_row_labels", "new_column_labels"):
+            arrays[key] = cls._encode_labels(delta[key])
+            arrays[f"{key}_count"] = np.array(len(delta[key]))
+        try:
+            with open(delta_fname, "wb") as outf:
+                np.savez_compressed(outf, **arrays)
+        except Exception as e:
+            raise Exception(f"Failed to write delta to {delta_fname}: {e}")
+
+    # .............................................................................
+    @classmethod
+    def read_delta_file(cls, delta_fname):
+        """Read a matrix delta from a compressed NPZ file.
+
+        Args:
+            delta_fname (str): Filename of the delta to read.
+
+        Returns:
+            delta (dict): changes, as computed by compute_column_delta.
+
+        Raises:
+            Exception: on failure to read the delta file.
+        """
+        try:
+            with np.load(delta_fname) as npz:
+                delta = {
+                    key: npz[key] for key in ("columns", "indptr", "indices", "data")}
+                for key in ("prev_datestr", "data_datestr"):
+                    delta[key] = str(npz[key])
+                delta["chain_length"] = int(npz["chain_length"])
+                for key in ("new_row_labels", "new_column_labels"):
+                    delta[key] = cls._decode_labels(
+                        npz[key], int(npz[f"{key}_count"]))
+        except Exception as e:
+            raise Exception(f"Failed to load {delta_fname}: {e}")
+        return delta
+
     # .............................................................................
     def compress_to_file(self, local_path="/tmp"):
-        """Compress this SparseMatrix to a zipped npz and json file.
+        """Compress this SparseMatrix to a zipped npz, json and labels file.
 
         Args:
             local_path (str): Absolute path of local destination path
@@ -830,28 +1894,149 @@ class SparseMatrix(_AggregateDataMatrix):
 
         # Save matrix to npz locally
         try:
-            scipy.sparse.save_npz(mtx_fname, self._coo_array, compressed=True)
+            scipy.sparse.save_npz(mtx_fname, self._to_csc(), compressed=True)
         except Exception as e:
             msg = f"Failed to write {mtx_fname}: {e}"
             self._logme(msg, log_level=ERROR)
             raise Exception(msg)
 
-        # Save table data and categories to json locally
+        # Save table data to json and categories to binary labels locally
+        try:
+            self._dump_metadata(self._get_metadata(), meta_fname)
+        except Exception:
+            raise
+        input_fnames = [mtx_fname, meta_fname]
+        labels_fname = self.get_labels_filename(
+            meta_fname, self._table.get("labels_extension"))
+        if labels_fname is not None:
+            input_fnames.append(labels_fname)
+
+        # Compress matrix with metadata
+        try:
+            self._compress_files(input_fnames, zip_fname)
+        except Exception:
+            raise
+
+        return zip_fname
+
+    # .............................................................................
+    def _get_metadata(self):
         metadata = Summaries.get_table(self._table_type)
         metadata["row"] = self._row_categ.categories.tolist()
         metadata["column"] = self._col_categ.categories.tolist()
+        # Save statistics for all rows and columns so they are not recomputed on load
+        metadata["axis_stats"] = self._axis_stats
+        return metadata
+
+    # .............................................................................
+    @classmethod
+    def get_memmap_filenames(cls, basename, local_path):
+        """Return the files of the uncompressed, memory-mappable matrix layout.
+
+        Args:
+            basename (str): base filename of the matrix, without extension.
+            local_path (str): Absolute path of the directory containing the files.
+
+        Returns:
+            mtx_fnames (dict): absolute filenames of the index pointer, index and data
+                arrays of the CSR and CSC formats, keyed by "<format>_<array>", i.e.
+                "csr_indptr".
+            meta_fname (str): absolute filename of the JSON metadata.
+        """
+        mtx_fnames = {}
+        for fmt in ("csr", "csc"):
+            for arr in ("indptr", "indices", "data"):
+                mtx_fnames[f"{fmt}_{arr}"] = f"{local_path}/{basename}.{fmt}_{arr}.npy"
+        meta_fname = f"{local_path}/{basename}.json"
+        return mtx_fnames, meta_fname
+
+    # .............................................................................
+    def write_memmap_files(self, local_path="/tmp"):
+        """Write this SparseMatrix as uncompressed arrays that can be memory-mapped.
+
+        Args:
+            local_path (str): Absolute path of local destination path
+
+        Returns:
+            fnames (list): Local output filenames.
+
+        Raises:
+            Exception: on failure to write a sparse array to NPY file.
+            Exception: on failure to serialize or write metadata.
+
+        Note:
+            Arrays of both CSR and CSC formats are written, so that all processes
+                reading these files share one page-cached copy of each, for both row
+                and column slicing.
+        """
+        mtx_fnames, meta_fname = self.get_memmap_filenames(
+            self._table["fname"], local_path)
+        compressed = {"csr": self._to_csr(), "csc": self._to_csc()}
+        for key, fname in mtx_fnames.items():
+            fmt, arr = key.split("_")
+            try:
+                np.save(fname, getattr(compressed[fmt], arr))
+            except Exception as e:
+                msg = f"Failed to write {fname}: {e}"
+                self._logme(msg, log_level=ERROR)
+                raise Exception(msg)
         try:
-            self._dump_metadata(metadata, meta_fname)
+            self._dump_metadata(self._get_metadata(), meta_fname)
         except Exception:
             raise
+        fnames = list(mtx_fnames.values()) + [meta_fname]
+        labels_fname = self.get_labels_filename(
+            meta_fname, self._table.get("labels_extension"))
+        if labels_fname is not None:
+            fnames.append(labels_fname)
+        return fnames
 
-        # Compress matrix with metadata
+    # .............................................................................
+    @classmethod
+    def read_memmap_data(cls, mtx_fnames, meta_filename):
+        """Open uncompressed SparseMatrix arrays read-only, with a memory-map.
+
+        Args:
+            mtx_fnames (dict): filenames of CSR and CSC arrays, as returned by
+                get_memmap_filenames.
+            meta_filename (str): Filename of JSON sparse matrix metadata.
+
+        Returns:
+            csr (scipy.sparse.csr_array): Sparse Matrix data, in compressed row format.
+            csc (scipy.sparse.csc_array): Sparse Matrix data, in compressed column
+                format.
+            row_categ (pandas.api.types.CategoricalDtype): row categories
+            col_categ (pandas.api.types.CategoricalDtype): column categories
+            meta_dict (dict): remaining metadata for the matrix, including
+                precomputed "axis_stats" if they were saved with the matrix.
+
+        Raises:
+            Exception: on unable to open an NPY file
+            Exception: on unable to load JSON metadata file
+
+        Note:
+            Arrays are not read into memory; the operating system pages them in when
+                accessed and shares the pages among all processes mapping the file.
+        """
+        arrays = {}
+        for key, fname in mtx_fnames.items():
+            try:
+                arrays[key] = np.load(fname, mmap_mode="r")
+            except Exception as e:
+                raise Exception(f"Failed to load {fname}: {e}")
         try:
-            self._compress_files([mtx_fname, meta_fname], zip_fname)
+            row_categ, col_categ, meta_dict = cls._read_categories(meta_filename)
         except Exception:
             raise
 
-        return zip_fname
+        shape = (row_categ.categories.size, col_categ.categories.size)
+        csr = scipy.sparse.csr_array(
+            (arrays["csr_data"], arrays["csr_indices"], arrays["csr_indptr"]),
+            shape=shape, copy=False)
+        csc = scipy.sparse.csc_array(
+            (arrays["csc_data"], arrays["csc_indices"], arrays["csc_indptr"]),
+            shape=shape, copy=False)
+        return csr, csc, row_categ, col_categ, meta_dict
 
     # .............................................................................
     @classmethod
@@ -869,6 +2054,8 @@ class SparseMatrix(_AggregateDataMatrix):
             sparse_coo (scipy.sparse.coo_array): Sparse Matrix containing data.
             row_categ (pandas.api.types.CategoricalDtype): row categories
             col_categ (pandas.api.types.CategoricalDtype): column categories
+            meta_dict (dict): remaining metadata for the matrix, including
+                precomputed "axis_stats" if they were saved with the matrix.
             table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of table
                 data
             data_datestr (str): date string in format YYYY_MM_DD
@@ -889,11 +2076,12 @@ class SparseMatrix(_AggregateDataMatrix):
             raise
 
         try:
-            sparse_coo, row_categ, col_categ = cls.read_data(mtx_fname, meta_fname)
+            sparse_coo, row_categ, col_categ, meta_dict = cls.read_data(
+                mtx_fname, meta_fname)
         except Exception:
             raise
 
-        return sparse_coo, row_categ, col_categ, table_type, data_datestr
+        return sparse_coo, row_categ, col_categ, meta_dict, table_type, data_datestr
 
     # .............................................................................
     @classmethod
@@ -908,9 +2096,8 @@ class SparseMatrix(_AggregateDataMatrix):
             sparse_coo (scipy.sparse.coo_array): Sparse Matrix containing data.
             row_categ (pandas.api.types.CategoricalDtype): row categories
             col_categ (pandas.api.types.CategoricalDtype): column categories
-            table_type (sppy.tools.s2n.constants.SUMMARY_TABLE_TYPES): type of table
-                data
-            data_datestr (str): date string in format YYYY_MM_DD
+            meta_dict (dict): remaining metadata for the matrix, including
+                precomputed "axis_stats" if they were saved with the matrix.
 
         Raises:
             Exception: on unable to load NPZ file
@@ -929,6 +2116,16 @@ class SparseMatrix(_AggregateDataMatrix):
         except Exception as e:
             raise Exception(f"Failed to load {mtx_filename}: {e}")
 
+        try:
+            row_categ, col_categ, meta_dict = cls._read_categories(meta_filename)
+        except Exception:
+            raise
+
+        return sparse_coo, row_categ, col_categ, meta_dict
+
+    # .............................................................................
+    @classmethod
+    def _read_categories(cls, meta_filename):
         # Read JSON dictionary as string
         try:
             meta_dict = cls.load_metadata(meta_filename)
@@ -949,4 +2146,4 @@ class SparseMatrix(_AggregateDataMatrix):
         else:
             col_categ = CategoricalDtype(col_catlst, ordered=True)
 
-        return sparse_coo, row_categ, col_categ
+        return row_categ, col_categ, meta_dict
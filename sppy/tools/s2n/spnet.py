@@ -1,25 +1,53 @@
 """Class to query tabular summary Specify Network data in S3."""
 import boto3
 import json
+import logging
 import pandas as pd
+import threading
+import time
 
 from sppy.aws.aws_constants import (
     ENCODING, PROJ_BUCKET, REGION, SUMMARY_FOLDER)
-from sppy.aws.aws_tools import get_current_datadate_str
+from sppy.aws.aws_tools import download_from_s3, get_current_datadate_str
 from sppy.tools.s2n.constants import Summaries
+from sppy.tools.s2n.indexed_table import IndexedTable
 
 from sppy.tools.util.utils import get_traceback
 
+# Seconds before a local table is downloaded and read again
+LOCAL_TABLE_TTL_SECONDS = 24 * 60 * 60
+# Seconds before retrying a local table that failed to download or read
+LOCAL_TABLE_RETRY_SECONDS = 5 * 60
+
+logger = logging.getLogger(__name__)
+
 
 # .............................................................................
 class SpNetAnalyses():
-    """Class for retrieving SpecifyNetwork summary data from AWS S3."""
+    """Class for retrieving SpecifyNetwork summary data from AWS S3.
+
+    Note:
+        Parquet summary tables are downloaded once per process, and queried locally
+            as IndexedTables shared by all instances of this class.  Queries fall
+            back to S3 Select if a table cannot be downloaded or read.
+        Local tables are refreshed after LOCAL_TABLE_TTL_SECONDS.  While one thread
+            refreshes a table, other threads continue to query the previous one.
+        Each table has its own lock, so downloading one table does not block
+            queries of other tables.
+    """
+    # Local tables and their expiration time, keyed by (bucket, S3 object name),
+    # shared by all instances
+    _local_tables = {}
+    # Time after which to retry tables that failed to load, with the same keys
+    _local_failures = {}
+    # Lock for each table, with the same keys, and a lock for adding them
+    _local_locks = {}
+    _local_lock = threading.Lock()
 
     # ...............................................
-    @classmethod
     def __init__(
             self, bucket, s3_summary_path=SUMMARY_FOLDER, region=REGION,
-            encoding=ENCODING):
+            encoding=ENCODING, local_path="/tmp"):
         """Object to query tabular data in S3.
 
         Args:
@@ -27,6 +55,8 @@ class SpNetAnalyses():
              s3_summary_path: path within the bucket for summary data.
              region: AWS region containing the data.
              encoding: encoding of the data.
+             local_path: local directory for downloaded summary tables, if None,
+                query tables in S3 only.
         """
         self.bucket = bucket
         self.region = region
@@ -34,6 +64,7 @@ class SpNetAnalyses():
         self.exp_type = 'SQL'
         self.datestr = get_current_datadate_str()
         self._summary_path = s3_summary_path
+        self._local_path = local_path
         # Data objects for query
         self._summary_tables = Summaries.update_summary_tables(self.datestr)
 
@@ -56,6 +87,13 @@ class SpNetAnalyses():
 
     # ----------------------------------------------------
     def _dataset_metadata_exists(self):
+        # A table held locally exists, without listing the S3 folder
+        try:
+            self._get_local_table(self._summary_tables["dataset_meta"])
+        except Exception:
+            pass
+        else:
+            return True
         meta_fname = f"{self._summary_tables['dataset_meta']['fname']}.parquet"
         all_fnames = self._list_summaries()
         if meta_fname in all_fnames:
@@ -78,6 +116,83 @@ class SpNetAnalyses():
             raise Exception(f"Not yet implemented for table_format {tbl_format}")
         return s3_fname, in_serialization
 
+    # ----------------------------------------------------
+    def _get_local_table(self, table):
+        """Return a summary table held locally, downloading it on first use.
+
+        Args:
+            table: summary object within the bucket and summary folder
+
+        Returns:
+            IndexedTable: table containing all records of the summary object.
+
+        Raises:
+            Exception: on no local_path for this instance.
+            Exception: on table format other than parquet.
+            Exception: on failure to download or read the table.
+        """
+        if self._local_path is None:
+            raise Exception("No local path for summary tables")
+        if table["table_format"].lower() != "parquet":
+            raise Exception(
+                f"Local query not implemented for {table['table_format']}")
+        s3_fname, _ = self._get_s3_fname_serialization(
+            table["table_format"], table["fname"])
+        key = (self.bucket, f"{self._summary_path}/{s3_fname}")
+        local_table, expiration = self._local_tables.get(key, (None, 0))
+        if time.monotonic() < expiration:
+            return local_table
+        # One thread downloads and reads a table, others wait for the first load
+        # or continue with an expired table
+        table_lock = self._get_table_lock(key)
+        if not table_lock.acquire(blocking=(local_table is None)):
+            return local_table
+        try:
+            local_table, expiration = self._local_tables.get(key, (None, 0))
+            now = time.monotonic()
+            if now >= expiration:
+                if now < self._local_failures.get(key, 0):
+                    if local_table is None:
+                        raise Exception(f"Recent failure to load {s3_fname}")
+                else:
+                    local_table = self._load_local_table(
+                        key, s3_fname, table["key_fld"], local_table)
+        finally:
+            table_lock.release()
+        return local_table
+
+    # ----------------------------------------------------
+    @classmethod
+    def _get_table_lock(cls, key):
+        with cls._local_lock:
+            try:
+                return cls._local_locks[key]
+            except KeyError:
+                table_lock = threading.Lock()
+                cls._local_locks[key] = table_lock
+                return table_lock
+
+    # ----------------------------------------------------
+    def _load_local_table(self, key, s3_fname, key_fld, old_table):
+        # Called with the table lock held, replace an expired table with a fresh
+        # download
+        try:
+            local_filename = download_from_s3(
+                self.bucket, self._summary_path, s3_fname,
+                local_path=self._local_path, region=self.region,
+                overwrite=(old_table is not None))
+            local_table = IndexedTable.read_parquet(local_filename, key_fld)
+        except Exception:
+            self._local_failures[key] = time.monotonic() + LOCAL_TABLE_RETRY_SECONDS
+            if old_table is None:
+                raise
+            # Keep querying the expired table until the retry
+            return old_table
+        self._local_failures.pop(key, None)
+        self._local_tables[key] = (
+            local_table, time.monotonic() + LOCAL_TABLE_TTL_SECONDS)
+        return local_table
+
     # ----------------------------------------------------
     def _query_summary_table(self, table, query_str, format):
         """Query the S3 resource defined for this class.
@@ -168,10 +283,16 @@ class SpNetAnalyses():
         Returns:
              ordered list of records matching the query
         """
+        try:
+            local_table = self._get_local_table(table)
+        except Exception as e:
+            logger.warning(f"Failed to query local {table['fname']}, query S3: {e}")
+        else:
+            return local_table.get_ordered_records(sort_field, order, limit, format)
+
         s3_fname, _ = self._get_s3_fname_serialization(
             table["table_format"], table["fname"])
         s3_path = f"{self._summary_path}/{s3_fname}"
-        # TODO: download parquet and possibly write DF in NPZ format locally
         df = self._create_dataframe_from_s3obj(s3_path)
         # Sort rows (Axis 0/index) by values in sort_field (column)
         sorted_df = df.sort_values(
@@ -186,7 +307,7 @@ class SpNetAnalyses():
             # Add column headings as first record in list
             recs = [list(recs_df.columns)]
             for rec in recs_df.values:
-                recs.append(rec)
+                recs.append(list(rec))
         return recs
 
 # ----------------------------------------------------
@@ -201,30 +322,49 @@ class SpNetAnalyses():
              records: empty list or list of 1 record (list)
         """
         table = self._summary_tables["dataset_counts"]
-        query_str = (
-            f"SELECT * FROM s3object s WHERE s.{table['key_fld']} = '{dataset_key}'"
-        )
-        # Returns empty list or list of 1 record dict
-        records = self._query_summary_table(table, query_str, format)
+        try:
+            records = self._get_local_table(table).get_records(dataset_key, format)
+        except Exception as e:
+            logger.warning(f"Failed to query local {table['fname']}, query S3: {e}")
+            query_str = (
+                f"SELECT * FROM s3object s WHERE s.{table['key_fld']} = "
+                f"'{dataset_key}'"
+            )
+            # Returns empty list or list of 1 record dict
+            records = self._query_summary_table(table, query_str, format)
         if self._dataset_metadata_exists():
-            self._add_dataset_lookup_vals(records, table, format)
+            self._add_dataset_names(records, table, format)
         return records
 
     # ...............................................
-    def lookup_dataset_names(self, labels):
-        names = {}
-        for lbl in labels:
-            names[lbl] = None
+    def lookup_dataset_names(self, labels, field="title"):
+        """Return a metadata value, the title by default, for each dataset_key.
+
+        Args:
+            labels: one or a list of dataset GUIDs.
+            field: fieldname in the dataset metadata table to return.
+
+        Returns:
+            names (dict): value of field for each dataset_key, None for dataset_keys
+                without metadata.
+        """
         if not (isinstance(labels, list) or isinstance(labels, tuple)):
             labels = [labels]
+        meta_table = self._summary_tables["dataset_meta"]
+        try:
+            # Array lookup in the shared table, without creating records
+            return self._get_local_table(meta_table).get_values(labels, field)
+        except Exception:
+            pass
+        names = {lbl: None for lbl in labels}
         try:
             ds_meta = self.get_dataset_metadata(labels)
-        except Exception as e:
+        except Exception:
             pass
         else:
             for rec in ds_meta:
                 # label is a dataset_key
-                names[rec["dataset_key"]] = rec["title"]
+                names[rec[meta_table["key_fld"]]] = rec[field]
         return names
 
     # ----------------------------------------------------
@@ -237,36 +377,31 @@ class SpNetAnalyses():
             rec_table: dictionary of fieldnames, filename, format for a summary table
             format: output format, options "CSV" or "JSON"
         """
-        # Metadata table info
-        meta_table = self._summary_tables["dataset_meta"]
-        meta_key_fld = meta_table["key_fld"]
-
         # Record info
         rec_fields = rec_table["fields"]
         rec_key_idx = rec_table["key_fld"]
+        data_records = records
         if format == "CSV":
             rec_key_idx = rec_fields.index(rec_key_idx)
+            # Ordered CSV records start with the fieldnames
+            if len(records) > 0 and list(records[0]) == rec_fields:
+                records[0].append("dataset_title")
+                data_records = records[1:]
 
-        dataset_keys = [rec[rec_key_idx] for rec in records]
+        dataset_keys = list({rec[rec_key_idx] for rec in data_records})
 
-        # Returns a list of dictionaries
-        meta_ds = self.get_dataset_metadata(dataset_keys)
+        # Join records to titles by key, in one lookup of all keys
+        titles = self.lookup_dataset_names(dataset_keys)
 
         # Update each record
-        for rec in records:
-            # Initialize to empty string
-            dstitle = ""
-            # Iterate over metadata recs until we find dict with same key
-            for dsm in meta_ds:
-                if dsm[meta_key_fld] == rec[rec_key_idx]:
-                    dstitle = dsm["title"]
-                    break
-            # Update the record
+        for rec in data_records:
+            dstitle = titles.get(rec[rec_key_idx])
+            if dstitle is None:
+                dstitle = ""
             if format == "JSON":
                 rec["dataset_title"] = dstitle
             else:
-                rec.extend(dstitle)
-        print(records)
+                rec.append(dstitle)
 
     # ----------------------------------------------------
     def rank_dataset_counts(self, rank_by, order, limit, format="JSON"):
@@ -319,6 +454,11 @@ class SpNetAnalyses():
 
         if not(isinstance(dataset_keys, list) or isinstance(dataset_keys, tuple)):
             dataset_keys = [dataset_keys]
+        try:
+            return self._get_local_table(meta_table).get_records(dataset_keys, "JSON")
+        except Exception as e:
+            logger.warning(
+                f"Failed to query local {meta_table['fname']}, query S3: {e}")
         innerstr = "','".join(dataset_keys)
         in_cond = f"['{innerstr}']"
         query_str = (
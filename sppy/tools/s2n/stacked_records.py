@@ -0,0 +1,137 @@
+"""Stacked records read in batches, so that no table is held in memory at once."""
+import pandas as pd
+
+from sppy.tools.s2n.aggregate_data_matrix import _AggregateDataMatrix
+from sppy.tools.util.logtools import logit
+
+
+# .............................................................................
+def iter_record_batches(stacked_records):
+    """Return an iterable of DataFrame batches for stacked records.
+
+    Args:
+        stacked_records (pandas.DataFrame or iterable of pandas.DataFrame): records
+            in one DataFrame, or in batches, i.e. a StackedParquet.
+
+    Returns:
+        iterable of pandas.DataFrame: a list containing the DataFrame, or the
+            batches.
+    """
+    if isinstance(stacked_records, pd.DataFrame):
+        return [stacked_records]
+    return stacked_records
+
+
+# .............................................................................
+def read_partition(filename, row_group, read_fields, combine_fields):
+    """Read one row group of a parquet file, i.e. in a separate process.
+
+    Args:
+        filename (str): local parquet file.
+        row_group (int): index of the row group in the file.
+        read_fields (list of str): columns to read from the file.
+        combine_fields (dict): new fields constructed from 2 of read_fields.
+
+    Returns:
+        pandas.DataFrame: records of the row group, with combined fields.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.ParquetFile(filename).read_row_group(row_group, columns=read_fields)
+    return _AggregateDataMatrix.add_combined_fields(table.to_pandas(), combine_fields)
+
+
+# .............................................................................
+class StackedParquet:
+    """Stacked records in local parquet files, read one batch at a time.
+
+    Note:
+        Iterating reads the files again from the start, so records can be passed
+            over more than once, i.e. to build and then validate a matrix.
+    """
+
+    # ...........................
+    def __init__(
+            self, parquet_filenames, fields, combine_fields=None, batch_size=1000000,
+            logger=None):
+        """Constructor.
+
+        Args:
+            parquet_filenames (str or list of str): local parquet file, or ordered
+                parts of one table (i.e. files ending in _000.parquet, _001.parquet).
+            fields (list of str): fields to include in each batch.
+            combine_fields (dict): optional dictionary of new fields constructed from
+                2 existing fields, i.e. the "combine_fields" value of the stacked
+                table in sppy.tools.s2n.constants.Summaries.TABLES.  Any of fields
+                may be a new field.
+            batch_size (int): maximum number of records to read into memory at once.
+            logger (object): logger for saving relevant processing messages
+        """
+        import pyarrow.parquet as pq
+
+        if isinstance(parquet_filenames, str):
+            parquet_filenames = [parquet_filenames]
+        self.filenames = parquet_filenames
+        self.fields = fields
+        # Only requested fields are constructed
+        if combine_fields is None:
+            combine_fields = {}
+        self._combine_fields = {
+            fld: src_flds for fld, src_flds in combine_fields.items()
+            if fld in fields}
+        # Read only the columns needed for the fields
+        self._read_fields = []
+        for fld in fields:
+            self._read_fields.extend(self._combine_fields.get(fld, (fld,)))
+        self._batch_size = batch_size
+        self._logger = logger
+        self._pq_files = [pq.ParquetFile(fn) for fn in parquet_filenames]
+
+    # ...........................
+    @property
+    def num_rows(self):
+        """Return the number of records in all files, from the parquet metadata.
+
+        Returns:
+            int: number of records.
+        """
+        return sum([pqf.metadata.num_rows for pqf in self._pq_files])
+
+    # ...........................
+    def get_dtype(self, field):
+        """Return the numpy type of a field stored in the parquet files.
+
+        Args:
+            field (str): fieldname of a column in the files.
+
+        Returns:
+            numpy.dtype: type of the field's values.
+        """
+        return self._pq_files[0].schema_arrow.field(field).type.to_pandas_dtype()
+
+    # ...........................
+    def get_partitions(self):
+        """Return arguments to read each row group of each file with read_partition.
+
+        Returns:
+            list of tuple: (filename, row_group, read_fields, combine_fields) for
+                every row group, in file and row group order.
+        """
+        return [
+            (fn, row_group, self._read_fields, self._combine_fields)
+            for fn, pqf in zip(self.filenames, self._pq_files)
+            for row_group in range(pqf.num_row_groups)]
+
+    # ...........................
+    def __iter__(self):
+        """Read batches of records from each file in order.
+
+        Yields:
+            batch_df (pandas.DataFrame): next batch of records, with combined fields.
+        """
+        for fn, pqf in zip(self.filenames, self._pq_files):
+            logit(self._logger, f"Read {pqf.metadata.num_rows} records from {fn}")
+            for batch in pqf.iter_batches(
+                    batch_size=self._batch_size, columns=self._read_fields):
+                yield _AggregateDataMatrix.add_combined_fields(
+                    batch.to_pandas(), self._combine_fields)
@@ -1,6 +1,7 @@
 """Matrix to summarize each of 2 dimensions of data by counts of the other and a third."""
 from collections import OrderedDict
 from logging import ERROR
+import numpy as np
 import pandas as pd
 
 from sppy.tools.s2n.aggregate_data_matrix import _AggregateDataMatrix
@@ -31,6 +32,8 @@ class SummaryMatrix(_AggregateDataMatrix):
         """
         self._df = summary_df
         _AggregateDataMatrix.__init__(self, table_type, data_datestr, logger=logger)
+        # Sorted row positions, keyed by (sort fields, descending)
+        self._rank_orders = {}
 
     # ...........................
     @classmethod
@@ -41,12 +44,14 @@ class SummaryMatrix(_AggregateDataMatrix):
             sp_mtx (sppy.aws.SparseMatrix): A sparse matrix with count
                 values for one aggregator0 (i.e. species) rows (axis 0) by another
                 aggregator1 (i.e. dataset) columns (axis 1) to use for computations.
-            axis (int): Summarize rows (0) or columns (1).
+            axis (int): Summarize each column, down axis 0, or each row, across
+                axis 1.
             logger (object): logger for saving relevant processing messages
 
         Returns:
-            sparse_coo (pandas.DataFrame): DataFrame summarizing rows by the count and
-                value of columns, or columns by the count amd value of rows.
+            summary_matrix (sppy.tools.s2n.summary_matrix.SummaryMatrix): summary of
+                rows by the count and value of columns, or columns by the count and
+                value of rows.
 
         Note:
             The input dataframe must contain only one input record for any x and y value
@@ -72,7 +77,8 @@ class SummaryMatrix(_AggregateDataMatrix):
             table_type = input_table_meta["row_summary_table"]
 
         # summary fields = columns, sparse matrix axis = rows
-        sdf = pd.DataFrame(data=data, index=index)
+        # Columns are views of the sparse matrix totals and counts, not copies
+        sdf = pd.DataFrame(data=data, index=index, copy=False)
 
         summary_matrix = SummaryMatrix(
             sdf, table_type, sp_mtx.data_datestr, logger=logger)
@@ -98,6 +104,27 @@ class SummaryMatrix(_AggregateDataMatrix):
         """
         return self._df.shape[1]
 
+    # ...............................................
+    @property
+    def nbytes(self):
+        """Get the memory used by the summary data and its row labels.
+
+        Returns:
+            int: number of bytes.
+        """
+        return int(self._df.memory_usage(index=True, deep=True).sum())
+
+    # ...............................................
+    @property
+    def cached_nbytes(self):
+        """Get the memory used by sorted orders cached for ranking records.
+
+        Returns:
+            int: number of bytes, excluding the summary data and row labels, i.e.
+                views of a SparseMatrix's aggregates and labels.
+        """
+        return int(sum([order.nbytes for order in self._rank_orders.values()]))
+
     # ...............................................
     def get_random_row_labels(self, count):
         """Get random values from the labels on axis 0 of matrix.
@@ -117,7 +144,7 @@ class SummaryMatrix(_AggregateDataMatrix):
 
     # .............................................................................
     def compress_to_file(self, local_path="/tmp"):
-        """Compress this SparseMatrix to a zipped npz and json file.
+        """Compress this SummaryMatrix to a zipped parquet (or csv) and json file.
 
         Args:
             local_path (str): Absolute path of local destination path
@@ -126,7 +153,7 @@ class SummaryMatrix(_AggregateDataMatrix):
             zip_fname (str): Local output zip filename.
 
         Raises:
-            Exception: on failure to write dataframe to CSV file.
+            Exception: on failure to write dataframe to parquet or CSV file.
             Exception: on failure to serialize or write metadata as JSON.
             Exception: on failure to write matrix and metadata files to zipfile.
         """
@@ -134,9 +161,12 @@ class SummaryMatrix(_AggregateDataMatrix):
         [mtx_fname, meta_fname, zip_fname] = self._remove_expected_files(
             local_path=local_path)
 
-        # Save matrix to csv locally
+        # Save matrix to parquet (or csv, by table matrix_extension) locally
         try:
-            self._df.to_csv(mtx_fname, sep=MATRIX_SEPARATOR)
+            if mtx_fname.endswith(".csv"):
+                self._df.to_csv(mtx_fname, sep=MATRIX_SEPARATOR)
+            else:
+                self._df.to_parquet(mtx_fname, index=True)
         except Exception as e:
             msg = f"Failed to write {mtx_fname}: {e}"
             self._logme(msg, log_level=ERROR)
@@ -199,7 +229,8 @@ class SummaryMatrix(_AggregateDataMatrix):
         """Read SummaryMatrix data files into a dataframe and metadata dictionary.
 
         Args:
-            mtx_filename (str): Filename of pandas.DataFrame data in csv format.
+            mtx_filename (str): Filename of pandas.DataFrame data in parquet format, or
+                csv format for files written before summaries were stored as parquet.
             meta_filename (str): Filename of JSON summary matrix metadata.
 
         Returns:
@@ -209,12 +240,16 @@ class SummaryMatrix(_AggregateDataMatrix):
             data_datestr (str): date string in format YYYY_MM_DD
 
         Raises:
-            Exception: on unable to load CSV file
+            Exception: on unable to load parquet or CSV file
             Exception: on unable to load JSON metadata
         """
-        # Read dataframe from local CSV file
+        # Read dataframe from local parquet or CSV file, chosen by extension
         try:
-            dataframe = pd.read_csv(mtx_filename, sep=MATRIX_SEPARATOR, index_col=0)
+            if mtx_filename.endswith(".csv"):
+                dataframe = pd.read_csv(
+                    mtx_filename, sep=MATRIX_SEPARATOR, index_col=0)
+            else:
+                dataframe = pd.read_parquet(mtx_filename)
         except Exception as e:
             raise Exception(f"Failed to load {mtx_filename}: {e}")
         # Read JSON dictionary as string
@@ -244,49 +279,74 @@ class SummaryMatrix(_AggregateDataMatrix):
         }
         return stats
 
+    # ...........................
+    def _get_rank_order(self, sort_flds, descending):
+        """Return row positions ordered by one or more fields, computed only once.
+
+        Args:
+            sort_flds (tuple): fields to sort on, the first is the primary sort key,
+                and each following field breaks ties in the previous fields.
+            descending (bool): flag indicating whether to order largest first.
+
+        Returns:
+            order (numpy.ndarray): positions of all rows in sorted order, remaining
+                ties in order of the rows.
+        """
+        key = (sort_flds, descending)
+        try:
+            return self._rank_orders[key]
+        except KeyError:
+            pass
+        # np.lexsort sorts by the last key first
+        sort_keys = [np.arange(self.num_items)]
+        for fld in reversed(sort_flds):
+            vals = self._df[fld].to_numpy()
+            sort_keys.append(-vals if descending else vals)
+        order = np.lexsort(sort_keys)
+        self._rank_orders[key] = order
+        return order
+
     # ...........................
     def rank_measures(self, sort_by, order="descending", limit=10):
         """Order records by sort_by field and return the top or bottom limit records.
 
         Args:
-            sort_by (str): field containing measurement to sort on
-                (options: SUMMARY_FIELDS.COUNT, SUMMARY_FIELDS.TOTAL).
+            sort_by (str or list): field containing measurement to sort on
+                (options: SUMMARY_FIELDS.COUNT, SUMMARY_FIELDS.TOTAL), or a list of
+                fields, where each following field breaks ties in the previous fields.
             order (str): return records, sorted from top (descending) or bottom
                 (ascending).
             limit (int): number of records to return.
 
         Returns:
             ordered_rec_dict (OrderedDict): records containing all fields, sorted by the
-                sort_by field.
+                sort_by field(s), keyed by row label.
 
         Raises:
             Exception: on sort field does not exist in data.
+            Exception: on order not in ("ascending", "descending").
+
+        Note:
+            Records tied on all sort fields are returned in row order, and exactly
+                limit records are returned if there are that many rows.
         """
-        measure_flds = self._keys["fields"].copy()
-        try:
-            measure_flds.remove(sort_by)
-        except ValueError:
-            raise Exception(
-                f"Field {sort_by} does not exist; sort by one of {self._keys['fields']}")
-        # Get largest and down
-        if order == "descending":
-            sorted_df = self._df.nlargest(limit, sort_by, keep="all")
-        # Get smallest and up
-        elif order == "ascending":
-            sorted_df = self._df.nsmallest(limit, sort_by, keep="all")
-        else:
+        fields = self._table["fields"]
+        sort_flds = (sort_by,) if isinstance(sort_by, str) else tuple(sort_by)
+        for fld in sort_flds:
+            if fld not in fields:
+                raise Exception(
+                    f"Field {fld} does not exist; sort by one of {fields}")
+        if order not in ("ascending", "descending"):
             raise Exception(
-                f"Order {sort_by} does not exist, use 'ascending' or 'descending')")
-        # Returns dict with each measurement in a separate dictionary, so re-arrange
-        rec_dict = sorted_df.to_dict()
-        ordered_rec_dict = OrderedDict()
-        # Create records from the sorted measurement first, in order returned
-        for k, v in rec_dict[sort_by]:
-            ordered_rec_dict[k] = {sort_by: v}
-            # measure_flds now contains all fields except sort_by
-            #   add remaining fields and values to the new ordered records
-            for other_fld in measure_flds:
-                ordered_rec_dict[k][other_fld] = rec_dict[other_fld][k]
+                f"Order {order} does not exist, use 'ascending' or 'descending')")
+
+        positions = self._get_rank_order(sort_flds, order == "descending")[:limit]
+        # Sort fields first, then remaining fields, each a column of values
+        rec_flds = list(sort_flds) + [fld for fld in fields if fld not in sort_flds]
+        columns = [self._df[fld].to_numpy()[positions].tolist() for fld in rec_flds]
+        labels = self._df.index[positions].tolist()
+        ordered_rec_dict = OrderedDict(
+            (lbl, dict(zip(rec_flds, vals))) for lbl, *vals in zip(labels, *columns))
         return ordered_rec_dict
 
     # ...............................................
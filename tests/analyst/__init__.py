@@ -0,0 +1 @@
+"""Test package for Analyst flask application."""
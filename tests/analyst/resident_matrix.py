@@ -0,0 +1,29 @@
+"""Resident test matrix for the endpoints of the Analyst flask application."""
+from flask_app.analyst.matrix_registry import MatrixRegistry
+from sppy.aws.aws_tools import get_current_datadate_str
+from sppy.tools.s2n.constants import SUMMARY_TABLE_TYPES
+from tests.s2n.stacked_data import make_sparse_matrix, make_stacked_data
+
+
+# ...............................................
+def register_test_matrix(monkeypatch, stacked_df=None):
+    """Make a small matrix resident as the current data date, without S3 lookups.
+
+    Args:
+        monkeypatch: pytest fixture for reverting changes after a test.
+        stacked_df (pandas.DataFrame): optional records to build the matrix from,
+            random records if None.
+
+    Returns:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): resident matrix.
+    """
+    if stacked_df is None:
+        stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df, data_datestr=get_current_datadate_str())
+    monkeypatch.setattr(
+        sp_mtx, "_lookup_dataset_names", lambda labels: {lb: None for lb in labels})
+    MatrixRegistry.clear()
+    MatrixRegistry._register(
+        (SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, get_current_datadate_str()),
+        sp_mtx)
+    return sp_mtx
@@ -0,0 +1,46 @@
+"""Tests for the describe endpoint of the Analyst flask application."""
+from flask_app.analyst.matrix_registry import MatrixRegistry
+from flask_app.analyst.routes import app
+from tests.analyst.resident_matrix import register_test_matrix
+
+STATS_KEY = "Dataset Statistics"
+
+
+# ............................
+def test_describe_get_single_key(monkeypatch):
+    """Return the statistics of one dataset for a GET with one key."""
+    sp_mtx = register_test_matrix(monkeypatch)
+    response = app.test_client().get(
+        "/api/v1/describe/?summary_type=dataset&summary_key=ds3")
+    MatrixRegistry.clear()
+    assert response.status_code == 200
+    output = response.get_json()["output"][STATS_KEY]
+    assert output == sp_mtx.get_one_column_stats("ds3")
+
+
+# ............................
+def test_describe_post_one_key_list(monkeypatch):
+    """Return statistics keyed by dataset for a POST with a list of one key."""
+    sp_mtx = register_test_matrix(monkeypatch)
+    response = app.test_client().post(
+        "/api/v1/describe/",
+        json={"summary_type": "dataset", "summary_key": ["ds3"]})
+    MatrixRegistry.clear()
+    assert response.status_code == 200
+    output = response.get_json()["output"][STATS_KEY]
+    assert output == {"ds3": sp_mtx.get_one_column_stats("ds3")}
+
+
+# ............................
+def test_describe_post_many_keys(monkeypatch):
+    """Return statistics keyed by dataset for a POST with many keys."""
+    sp_mtx = register_test_matrix(monkeypatch)
+    response = app.test_client().post(
+        "/api/v1/describe/",
+        json={"summary_type": "dataset", "summary_key": ["ds3", "ds5", "dsX"]})
+    MatrixRegistry.clear()
+    assert response.status_code == 200
+    content = response.get_json()
+    assert content["output"][STATS_KEY] == {
+        key: sp_mtx.get_one_column_stats(key) for key in ("ds3", "ds5")}
+    assert content["errors"]["warning"] == ["Key dsX does not exist in dataset"]
@@ -0,0 +1,136 @@
+"""Tests for loading matrices in the Analyst flask application."""
+import flask_app.analyst.base as analyst_base
+from flask_app.analyst.base import _AnalystService
+from flask_app.analyst.matrix_registry import MatrixRegistry
+from sppy.aws.aws_tools import get_current_datadate_str
+from sppy.tools.s2n.constants import Summaries, SUMMARY_TABLE_TYPES
+from sppy.tools.s2n.sparse_matrix import SparseMatrix
+from tests.s2n.stacked_data import (
+    make_sparse_matrix, make_stacked_data, to_dense_frame, VAL_FLD, X_FLD, Y_FLD)
+
+MTX_TABLE_TYPE = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
+
+
+# ...............................................
+def _no_s3(*args, **kwargs):
+    """Fail like a download of an object missing from S3."""
+    raise Exception("Object is not on S3")
+
+
+# ............................
+def test_load_matrix_from_delta(monkeypatch, tmp_path):
+    """Rebuild a matrix saved only as a delta from the previous matrix."""
+    monkeypatch.setattr(analyst_base, "INPUT_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "DOWNLOAD_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "download_from_s3", _no_s3)
+    stacked_df = make_stacked_data()
+    prev_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_02_01")
+    prev_mtx.compress_to_file(local_path=str(tmp_path))
+    next_df = stacked_df[stacked_df[X_FLD] != "ds3"]
+    delta = prev_mtx.compute_column_delta(
+        next_df, X_FLD, Y_FLD, VAL_FLD, "2024_03_01")
+    table = Summaries.get_table(MTX_TABLE_TYPE, "2024_03_01")
+    SparseMatrix.write_delta_file(
+        delta, SparseMatrix.get_delta_filename(table["fname"], str(tmp_path)))
+
+    MatrixRegistry.clear()
+    sp_mtx, errinfo = _AnalystService._load_sparse_matrix(
+        MTX_TABLE_TYPE, "2024_03_01")
+    # The previous matrix stays resident for later loads
+    is_prev_resident = MatrixRegistry.is_resident(MTX_TABLE_TYPE, "2024_02_01")
+    MatrixRegistry.clear()
+    assert sp_mtx is not None
+    assert "error" not in errinfo
+    assert is_prev_resident
+    assert to_dense_frame(sp_mtx).equals(
+        to_dense_frame(make_sparse_matrix(next_df, data_datestr="2024_03_01")))
+
+
+# ............................
+def test_load_matrix_from_delta_reuses_resident_matrix(monkeypatch, tmp_path):
+    """Apply a delta to the resident previous matrix, without reading its files."""
+    monkeypatch.setattr(analyst_base, "INPUT_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "DOWNLOAD_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "download_from_s3", _no_s3)
+    stacked_df = make_stacked_data()
+    prev_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_02_01")
+    next_df = stacked_df[stacked_df[X_FLD] != "ds3"]
+    delta = prev_mtx.compute_column_delta(
+        next_df, X_FLD, Y_FLD, VAL_FLD, "2024_03_01")
+    table = Summaries.get_table(MTX_TABLE_TYPE, "2024_03_01")
+    SparseMatrix.write_delta_file(
+        delta, SparseMatrix.get_delta_filename(table["fname"], str(tmp_path)))
+
+    # No files for the previous matrix, only the resident copy
+    MatrixRegistry.clear()
+    MatrixRegistry._register((MTX_TABLE_TYPE, "2024_02_01"), prev_mtx)
+    sp_mtx, errinfo = _AnalystService._load_sparse_matrix(
+        MTX_TABLE_TYPE, "2024_03_01")
+    MatrixRegistry.clear()
+    assert "error" not in errinfo
+    assert to_dense_frame(sp_mtx).equals(
+        to_dense_frame(make_sparse_matrix(next_df, data_datestr="2024_03_01")))
+
+
+# ............................
+def test_load_delta_skips_memmap_download(monkeypatch, tmp_path):
+    """Request no memory-mapped files for a date saved as a delta, nor warn of them."""
+    monkeypatch.setattr(analyst_base, "INPUT_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "DOWNLOAD_PATH", str(tmp_path))
+    requested = []
+
+    def _record_no_s3(bucket, folder, basename, **kwargs):
+        requested.append(basename)
+        _no_s3()
+
+    monkeypatch.setattr(analyst_base, "download_from_s3", _record_no_s3)
+    stacked_df = make_stacked_data()
+    prev_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_02_01")
+    delta = prev_mtx.compute_column_delta(
+        stacked_df, X_FLD, Y_FLD, VAL_FLD, "2024_03_01")
+    table = Summaries.get_table(MTX_TABLE_TYPE, "2024_03_01")
+    SparseMatrix.write_delta_file(
+        delta, SparseMatrix.get_delta_filename(table["fname"], str(tmp_path)))
+
+    MatrixRegistry.clear()
+    MatrixRegistry._register((MTX_TABLE_TYPE, "2024_02_01"), prev_mtx)
+    sp_mtx, errinfo = _AnalystService._load_sparse_matrix(
+        MTX_TABLE_TYPE, "2024_03_01")
+    MatrixRegistry.clear()
+    assert sp_mtx is not None
+    assert "warning" not in errinfo
+    assert not [fn for fn in requested if not fn.endswith(".zip")]
+
+
+# ............................
+def test_load_missing_matrix(monkeypatch, tmp_path):
+    """Return errors for a matrix with no files, zip or delta."""
+    monkeypatch.setattr(analyst_base, "INPUT_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "DOWNLOAD_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "download_from_s3", _no_s3)
+    sp_mtx, errinfo = _AnalystService._load_sparse_matrix(
+        MTX_TABLE_TYPE, "2024_03_01")
+    assert sp_mtx is None
+    assert errinfo["error"]
+
+
+# ............................
+def test_preload_warms_label_lookups(monkeypatch, tmp_path):
+    """Build summaries and prepare label lookups of a matrix read from files."""
+    monkeypatch.setattr(analyst_base, "INPUT_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "DOWNLOAD_PATH", str(tmp_path))
+    monkeypatch.setattr(analyst_base, "download_from_s3", _no_s3)
+    make_sparse_matrix(
+        make_stacked_data(), data_datestr=get_current_datadate_str()
+    ).compress_to_file(local_path=str(tmp_path))
+    MatrixRegistry.clear()
+    errinfo = _AnalystService.preload()
+    sp_mtx, _errinfo = _AnalystService._init_sparse_matrix()
+    MatrixRegistry.clear()
+    assert "error" not in errinfo
+    assert set(sp_mtx._summary_matrices) == {0, 1}
+    for categories in (
+            sp_mtx.row_category.categories, sp_mtx.column_category.categories):
+        assert categories._engine.is_mapping_populated
+        # Cached by pandas on the first get_indexer
+        assert "inferred_type" in categories._cache
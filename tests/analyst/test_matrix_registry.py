@@ -0,0 +1,118 @@
+"""Tests for flask_app.analyst.matrix_registry.MatrixRegistry."""
+import threading
+
+from flask_app.analyst.base import _AnalystService
+from flask_app.analyst.matrix_registry import MatrixRegistry
+from flask_app.analyst.routes import app
+from sppy.tools.s2n.constants import SUMMARY_TABLE_TYPES
+from tests.s2n.stacked_data import make_sparse_matrix, make_stacked_data
+
+MTX_TABLE_TYPE = SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX
+
+
+# ...............................................
+class _CountingLoader:
+    """Loader returning a fixed result and counting how often it is called."""
+
+    def __init__(self, matrix, errinfo):
+        """Constructor.
+
+        Args:
+            matrix (object): matrix to return, None for a failed load.
+            errinfo (dict): errors/info to return.
+        """
+        self.matrix = matrix
+        self.errinfo = errinfo
+        self.calls = 0
+
+    def __call__(self):
+        """Return the matrix and errors/info.
+
+        Returns:
+            matrix (object): matrix, None for a failed load.
+            errinfo (dict): errors/info.
+        """
+        self.calls += 1
+        return self.matrix, self.errinfo
+
+
+# ............................
+def test_failed_load_is_not_retried_until_backoff(monkeypatch):
+    """Return the errors of a failed load without loading again until the delay."""
+    MatrixRegistry.clear()
+    monkeypatch.setattr(MatrixRegistry, "retry_failed_seconds", 3600)
+    loader = _CountingLoader(None, {"error": ["Object is not on S3"]})
+    for _ in range(3):
+        matrix, errinfo = MatrixRegistry.get_matrix(
+            MTX_TABLE_TYPE, "2024_02_01", loader, timeout=5)
+        assert matrix is None
+        assert errinfo == {"error": ["Object is not on S3"]}
+    MatrixRegistry.prefetch(MTX_TABLE_TYPE, "2024_02_01", loader)
+    assert loader.calls == 1
+
+    # Retry after the delay, and forget the failure after a successful load
+    monkeypatch.setattr(MatrixRegistry, "retry_failed_seconds", 0)
+    MatrixRegistry.clear()
+    MatrixRegistry.get_matrix(MTX_TABLE_TYPE, "2024_02_01", loader, timeout=5)
+    loader.matrix, loader.errinfo = "matrix", {}
+    matrix, errinfo = MatrixRegistry.get_matrix(
+        MTX_TABLE_TYPE, "2024_02_01", loader, timeout=5)
+    MatrixRegistry.clear()
+    assert (matrix, errinfo) == ("matrix", {})
+    assert loader.calls == 3
+
+
+# ............................
+def test_results_cached_after_registering_count_against_budget(monkeypatch):
+    """Evict older matrices when a resident matrix grows by caching results."""
+    stacked_df = make_stacked_data()
+    old_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_01_01")
+    new_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_02_01")
+    MatrixRegistry.clear()
+    monkeypatch.setattr(
+        MatrixRegistry, "memory_budget", old_mtx.nbytes + new_mtx.nbytes)
+    MatrixRegistry._register((MTX_TABLE_TYPE, "2024_01_01"), old_mtx)
+    MatrixRegistry._register((MTX_TABLE_TYPE, "2024_02_01"), new_mtx)
+    registered_nbytes = new_mtx.nbytes
+
+    # A compressed row copy and similarity data are created on demand
+    new_mtx.get_similarity().get_similar(new_mtx.column_category.categories[0])
+    is_old_resident = MatrixRegistry.is_resident(MTX_TABLE_TYPE, "2024_01_01")
+    matrix, _errinfo = MatrixRegistry.get_matrix(
+        MTX_TABLE_TYPE, "2024_02_01", _CountingLoader(None, {}))
+    data_dates = MatrixRegistry.get_data_dates(MTX_TABLE_TYPE)
+    MatrixRegistry.clear()
+    assert new_mtx.nbytes > registered_nbytes + new_mtx._csr_array.data.nbytes
+    assert is_old_resident
+    assert matrix is new_mtx
+    assert data_dates == ["2024_02_01"]
+
+
+# ............................
+def test_loading_matrix_responds_json_503(monkeypatch):
+    """Respond with the JSON envelope and Retry-After while a matrix loads."""
+    MatrixRegistry.clear()
+    release = threading.Event()
+
+    def _slow_load(mtx_table_type, data_datestr):
+        release.wait(10)
+        return None, {}
+
+    monkeypatch.setattr(_AnalystService, "_load_sparse_matrix", _slow_load)
+    monkeypatch.setattr(MatrixRegistry, "wait_seconds", 0.01)
+    try:
+        response = app.test_client().get(
+            "/api/v1/rank/?summary_type=species&rank_by=occurrence")
+    finally:
+        # Finish the background load before forgetting it
+        loads = list(MatrixRegistry._loading.values())
+        release.set()
+        for load in loads:
+            load.done.wait(10)
+        MatrixRegistry.clear()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        MatrixRegistry.retry_after_seconds)
+    output = response.get_json()
+    assert output["service"] == "rank"
+    assert "loading" in output["errors"]["error"][0]
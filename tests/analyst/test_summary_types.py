@@ -0,0 +1,43 @@
+"""Tests that the Analyst endpoints read the same matrix axis for a summary_type."""
+import pytest
+
+from flask_app.analyst.matrix_registry import MatrixRegistry
+from flask_app.analyst.routes import app
+from tests.analyst.resident_matrix import register_test_matrix
+from tests.s2n.stacked_data import X_FLD, Y_FLD
+
+
+# ............................
+@pytest.mark.parametrize("summary_type, label_fld", [
+    ("dataset", X_FLD), ("species", Y_FLD)])
+def test_endpoints_agree_on_summary_type(monkeypatch, summary_type, label_fld):
+    """Rank, describe distributions of, and find similar datasets or species."""
+    sp_mtx = register_test_matrix(monkeypatch)
+    if summary_type == "dataset":
+        labels = set(sp_mtx.column_category.categories)
+    else:
+        labels = set(sp_mtx.row_category.categories)
+    key = sorted(labels)[0]
+    client = app.test_client()
+    rank_out = client.get(
+        f"/api/v1/rank/?summary_type={summary_type}&rank_by=occurrence"
+        f"&limit=5").get_json()
+    dist_out = client.get(
+        f"/api/v1/distribution/?summary_type={summary_type}").get_json()
+    pct_out = client.get(
+        f"/api/v1/distribution/?summary_type={summary_type}"
+        f"&summary_key={key}").get_json()
+    similar_out = client.get(
+        f"/api/v1/similar/?summary_type={summary_type}&summary_key={key}"
+        f"&limit=5").get_json()
+    MatrixRegistry.clear()
+
+    assert rank_out["errors"] == {}
+    assert {rec[label_fld] for rec in rank_out["output"]} <= labels
+    distribution = dist_out["output"][f"{summary_type.capitalize()} Distribution"]
+    assert distribution["count"] == len(labels)
+    percentile = pct_out["output"][f"{summary_type.capitalize()} Percentile"]
+    assert percentile[label_fld] == key
+    similar = similar_out["output"][f"{summary_type.capitalize()} Similarity"]
+    assert similar["records"]
+    assert {rec["label"] for rec in similar["records"]} <= labels - {key}
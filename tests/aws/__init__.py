@@ -0,0 +1 @@
+"""Test package for Specify Network AWS tools."""
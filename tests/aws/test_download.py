@@ -0,0 +1,99 @@
+"""Tests for downloading S3 objects with sppy.aws.aws_tools.download_from_s3."""
+import hashlib
+from io import BytesIO
+
+import boto3
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+import pytest
+
+import sppy.aws.aws_tools as aws_tools
+
+BUCKET = "test-bucket"
+CONTENT = b"species,dataset,count\n" * 100
+MD5_ETAG = f'"{hashlib.md5(CONTENT).hexdigest()}"'
+
+
+# ...............................................
+def _stub_client(monkeypatch, head, get_response=None, get_error=None):
+    """Replace the S3 client with one answering a HEAD and a GET request.
+
+    Args:
+        monkeypatch: pytest fixture for reverting changes after a test.
+        head (dict): response to the HEAD request.
+        get_response (dict): response to the GET request, without the body.
+        get_error (str): error code to answer the GET request with, instead.
+
+    Returns:
+        stubber (botocore.stub.Stubber): stubber to check all requests were made.
+    """
+    client = boto3.client(
+        "s3", region_name="us-east-1", aws_access_key_id="test",
+        aws_secret_access_key="test")
+    stubber = Stubber(client)
+    stubber.add_response(
+        "head_object", head, expected_params={"Bucket": BUCKET, "Key": "data/f.csv"})
+    # The GET request must be conditional on the ETag of the HEAD request
+    get_params = {
+        "Bucket": BUCKET, "Key": "data/f.csv", "IfMatch": head["ETag"],
+        "Range": "bytes=0-"}
+    if get_error is None:
+        get_response = dict(get_response)
+        get_response["Body"] = StreamingBody(BytesIO(CONTENT), len(CONTENT))
+        stubber.add_response("get_object", get_response, expected_params=get_params)
+    else:
+        stubber.add_client_error(
+            "get_object", service_error_code=get_error, http_status_code=412,
+            expected_params=get_params)
+    stubber.activate()
+    monkeypatch.setattr(aws_tools.boto3, "client", lambda *args, **kwargs: client)
+    return stubber
+
+
+# ............................
+def test_download_is_conditional_on_head_etag(monkeypatch, tmp_path):
+    """Download and verify an object with GET requests matching the HEAD ETag."""
+    head = {"ContentLength": len(CONTENT), "ETag": MD5_ETAG}
+    stubber = _stub_client(monkeypatch, head, get_response=head)
+    local_filename = aws_tools.download_from_s3(
+        BUCKET, "data", "f.csv", str(tmp_path))
+    stubber.assert_no_pending_responses()
+    with open(local_filename, "rb") as inf:
+        assert inf.read() == CONTENT
+    assert [p.name for p in tmp_path.iterdir()] == ["f.csv"]
+
+
+# ............................
+def test_replaced_object_fails_download(monkeypatch, tmp_path):
+    """Fail, leaving no file, when the object changes after the HEAD request."""
+    head = {"ContentLength": len(CONTENT), "ETag": MD5_ETAG}
+    _stub_client(monkeypatch, head, get_error="PreconditionFailed")
+    with pytest.raises(Exception):
+        aws_tools.download_from_s3(BUCKET, "data", "f.csv", str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+# ............................
+@pytest.mark.parametrize("encryption", [
+    {"ServerSideEncryption": "aws:kms"},
+    {"ServerSideEncryption": "aws:kms:dsse"},
+    {"SSECustomerAlgorithm": "AES256"}])
+def test_encrypted_object_checks_only_size(monkeypatch, tmp_path, encryption):
+    """Accept an ETag that is not an MD5 checksum for objects encrypted with keys."""
+    head = {"ContentLength": len(CONTENT), "ETag": '"0123456789abcdef0123456789abcdef"'}
+    head.update(encryption)
+    _stub_client(monkeypatch, head, get_response=head)
+    local_filename = aws_tools.download_from_s3(
+        BUCKET, "data", "f.csv", str(tmp_path))
+    with open(local_filename, "rb") as inf:
+        assert inf.read() == CONTENT
+
+
+# ............................
+def test_unencrypted_object_checks_md5(monkeypatch, tmp_path):
+    """Reject a download whose MD5 checksum differs from a single-part ETag."""
+    head = {"ContentLength": len(CONTENT), "ETag": '"0123456789abcdef0123456789abcdef"'}
+    _stub_client(monkeypatch, head, get_response=head)
+    with pytest.raises(Exception):
+        aws_tools.download_from_s3(BUCKET, "data", "f.csv", str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
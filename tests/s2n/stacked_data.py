@@ -0,0 +1,65 @@
+"""Small stacked species-dataset records for testing matrix computations."""
+import numpy as np
+import pandas as pd
+
+from sppy.tools.s2n.constants import SUMMARY_TABLE_TYPES
+from sppy.tools.s2n.sparse_matrix import SparseMatrix
+
+X_FLD = "datasetkey"
+Y_FLD = "taxonkey_species"
+VAL_FLD = "occ_count"
+DATA_DATESTR = "2024_02_01"
+
+
+# ...............................................
+def make_stacked_data(species_count=50, dataset_count=20, seed=0):
+    """Create random stacked records of occurrence counts per species per dataset.
+
+    Args:
+        species_count (int): number of species, each in 1 to 7 datasets.
+        dataset_count (int): number of datasets to draw from.
+        seed (int): seed for the random number generator.
+
+    Returns:
+        stacked_df (pandas.DataFrame): one record per species per dataset.
+    """
+    rng = np.random.default_rng(seed)
+    recs = []
+    for sp in range(species_count):
+        for ds in rng.choice(
+                dataset_count, size=rng.integers(1, 8), replace=False):
+            recs.append((f"ds{ds}", f"{sp} sp{sp}", int(rng.integers(1, 30))))
+    return pd.DataFrame(recs, columns=[X_FLD, Y_FLD, VAL_FLD])
+
+
+# ...............................................
+def make_sparse_matrix(stacked_df, data_datestr=DATA_DATESTR):
+    """Build a species (rows) by dataset (columns) matrix from stacked records.
+
+    Args:
+        stacked_df (pandas.DataFrame): one record per species per dataset.
+        data_datestr (str): date of the data in YYYY_MM_DD format.
+
+    Returns:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix of counts.
+    """
+    return SparseMatrix.init_from_stacked_data(
+        stacked_df, X_FLD, Y_FLD, VAL_FLD,
+        SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, data_datestr)
+
+
+# ...............................................
+def to_dense_frame(sparse_matrix):
+    """Return matrix values as a dense DataFrame labeled by row and column.
+
+    Args:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix of counts.
+
+    Returns:
+        pandas.DataFrame: values indexed by row labels, with sorted rows and columns.
+    """
+    dense = pd.DataFrame(
+        sparse_matrix._to_csc().toarray(),
+        index=sparse_matrix.row_category.categories,
+        columns=sparse_matrix.column_category.categories)
+    return dense.sort_index(axis=0).sort_index(axis=1)
@@ -0,0 +1,53 @@
+"""Tests for sppy.tools.s2n.indexed_table.IndexedTable."""
+import json
+
+import numpy as np
+import pandas as pd
+
+from sppy.tools.s2n.indexed_table import IndexedTable
+
+
+# ...............................................
+def _make_table_with_nulls():
+    """Create a table with missing values in columns of several types.
+
+    Returns:
+        IndexedTable: table keyed by "datasetkey".
+    """
+    dataframe = pd.DataFrame({
+        "datasetkey": ["ds0", "ds1", "ds2", "ds3"],
+        "title": ["Zero", None, "Two", "Three"],
+        "occ_count": pd.array([5, pd.NA, 9, 1], dtype="Int64"),
+        "species_count": [2.0, 4.0, np.nan, 1.0],
+        "created": pd.to_datetime(["2024-01-01", None, "2024-02-01", "2024-03-01"]),
+    })
+    return IndexedTable(dataframe, "datasetkey")
+
+
+# ............................
+def test_missing_values_are_none():
+    """Return None for missing values, so records serialize to JSON."""
+    table = _make_table_with_nulls()
+    records = table.get_records(["ds1", "ds2"])
+    assert records[0]["title"] is None
+    assert records[0]["occ_count"] is None
+    assert records[0]["created"] is None
+    assert records[1]["species_count"] is None
+    assert json.loads(json.dumps(records, default=str))[0]["occ_count"] is None
+    # Values other than timestamps serialize without a default serializer
+    csv_rec = table.get_records("ds1", format="CSV")[0]
+    assert json.dumps(csv_rec[:4]) == '["ds1", null, null, 4.0]'
+    assert table.get_values(["ds1", "ds9"], "occ_count") == {"ds1": None, "ds9": None}
+
+
+# ............................
+def test_ordered_records_put_missing_values_last():
+    """Sort on a column with missing values, in either order, missing values last."""
+    table = _make_table_with_nulls()
+    descending = table.get_ordered_records("occ_count", "descending", 4)
+    assert [rec["datasetkey"] for rec in descending] == ["ds2", "ds0", "ds3", "ds1"]
+    ascending = table.get_ordered_records("species_count", "ascending", 4)
+    assert [rec["datasetkey"] for rec in ascending] == ["ds3", "ds0", "ds1", "ds2"]
+    csv_recs = table.get_ordered_records("occ_count", "ascending", 2, format="CSV")
+    assert csv_recs[0] == table.fields
+    assert json.dumps(csv_recs[1][:4]) == '["ds3", "Three", 1, 1.0]'
@@ -0,0 +1,106 @@
+"""Tests for sppy.tools.s2n.matrix_validation."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sppy.tools.s2n.matrix_validation import (
+    validate_stacked_to_aggregate_extremes, validate_stacked_to_aggregate_sums)
+from tests.s2n.stacked_data import (
+    make_sparse_matrix, make_stacked_data, VAL_FLD, X_FLD, Y_FLD)
+
+AXIS_FLDS = {0: Y_FLD, 1: X_FLD}
+
+
+# ...............................................
+def _as_batches(stacked_df, batch_size=37):
+    """Split stacked records into batches, as read from a parquet file.
+
+    Args:
+        stacked_df (pandas.DataFrame): stacked records.
+        batch_size (int): maximum number of records in each batch.
+
+    Returns:
+        list of pandas.DataFrame: consecutive batches of records.
+    """
+    return [
+        stacked_df.iloc[start:start + batch_size]
+        for start in range(0, len(stacked_df), batch_size)]
+
+
+# ...............................................
+def _validate(stk_records, sp_mtx, axis):
+    """Run the sum and both extreme validators on one axis.
+
+    Args:
+        stk_records (pandas.DataFrame or list of pandas.DataFrame): stacked records.
+        sp_mtx (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix to validate.
+        axis (int): axis of the vectors to validate, rows (0) or columns (1).
+
+    Returns:
+        list of list: mismatches from the sums, maximum and minimum validators.
+    """
+    return [
+        validate_stacked_to_aggregate_sums(
+            stk_records, AXIS_FLDS[axis], VAL_FLD, sp_mtx, agg_axis=axis),
+        validate_stacked_to_aggregate_extremes(
+            stk_records, Y_FLD, X_FLD, VAL_FLD, sp_mtx, agg_axis=axis, is_max=True),
+        validate_stacked_to_aggregate_extremes(
+            stk_records, Y_FLD, X_FLD, VAL_FLD, sp_mtx, agg_axis=axis, is_max=False),
+    ]
+
+
+# ............................
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("in_batches", [False, True])
+def test_matrix_from_records_is_valid(axis, in_batches):
+    """Find no mismatches for a matrix built from the same records."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    stk_records = _as_batches(stacked_df) if in_batches else stacked_df
+    assert _validate(stk_records, sp_mtx, axis) == [[], [], []]
+
+
+# ............................
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("in_batches", [False, True])
+def test_changed_records_are_reported(axis, in_batches):
+    """Report the row or column of a changed value and a label not in the matrix."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    changed_df = stacked_df.copy()
+    # Raise one value above the maximum of all values, and lower another below 1
+    high, low = 3, 40
+    changed_df.loc[high, VAL_FLD] = 1000
+    changed_df.loc[low, VAL_FLD] = 0
+    new_label = "new" if axis == 0 else "dsNew"
+    new_rec = {X_FLD: "ds0", Y_FLD: "0 sp0", VAL_FLD: 1}
+    new_rec[AXIS_FLDS[axis]] = new_label
+    changed_df = pd.concat([changed_df, pd.DataFrame([new_rec])], ignore_index=True)
+    stk_records = _as_batches(changed_df) if in_batches else changed_df
+
+    sums, maxes, mins = _validate(stk_records, sp_mtx, axis)
+    fld = AXIS_FLDS[axis]
+    changed = {changed_df.loc[high, fld], changed_df.loc[low, fld]}
+    assert set(sums) == changed | {new_label}
+    assert changed_df.loc[high, fld] in maxes
+    assert changed_df.loc[low, fld] in mins
+    for mismatches in (maxes, mins):
+        assert new_label in mismatches
+        assert len(mismatches) == len(set(mismatches))
+
+
+# ............................
+def test_moved_extreme_is_reported():
+    """Report a column whose maximum value is in a different row than the matrix."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    ds_df = stacked_df[stacked_df[X_FLD] == "ds3"]
+    max_idx = ds_df[VAL_FLD].idxmax()
+    other_idx = ds_df.index[ds_df.index != max_idx][0]
+    # Swap values, so the maximum is the same but in another species
+    swapped_df = stacked_df.copy()
+    swapped_df.loc[[max_idx, other_idx], VAL_FLD] = np.array(
+        stacked_df.loc[[other_idx, max_idx], VAL_FLD])
+    mismatches = validate_stacked_to_aggregate_extremes(
+        swapped_df, Y_FLD, X_FLD, VAL_FLD, sp_mtx, agg_axis=1, is_max=True)
+    assert "ds3" in mismatches
@@ -0,0 +1,83 @@
+"""Tests for sppy.tools.s2n.similarity.SparseSimilarity."""
+import numpy as np
+import pytest
+
+from sppy.tools.s2n.similarity import SIMILARITY_MEASURE
+from tests.s2n.stacked_data import make_sparse_matrix, make_stacked_data
+
+
+# ...............................................
+def _dense_similarity(sparse_matrix, label, axis):
+    """Compute similarity of one vector to all others from the dense matrix.
+
+    Args:
+        sparse_matrix (sppy.tools.s2n.sparse_matrix.SparseMatrix): matrix of counts.
+        label: label of the row (axis 0) or column (axis 1) of interest.
+        axis (int): row (0) or column (1) header for the vectors.
+
+    Returns:
+        dict: label of every other vector sharing at least one non-zero element,
+            mapped to a dict of its shared count, Jaccard index and cosine similarity.
+    """
+    dense = sparse_matrix._to_csc().toarray().astype(np.float64)
+    if axis == 1:
+        dense = dense.T
+    categories = sparse_matrix._get_categories_from_code(
+        range(dense.shape[0]), axis=axis)
+    idx = list(categories).index(label)
+    present = dense > 0
+    expected = {}
+    for i, other in enumerate(categories):
+        shared = int(np.sum(present[idx] & present[i]))
+        if i == idx or shared == 0:
+            continue
+        expected[other] = {
+            SIMILARITY_MEASURE.SHARED: shared,
+            SIMILARITY_MEASURE.JACCARD: shared / np.sum(present[idx] | present[i]),
+            SIMILARITY_MEASURE.COSINE: dense[idx] @ dense[i] / (
+                np.linalg.norm(dense[idx]) * np.linalg.norm(dense[i])),
+        }
+    return expected
+
+
+# ............................
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("measure", SIMILARITY_MEASURE.options())
+def test_similar_matches_dense_computation(axis, measure):
+    """Return every overlapping vector, scored and ordered as the dense matrix."""
+    sp_mtx = make_sparse_matrix(make_stacked_data())
+    categories = sp_mtx._get_categories_from_code(
+        range(sp_mtx._shape[axis]), axis=axis)
+    label = categories[5]
+    expected = _dense_similarity(sp_mtx, label, axis)
+    records = sp_mtx.get_similarity().get_similar(
+        label, axis=axis, measure=measure, limit=len(categories))
+    assert {rec["label"] for rec in records} == set(expected)
+    for rec in records:
+        for fld in SIMILARITY_MEASURE.options():
+            assert rec[fld] == pytest.approx(expected[rec["label"]][fld])
+    # Descending by measure, ties in the order of the labels
+    order = [
+        (-expected[rec["label"]][measure], list(categories).index(rec["label"]))
+        for rec in records]
+    assert order == sorted(order)
+
+
+# ............................
+def test_similar_limit_keeps_top_records():
+    """Return the same leading records when the limit is smaller."""
+    similarity = make_sparse_matrix(make_stacked_data()).get_similarity()
+    all_recs = similarity.get_similar("ds3", axis=1, limit=100)
+    assert similarity.get_similar("ds3", axis=1, limit=3) == all_recs[:3]
+
+
+# ............................
+def test_similar_rejects_unknown_label_and_measure():
+    """Raise IndexError for a missing label, Exception for a bad measure or axis."""
+    similarity = make_sparse_matrix(make_stacked_data()).get_similarity()
+    with pytest.raises(IndexError):
+        similarity.get_similar("not a dataset", axis=1)
+    with pytest.raises(Exception):
+        similarity.get_similar("ds3", axis=1, measure="euclidean")
+    with pytest.raises(Exception):
+        similarity.get_similar("ds3", axis=2)
@@ -0,0 +1,240 @@
+"""Tests for sppy.tools.s2n.sparse_matrix.SparseMatrix."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sppy.tools.s2n.constants import SUMMARY_TABLE_TYPES
+from sppy.tools.s2n.sparse_matrix import SparseMatrix
+from sppy.tools.s2n.stacked_records import StackedParquet
+from tests.s2n.stacked_data import (
+    DATA_DATESTR, make_sparse_matrix, make_stacked_data, to_dense_frame, VAL_FLD,
+    X_FLD, Y_FLD)
+
+
+# ............................
+def test_axis_aggregates_without_row_copy():
+    """Compute row and column aggregates from the CSC array alone."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    assert sp_mtx._csr_array is None
+    for axis, fld in ((0, X_FLD), (1, Y_FLD)):
+        labels = sp_mtx._get_categories_from_code(
+            range(sp_mtx._shape[1 - axis]), axis=1 - axis)
+        grouped = stacked_df.groupby(fld)[VAL_FLD]
+        assert np.array_equal(
+            sp_mtx.get_totals(axis), grouped.sum().loc[labels].to_numpy())
+        assert np.array_equal(
+            sp_mtx.get_counts(axis), grouped.count().loc[labels].to_numpy())
+
+
+# ............................
+def test_row_view_created_on_first_row_slice():
+    """Create the CSR array lazily, with the same values as the CSC array."""
+    sp_mtx = make_sparse_matrix(make_stacked_data())
+    row_label = sp_mtx.row_category.categories[3]
+    stats = sp_mtx.get_one_row_stats(row_label)
+    assert sp_mtx._csr_array is not None
+    assert (sp_mtx._csr_array != sp_mtx._csc_array).nnz == 0
+    assert stats["total_occurrences_for_species"] == sp_mtx.get_totals(1)[3]
+
+
+# ...............................................
+def _make_next_date_data(stacked_df):
+    """Change stacked records the way a new data date would.
+
+    Args:
+        stacked_df (pandas.DataFrame): records for the previous date.
+
+    Returns:
+        next_df (pandas.DataFrame): records with one dataset removed, changed counts
+            in another, and a new dataset containing a new species.
+    """
+    next_df = stacked_df[stacked_df[X_FLD] != "ds3"].copy()
+    is_ds5 = next_df[X_FLD] == "ds5"
+    next_df.loc[is_ds5, VAL_FLD] = next_df.loc[is_ds5, VAL_FLD] + 1
+    new_recs = pd.DataFrame(
+        [("dsNew", "1 sp1", 4), ("dsNew", "999 spNew", 7)],
+        columns=[X_FLD, Y_FLD, VAL_FLD])
+    return pd.concat([next_df, new_recs], ignore_index=True)
+
+
+# ............................
+def test_delta_matches_full_build():
+    """Apply a delta to get the same matrix as a build from all new records."""
+    stacked_df = make_stacked_data()
+    prev_mtx = make_sparse_matrix(stacked_df)
+    next_df = _make_next_date_data(stacked_df)
+    full_mtx = make_sparse_matrix(next_df, data_datestr="2024_03_01")
+    # Records in one DataFrame or in batches produce the same delta
+    batches = [next_df.iloc[start:start + 40] for start in range(0, len(next_df), 40)]
+    for stacked_records in (next_df, batches):
+        delta = prev_mtx.compute_column_delta(
+            stacked_records, X_FLD, Y_FLD, VAL_FLD, "2024_03_01")
+        # Only the removed, changed and new datasets are in the delta
+        changed = prev_mtx.column_category.categories.tolist() + \
+            delta["new_column_labels"]
+        assert sorted([changed[c] for c in delta["columns"]]) == [
+            "ds3", "ds5", "dsNew"]
+        delta_mtx = prev_mtx.apply_column_delta(delta)
+        assert delta_mtx._data_datestr == "2024_03_01"
+        assert to_dense_frame(delta_mtx).equals(to_dense_frame(full_mtx))
+        assert "ds3" not in delta_mtx.column_category.categories
+        # Statistics of all datasets and species, with no empty vectors
+        for stats_key in ("column", "row"):
+            delta_stats = delta_mtx._axis_stats[stats_key]
+            full_stats = full_mtx._axis_stats[stats_key]
+            for fld, val in full_stats.items():
+                if isinstance(val, list):
+                    assert sorted(delta_stats[fld]) == sorted(val)
+                else:
+                    assert delta_stats[fld] == val
+            assert delta_stats["min_count"] > 0
+
+
+# ............................
+def test_delta_file_round_trip(tmp_path):
+    """Write and read a delta, then apply it to its own previous matrix only."""
+    stacked_df = make_stacked_data()
+    prev_mtx = make_sparse_matrix(stacked_df)
+    delta = prev_mtx.compute_column_delta(
+        _make_next_date_data(stacked_df), X_FLD, Y_FLD, VAL_FLD, "2024_03_01",
+        chain_length=2)
+    delta_fname = SparseMatrix.get_delta_filename("mtx_2024_03_01", str(tmp_path))
+    SparseMatrix.write_delta_file(delta, delta_fname)
+    read_delta = SparseMatrix.read_delta_file(delta_fname)
+    assert read_delta["prev_datestr"] == prev_mtx._data_datestr
+    assert read_delta["chain_length"] == 2
+    assert to_dense_frame(prev_mtx.apply_column_delta(read_delta)).equals(
+        to_dense_frame(prev_mtx.apply_column_delta(delta)))
+    other_mtx = make_sparse_matrix(stacked_df, data_datestr="2024_01_01")
+    with pytest.raises(Exception):
+        other_mtx.apply_column_delta(read_delta)
+
+
+# ............................
+def test_build_and_delta_from_stacked_parquet(tmp_path):
+    """Build a matrix and delta from parquet batches, as from one DataFrame."""
+    stacked_df = make_stacked_data()
+    # Species field is constructed from taxonkey and name, as in the stacked table
+    parts = stacked_df[Y_FLD].str.partition(" ")
+    pqt_df = pd.DataFrame({
+        X_FLD: stacked_df[X_FLD], "taxonkey": parts[0].astype(int),
+        "species": parts[2], VAL_FLD: stacked_df[VAL_FLD]})
+    pqt_filename = str(tmp_path / "stacked.parquet")
+    pqt_df.to_parquet(pqt_filename)
+    combine_fields = {Y_FLD: ("taxonkey", "species")}
+    stacked_records = StackedParquet(
+        pqt_filename, [X_FLD, Y_FLD, VAL_FLD], combine_fields=combine_fields,
+        batch_size=30)
+    assert stacked_records.num_rows == len(stacked_df)
+
+    pqt_mtx = SparseMatrix.init_from_stacked_parquet(
+        pqt_filename, X_FLD, Y_FLD, VAL_FLD,
+        SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, DATA_DATESTR,
+        combine_fields=combine_fields, batch_size=30)
+    assert to_dense_frame(pqt_mtx).equals(
+        to_dense_frame(make_sparse_matrix(stacked_df)))
+
+    # Unchanged records produce an empty delta, read from batches twice
+    delta = pqt_mtx.compute_column_delta(
+        stacked_records, X_FLD, Y_FLD, VAL_FLD, "2024_03_01")
+    assert delta["columns"].size == 0
+    assert to_dense_frame(pqt_mtx.apply_column_delta(delta)).equals(
+        to_dense_frame(pqt_mtx))
+
+
+# ............................
+@pytest.mark.parametrize("axis, fld, count_fld", [
+    (0, Y_FLD, "dataset_count"), (1, X_FLD, "species_count")])
+def test_rank_vectors_enumerates_axis(monkeypatch, axis, fld, count_fld):
+    """Rank rows for axis 0 and columns for axis 1, as in get_similar."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    monkeypatch.setattr(
+        sp_mtx, "_lookup_dataset_names", lambda keys: {k: None for k in keys})
+    grouped = stacked_df.groupby(fld)[VAL_FLD]
+    expected = grouped.sum().sort_values(ascending=False, kind="stable")
+    records = sp_mtx.rank_vectors(axis=axis, rank_by="total", limit=5)
+    assert [rec[VAL_FLD] for rec in records] == expected.iloc[:5].tolist()
+    for rec in records:
+        assert grouped.sum()[rec[fld]] == rec[VAL_FLD]
+        assert grouped.count()[rec[fld]] == rec[count_fld]
+        assert ("dataset_title" in rec) == (axis == 1)
+
+
+# ............................
+@pytest.mark.parametrize("axis, fld, count_fld", [
+    (0, Y_FLD, "dataset_count"), (1, X_FLD, "species_count")])
+def test_distributions_enumerate_axis(axis, fld, count_fld):
+    """Describe and rank rows for axis 0 and columns for axis 1."""
+    stacked_df = make_stacked_data()
+    sp_mtx = make_sparse_matrix(stacked_df)
+    totals = stacked_df.groupby(fld)[VAL_FLD].sum()
+    description = sp_mtx.describe_distributions(axis)
+    assert description["count"] == totals.size
+    histogram = description[VAL_FLD]["histogram"]
+    assert sum([b["count"] for b in histogram]) == totals.size
+
+    label = totals.idxmax()
+    record = sp_mtx.get_percentile_ranks(label, axis)
+    assert record[fld] == label
+    assert record[VAL_FLD]["value"] == totals.max()
+    assert record[VAL_FLD]["rank"] == 1
+    assert record[VAL_FLD]["percentile"] == 100.0
+    assert record[count_fld]["value"] == stacked_df.groupby(fld).size()[label]
+    with pytest.raises(IndexError):
+        sp_mtx.get_percentile_ranks("not a label", axis)
+
+
+# ............................
+def _write_stacked_parquet(stacked_df, filenames, row_group_size):
+    """Write records in parts, with the species field split as in the stacked table."""
+    parts = stacked_df[Y_FLD].str.partition(" ")
+    pqt_df = pd.DataFrame({
+        X_FLD: stacked_df[X_FLD], "taxonkey": parts[0], "species": parts[2],
+        VAL_FLD: stacked_df[VAL_FLD]})
+    bounds = np.linspace(0, len(pqt_df), len(filenames) + 1).astype(int)
+    for fn, start, stop in zip(filenames, bounds[:-1], bounds[1:]):
+        pqt_df.iloc[start:stop].to_parquet(fn, row_group_size=row_group_size)
+    return {Y_FLD: ("taxonkey", "species")}
+
+
+# ............................
+@pytest.mark.parametrize("max_workers, file_count, row_group_size", [
+    (1, 2, 50), (2, 1, 50), (3, 3, 17)])
+def test_parallel_parquet_build_matches_serial_build(
+        tmp_path, max_workers, file_count, row_group_size):
+    """Build the same codes and values from row groups on processes as in one."""
+    stacked_df = make_stacked_data(species_count=200, dataset_count=40)
+    pqt_filenames = [
+        str(tmp_path / f"stacked_{i:03d}.parquet") for i in range(file_count)]
+    combine_fields = _write_stacked_parquet(stacked_df, pqt_filenames, row_group_size)
+    serial_mtx = make_sparse_matrix(stacked_df)
+    parallel_mtx = SparseMatrix.init_from_stacked_parquet(
+        pqt_filenames, X_FLD, Y_FLD, VAL_FLD,
+        SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, DATA_DATESTR,
+        combine_fields=combine_fields, max_workers=max_workers)
+    assert parallel_mtx.row_category.categories.equals(
+        serial_mtx.row_category.categories)
+    assert parallel_mtx.column_category.categories.equals(
+        serial_mtx.column_category.categories)
+    assert (parallel_mtx._to_csc() != serial_mtx._to_csc()).nnz == 0
+
+
+# ............................
+def test_parallel_parquet_build_drops_records_without_labels(tmp_path):
+    """Drop records missing a label, and labels found only in those records."""
+    stacked_df = make_stacked_data(species_count=200, dataset_count=40)
+    stacked_df.loc[[5, 17], X_FLD] = None
+    stacked_df.loc[[9], Y_FLD] = None
+    # The only record of a dataset, missing its species
+    stacked_df.loc[len(stacked_df)] = ("dsAlone", None, 3)
+    pqt_filename = str(tmp_path / "stacked.parquet")
+    stacked_df.to_parquet(pqt_filename, row_group_size=40)
+    parallel_mtx = SparseMatrix.init_from_stacked_parquet(
+        pqt_filename, X_FLD, Y_FLD, VAL_FLD,
+        SUMMARY_TABLE_TYPES.SPECIES_DATASET_MATRIX, DATA_DATESTR, max_workers=2)
+    placed_df = stacked_df.dropna(subset=[X_FLD, Y_FLD])
+    assert "dsAlone" not in parallel_mtx.column_category.categories
+    pd.testing.assert_frame_equal(
+        to_dense_frame(parallel_mtx), to_dense_frame(make_sparse_matrix(placed_df)))
@@ -0,0 +1,75 @@
+"""Tests for local summary tables of sppy.tools.s2n.spnet.SpNetAnalyses."""
+import logging
+import threading
+
+import pandas as pd
+import pytest
+
+import sppy.tools.s2n.spnet as spnet
+from sppy.tools.s2n.spnet import SpNetAnalyses
+
+
+# ...............................................
+@pytest.fixture
+def spnet_analyses(monkeypatch, tmp_path):
+    """Return an SpNetAnalyses with no local tables, locks or failures.
+
+    Args:
+        monkeypatch: pytest fixture for reverting changes after a test.
+        tmp_path: pytest fixture for a temporary directory.
+
+    Returns:
+        SpNetAnalyses: object downloading summary tables to tmp_path.
+    """
+    monkeypatch.setattr(SpNetAnalyses, "_local_tables", {})
+    monkeypatch.setattr(SpNetAnalyses, "_local_failures", {})
+    monkeypatch.setattr(SpNetAnalyses, "_local_locks", {})
+    return SpNetAnalyses("test-bucket", local_path=str(tmp_path))
+
+
+# ............................
+def test_download_blocks_only_its_table(monkeypatch, spnet_analyses):
+    """Read one table while another table is still downloading."""
+    slow_table = spnet_analyses._summary_tables["dataset_counts"]
+    fast_table = spnet_analyses._summary_tables["dataset_meta"]
+    started = threading.Event()
+    release = threading.Event()
+
+    def _download(bucket, bucket_path, filename, local_path, **kwargs):
+        if filename.startswith(slow_table["fname"]):
+            started.set()
+            release.wait(10)
+        local_filename = f"{local_path}/{filename}"
+        pd.DataFrame({"datasetkey": ["ds0"], "dataset_key": ["ds0"]}).to_parquet(
+            local_filename)
+        return local_filename
+
+    monkeypatch.setattr(spnet, "download_from_s3", _download)
+    slow_thread = threading.Thread(
+        target=spnet_analyses._get_local_table, args=(slow_table,))
+    slow_thread.start()
+    try:
+        assert started.wait(10)
+        fast = spnet_analyses._get_local_table(fast_table)
+        assert fast.get_records("ds0") == [{"datasetkey": "ds0", "dataset_key": "ds0"}]
+        assert slow_thread.is_alive()
+    finally:
+        release.set()
+        slow_thread.join(10)
+    assert spnet_analyses._get_local_table(slow_table).size == 1
+
+
+# ............................
+def test_local_failure_is_logged(monkeypatch, spnet_analyses, caplog):
+    """Log a warning, instead of printing, before falling back to S3 Select."""
+    def _no_s3(*args, **kwargs):
+        raise Exception("Object is not on S3")
+
+    monkeypatch.setattr(spnet, "download_from_s3", _no_s3)
+    monkeypatch.setattr(
+        SpNetAnalyses, "_query_summary_table", lambda self, *args: [])
+    monkeypatch.setattr(SpNetAnalyses, "_dataset_metadata_exists", lambda self: False)
+    with caplog.at_level(logging.WARNING, logger=spnet.__name__):
+        records = spnet_analyses.get_simple_dataset_counts("ds0")
+    assert records == []
+    assert "Failed to query local dataset_counts" in caplog.text
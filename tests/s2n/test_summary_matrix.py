@@ -0,0 +1,69 @@
+"""Tests for sppy.tools.s2n.summary_matrix.SummaryMatrix."""
+import pandas as pd
+import pytest
+
+from tests.s2n.stacked_data import make_sparse_matrix, make_stacked_data
+
+
+# ...............................................
+def _expected_order(summary_df, sort_flds, order):
+    """Sort summary records with pandas, ties kept in row order.
+
+    Args:
+        summary_df (pandas.DataFrame): summary records indexed by label.
+        sort_flds (list of str): fields to sort on, in order of precedence.
+        order (str): "ascending" or "descending".
+
+    Returns:
+        list: labels of all records in sorted order.
+    """
+    ranked = summary_df.reset_index(names="label")
+    ranked["position"] = range(len(ranked))
+    ranked = ranked.sort_values(
+        by=sort_flds + ["position"],
+        ascending=[order == "ascending"] * len(sort_flds) + [True])
+    return ranked["label"].tolist()
+
+
+# ............................
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("order", ["descending", "ascending"])
+@pytest.mark.parametrize("sort_by", ["count", "total", ["count", "total"]])
+def test_rank_measures_matches_pandas_sort(axis, order, sort_by):
+    """Return exactly limit records in the order of a stable pandas sort."""
+    summary_mtx = make_sparse_matrix(make_stacked_data()).get_summary_matrix(axis)
+    sort_flds = [sort_by] if isinstance(sort_by, str) else sort_by
+    expected = _expected_order(summary_mtx._df, sort_flds, order)
+    ranked = summary_mtx.rank_measures(sort_by, order=order, limit=7)
+    assert list(ranked.keys()) == expected[:7]
+    for label, rec in ranked.items():
+        assert list(rec.keys())[:len(sort_flds)] == sort_flds
+        assert rec == summary_mtx._df.loc[label].to_dict()
+
+
+# ............................
+def test_rank_measures_ties_in_row_order():
+    """Break ties on the sort field in row order, then by the next field."""
+    stacked_df = pd.DataFrame(
+        [("ds0", "1 sp1", 5), ("ds1", "1 sp1", 1), ("ds1", "2 sp2", 4),
+         ("ds2", "2 sp2", 3), ("ds2", "3 sp3", 3), ("ds3", "3 sp3", 5)],
+        columns=["datasetkey", "taxonkey_species", "occ_count"])
+    summary_mtx = make_sparse_matrix(stacked_df).get_summary_matrix(0)
+    labels = summary_mtx._df.index.tolist()
+    # Every dataset totals 5 or 6, ds1 and ds2 have 2 species each
+    ranked = summary_mtx.rank_measures("count", limit=10)
+    two_species = [lbl for lbl in labels if lbl in ("ds1", "ds2")]
+    one_species = [lbl for lbl in labels if lbl in ("ds0", "ds3")]
+    assert list(ranked.keys()) == two_species + one_species
+    ranked = summary_mtx.rank_measures(["total", "count"], limit=10)
+    assert list(ranked.keys())[:2] == ["ds2", "ds1"]
+
+
+# ............................
+def test_rank_measures_rejects_bad_field_and_order():
+    """Raise an Exception for a field or order that does not exist."""
+    summary_mtx = make_sparse_matrix(make_stacked_data()).get_summary_matrix(0)
+    with pytest.raises(Exception):
+        summary_mtx.rank_measures("occ_count")
+    with pytest.raises(Exception):
+        summary_mtx.rank_measures("count", order="random")